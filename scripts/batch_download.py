@@ -1,6 +1,10 @@
 # batch_download.py
+import sys
 from datetime import datetime
-from download_aemet_resume import download_full_station_resume
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from uhi.aemet import download_stations, make_logger
 
 stations = [
     ("0201D","aemet_0076_1980_2025_resume.csv"),
@@ -17,11 +21,12 @@ stations = [
 start = datetime(1980,1,1)
 end   = datetime(2025,12,31)
 
-for est, out in stations:
-    print("===== INICIANDO ESTACION:", est, "->", out, "=====")
-    try:
-        df = download_full_station_resume(est, start, end, out, months_chunk=3)
-        print("DONE:", est, "rows:", len(df))
-    except Exception as e:
-        print("ERROR en", est, e)
-        # continuar con la siguiente
+
+def main():
+    # same layout as download_aemet_resume.py: CSVs, chunks and log in the cwd
+    download_stations(stations, start, end, out_dir=".", months_chunk=3,
+                      chunk_dir=Path("chunks"), log=make_logger("download_resume.log"))
+
+
+if __name__ == "__main__":
+    main()
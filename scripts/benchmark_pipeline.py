@@ -0,0 +1,202 @@
+# scripts/benchmark_pipeline.py
+"""
+End-to-end benchmark of the pipeline on synthetic AEMET-shaped data.
+
+For each scale (stations x years) a synthetic network is generated (and
+cached) under data/benchmarks/synthetic/, then the main stages are timed:
+clean_df, merge (+ rural composite), make_pair_csv, QC, the annual table and
+the notebooks' pandas aggregation. Throughput and peak traced memory are
+appended as JSON lines to the results file.
+
+python scripts/benchmark_pipeline.py --scales 8x45,50x45,200x45,500x45
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from uhi import annual, clean, merge, pairs, qc, synthetic
+
+BENCH_DIR = BASE_DIR / "data" / "benchmarks"
+DEFAULT_SCALES = "8x45,50x45,200x45,500x45"
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def dataset(n_stations, n_years, seed=0, cache_dir=BENCH_DIR / "synthetic"):
+    """Synthetic resume CSVs for one scale (generated once, then reused)."""
+    d = Path(cache_dir) / f"{n_stations}x{n_years}_s{seed}"
+    files = sorted(d.glob("aemet_*_resume.csv"))
+    if len(files) != n_stations:
+        print(f"Generando red sintética {n_stations}x{n_years} en {d} ...")
+        files = synthetic.write_dataset(d, n_stations, n_years, seed=seed)
+    return d, [f.name for f in files]
+
+
+def measure(fn, repeat=1, memory=True):
+    """Best wall time over ``repeat`` runs + peak traced memory of one run."""
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+    return best, peak, result
+
+
+# --- benchmark cases: each returns (callable, rows processed) ---
+def case_clean_df(data_dir, files, max_stations):
+    raws = []
+    for code, df in synthetic.generate_network(min(len(files), max_stations), n_years=_years(files)):
+        raws.append(pd.DataFrame(synthetic.to_raw_records(df)))
+    rows = sum(len(r) for r in raws)
+    return (lambda: [clean.clean_df(r.copy()) for r in raws]), rows
+
+
+def case_merge(data_dir, files):
+    rows = _rows(data_dir, files)
+
+    def run():
+        merged = merge.merge_stations(merge.load_stations(files, data_dir))
+        return merge.add_rural_composites(merged)
+    return run, rows
+
+
+def case_pairs(merged, out_dir):
+    def run():
+        return pairs.make_pair_csv(
+            merged, "0200E", "tmin_rural_median", "bench_pair.csv",
+            ("1980-01-01", "2025-12-31"), out_dir=out_dir)
+    return run, len(merged)
+
+
+def case_qc(data_dir, files):
+    return (lambda: qc.qc_summary(files, data_dir)), _rows(data_dir, files)
+
+
+def case_annual_table(data_dir, files, out_dir):
+    return (lambda: annual.build_annual_table(data_dir, Path(out_dir) / "annual.parquet")), _rows(data_dir, files)
+
+
+def case_notebook_annual(data_dir, files):
+    # what each notebook does on startup (discussions.ipynb flavour)
+    def run():
+        meteo = pd.concat([pd.read_csv(Path(data_dir) / f) for f in files], ignore_index=True)
+        meteo["fecha"] = pd.to_datetime(meteo["fecha"], errors="coerce")
+        meteo = meteo.dropna(subset=["fecha"])
+        meteo["year"] = meteo["fecha"].dt.year
+        for col in ["tmed", "tmax", "tmin", "prec", "sol", "presMax", "presMin", "hrMedia"]:
+            meteo[col] = pd.to_numeric(meteo[col], errors="coerce")
+        valid = meteo.groupby(["nombre", "year"])["tmin"].count().reset_index(name="n_days")
+        valid = valid[valid["n_days"] >= 300]
+        clean = meteo.merge(valid[["nombre", "year"]], on=["nombre", "year"])
+        return clean.groupby(["nombre", "year"], as_index=False).agg(
+            {"tmin": "mean", "tmax": "mean", "tmed": "mean", "hrMedia": "mean",
+             "sol": "mean", "presMax": "mean", "presMin": "mean"})
+    return run, _rows(data_dir, files)
+
+
+_ROWS = {}
+
+
+def _rows(data_dir, files):
+    key = (str(data_dir), len(files))
+    if key not in _ROWS:
+        _ROWS[key] = sum(sum(1 for _ in open(Path(data_dir) / f, encoding="utf-8")) - 1 for f in files)
+    return _ROWS[key]
+
+
+def _years(files):
+    # aemet_<code>_<y0>_<y1>_resume.csv
+    parts = files[0].split("_")
+    return int(parts[3]) - int(parts[2]) + 1
+
+
+def run_scale(n_stations, n_years, args, out):
+    data_dir, files = dataset(n_stations, n_years, args.seed, args.cache_dir)
+    rev = git_rev()
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = [
+            ("clean_df", lambda: case_clean_df(data_dir, files, args.clean_max_stations)),
+            ("merge", lambda: case_merge(data_dir, files)),
+            ("qc", lambda: case_qc(data_dir, files)),
+            ("annual_table", lambda: case_annual_table(data_dir, files, tmp)),
+            ("notebook_annual", lambda: case_notebook_annual(data_dir, files)),
+        ]
+        merged = None
+        for name, make in cases + [("make_pair_csv", None)]:
+            if args.only and name not in args.only:
+                continue
+            if name == "make_pair_csv":
+                if merged is None:
+                    run, _ = case_merge(data_dir, files)
+                    merged = run()
+                fn, rows = case_pairs(merged, tmp)
+            else:
+                fn, rows = make()
+            secs, peak, res = measure(fn, args.repeat, not args.no_memory)
+            if name == "merge":
+                merged = res
+            rec = {
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "commit": rev,
+                "benchmark": name,
+                "stations": n_stations,
+                "years": n_years,
+                "rows": rows,
+                "seconds": round(secs, 4),
+                "rows_per_s": round(rows / secs, 1) if secs > 0 else None,
+                "peak_mb": None if peak is None else round(peak, 1),
+            }
+            print(f"{name:16s} {n_stations:4d}x{n_years:<3d} {secs:8.3f}s  "
+                  f"{rec['rows_per_s'] or 0:12.0f} filas/s  peak={rec['peak_mb']} MB")
+            out.write(json.dumps(rec) + "\n")
+            out.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark del pipeline con datos sintéticos.")
+    ap.add_argument("--scales", default=DEFAULT_SCALES, help="Lista 'estacionesxaños' separada por comas")
+    ap.add_argument("--repeat", type=int, default=1, help="Repeticiones (se guarda la mejor)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--only", nargs="*", help="Ejecutar solo estos benchmarks")
+    ap.add_argument("--clean-max-stations", type=int, default=50,
+                    help="Estaciones usadas para clean_df (el coste es por fila)")
+    ap.add_argument("--no-memory", action="store_true", help="No medir memoria (más rápido)")
+    ap.add_argument("--cache-dir", default=str(BENCH_DIR / "synthetic"), help="Carpeta de datos sintéticos")
+    ap.add_argument("--out", default=str(BENCH_DIR / "results.jsonl"), help="Fichero de resultados")
+    args = ap.parse_args()
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "a", encoding="utf-8") as out:
+        for scale in args.scales.split(","):
+            n, y = (int(v) for v in scale.lower().split("x"))
+            run_scale(n, y, args, out)
+    print(f"✅ Resultados añadidos a {out_path}")
+
+
+if __name__ == "__main__":
+    main()
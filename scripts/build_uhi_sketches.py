@@ -0,0 +1,57 @@
+# scripts/build_uhi_sketches.py
+"""
+Construye los sketches de cuantiles (t-digest) de UHI por par x mes x régimen
+a partir del store de arrays y guarda data/processed/uhi_sketches.parquet.
+Imprime la climatología de percentiles (P10/P50/P90/P99) por par y régimen.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from uhi.arrays import ArrayStore
+from uhi.config import PROC_DIR
+from uhi.instrument import stage
+from uhi.sketch import build_uhi_sketches
+from uhi.stations import RURAL_CODES, URBAN_CODES
+
+DEFAULT_REGIMES = ["calm_{urb}", "clear_rural", "dry_{urb}", "highp_rural", "heatwave_rural",
+                   "DJF", "MAM", "JJA", "SON"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sketches de percentiles de UHI.")
+    ap.add_argument("--proc-dir", default=str(PROC_DIR))
+    ap.add_argument("--urban", nargs="*", default=URBAN_CODES)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--years-per-chunk", type=int, default=5)
+    args = ap.parse_args()
+
+    proc_dir = Path(args.proc_dir)
+    store = ArrayStore(proc_dir / "arrays")
+    rural = [c for c in RURAL_CODES if c in store.station_index]
+    urban = [c for c in args.urban if c in store.station_index]
+    regimes_path = proc_dir / "regimes.npz"
+
+    sketches = None
+    for urb in urban:
+        # regimes named after the urban station are resolved per pair
+        regimes = [r.format(urb=urb) for r in DEFAULT_REGIMES] if regimes_path.exists() else []
+        with stage("sketch", pair=f"{urb}-rural_median") as st:
+            part = build_uhi_sketches(store, [(urb, rural)], regimes, regimes_path,
+                                      args.years_per_chunk, args.workers)
+            st.rows_out = len(part)
+        sketches = part if sketches is None else sketches.merge(part)
+
+    if sketches is None:
+        print("No hay estaciones urbanas en el store.")
+        return
+    out = sketches.save(proc_dir / "uhi_sketches.parquet")
+    print(sketches.quantiles(by_month=False).round(2).to_string(index=False))
+    print("✅ Guardado", out)
+
+
+if __name__ == "__main__":
+    main()
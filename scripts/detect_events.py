@@ -0,0 +1,47 @@
+# scripts/detect_events.py
+"""
+Detecta episodios extremos en todas las estaciones a la vez (store de arrays):
+noches tropicales / tórridas, olas de calor y rachas de UHI alta.
+
+Guarda data/processed/events_catalogue.csv y events_per_year.csv.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from uhi.arrays import ArrayStore
+from uhi.config import PROC_DIR
+from uhi.events import UHI_MIN_DAYS, UHI_SPELL, detect_events
+from uhi.instrument import stage
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Catálogo de episodios extremos.")
+    ap.add_argument("--proc-dir", default=str(PROC_DIR))
+    ap.add_argument("--start", default=None)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--uhi-threshold", type=float, default=UHI_SPELL, help="Umbral UHI (°C)")
+    ap.add_argument("--uhi-min-days", type=int, default=UHI_MIN_DAYS)
+    args = ap.parse_args()
+
+    proc_dir = Path(args.proc_dir)
+    store = ArrayStore(proc_dir / "arrays")
+    with stage("events", stations=len(store.codes)) as st:
+        catalogue, counts = detect_events(store, start=args.start, end=args.end,
+                                          uhi_threshold=args.uhi_threshold,
+                                          uhi_min_days=args.uhi_min_days)
+        st.rows_out = len(catalogue)
+
+    catalogue.to_csv(proc_dir / "events_catalogue.csv", index=False)
+    counts.to_csv(proc_dir / "events_per_year.csv", index=False)
+    if len(catalogue):
+        print(catalogue.groupby("event")["n_days"].agg(["size", "sum"])
+              .rename(columns={"size": "episodios", "sum": "días"}))
+    print("✅ Guardado", proc_dir / "events_catalogue.csv")
+
+
+if __name__ == "__main__":
+    main()
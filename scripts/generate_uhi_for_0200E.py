@@ -1,38 +1,24 @@
-import pandas as pd
-import numpy as np
+# generate_uhi_for_0200E.py
+"""
+uhi_input_0200E_ruralMedian.csv: 0200E vs mediana rural, rango completo.
+"""
+import sys
 from pathlib import Path
 
-# Rutas
 BASE_DIR = Path(__file__).resolve().parents[1]
-PROC_DIR = BASE_DIR / "data" / "processed"
+sys.path.insert(0, str(BASE_DIR / "src"))
 
-merged_path = PROC_DIR / "merged_all_stations_with_ruralMedian.csv"
-df = pd.read_csv(merged_path, parse_dates=["fecha"], index_col="fecha")
+from uhi.config import PROC_DIR
+from uhi.pairs import load_merged, median_pair_csv
 
-urban = "0200E"
 
-# Comprobar que existe
-if f"tmin_{urban}" not in df.columns:
-    raise ValueError(f"No existe la columna tmin_{urban} en merged_all_stations_with_ruralMedian.csv")
+def main(urban="0200E"):
+    df = load_merged(PROC_DIR)
+    if f"tmin_{urban}" not in df.columns:
+        raise SystemExit(f"ERROR: tmin_{urban} no está en el merged")
+    out_path = median_pair_csv(df, urban, PROC_DIR)
+    print("Archivo generado:", out_path)
 
-# Seleccionar columnas relevantes
-cols = [
-    f"tmin_{urban}",
-    f"velmedia_{urban}",
-    "tmin_rural_median"
-]
 
-df_uhi = df[cols].copy()
-
-# Crear etiqueta de viento débil (< 3 m/s)
-df_uhi["weak_wind"] = df_uhi[f"velmedia_{urban}"] < 3.0
-
-# Eliminar días con temperaturas faltantes
-df_uhi = df_uhi.dropna(subset=[f"tmin_{urban}", "tmin_rural_median"])
-
-# Guardar
-out_path = PROC_DIR / f"uhi_input_{urban}_ruralMedian.csv"
-df_uhi.to_csv(out_path, index=True)
-
-print("Archivo generado:", out_path)
-print("Filas finales:", len(df_uhi))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# scripts/homogeneity_screen.py
+"""
+Busca rupturas (SNHT + Pettitt) en las series diferencia urbana-rural.
+
+Lee la tabla merged, calcula anomalías mensuales de cada par (por defecto
+urbanas x rurales + mediana rural), detecta/ajusta rupturas y guarda:
+- data/processed/homogeneity_breaks.csv
+- data/processed/homogeneity_adjusted_<var>.csv (anomalías mensuales ajustadas)
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from uhi.config import PROC_DIR
+from uhi.homogeneity import homogenize, monthly_anomalies, pair_differences
+from uhi.instrument import stage
+from uhi.merged import read_merged
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Detección de rupturas en pares de estaciones.")
+    ap.add_argument("--var", default="tmin")
+    ap.add_argument("--pairs", nargs="*", help="Pares 'A-B' (por defecto urbanas x rurales)")
+    ap.add_argument("--test", choices=["snht", "pettitt", "both"], default="both")
+    ap.add_argument("--alpha", type=float, default=0.05)
+    ap.add_argument("--max-breaks", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--proc-dir", default=str(PROC_DIR))
+    args = ap.parse_args()
+
+    proc_dir = Path(args.proc_dir)
+    df = read_merged(proc_dir / "merged_all_stations_with_ruralMedian.parquet"
+                     if (proc_dir / "merged_all_stations_with_ruralMedian.parquet").exists()
+                     else proc_dir / "merged_all_stations_with_ruralMedian.csv")
+    pairs = [tuple(p.split("-", 1)) for p in args.pairs] if args.pairs else None
+
+    with stage("homogeneity", rows_in=len(df), var=args.var) as st:
+        series = monthly_anomalies(pair_differences(df, pairs, args.var))
+        breaks, adjusted = homogenize(series, alpha=args.alpha, max_breaks=args.max_breaks,
+                                      test=args.test, workers=args.workers)
+        st.rows_out = len(breaks)
+
+    breaks.to_csv(proc_dir / "homogeneity_breaks.csv", index=False)
+    adjusted.to_csv(proc_dir / f"homogeneity_adjusted_{args.var}.csv", index_label="mes")
+    print(f"Pares analizados: {series.shape[1]} | rupturas detectadas: {len(breaks)}")
+    if len(breaks):
+        print(breaks.to_string(index=False))
+    print("✅ Guardado", proc_dir / "homogeneity_breaks.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# scripts/render_reports.py
+"""
+Redraw the station figures under reports/ in parallel, only for figures whose
+input data changed since the last run.
+
+python scripts/render_reports.py --workers 4
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+from uhi.config import REPORTS_DIR
+from uhi.report import render_default_report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render report figures (incremental, parallel).")
+    ap.add_argument("--workers", type=int, default=None, help="Processes (default: cpu count)")
+    ap.add_argument("--force", action="store_true", help="Redraw everything")
+    ap.add_argument("--out", default=str(REPORTS_DIR), help="Reports directory")
+    args = ap.parse_args()
+
+    res = render_default_report(reports_dir=args.out, workers=args.workers, force=args.force)
+    print(f"✅ Figuras: {len(res['rendered'])} dibujadas, {len(res['skipped'])} sin cambios, {len(res['empty'])} sin datos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# scripts/uhi_attribution.py
+"""
+Atribución multivariante de la UHI: OLS / ridge / lasso con validación
+cruzada y correlaciones parciales, para cada par urbana-rural, con muestras
+diarias (tabla merged) y anuales (tabla anual, covariables de discussions).
+
+Barre todas las combinaciones de covariables x métodos sobre estadísticos
+cacheados (uhi.attribution) y guarda:
+- data/processed/uhi_attribution.csv (una fila por diseño x configuración)
+- data/processed/uhi_partial_correlations.csv
+
+--satellite admite la tabla por zona y año del notebook de satélite
+(columnas zone, year, NDVI, NDBI) para añadir NDVI/NDBI a la muestra anual.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR / "src"))
+
+import pandas as pd
+
+from uhi.annual import load_annual_table
+from uhi.attribution import FOLDS, METHODS, annual_designs, configurations, daily_designs, sweep
+from uhi.config import PROC_DIR
+from uhi.instrument import stage
+from uhi.pairs import load_merged
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Atribución multivariante de la UHI.")
+    ap.add_argument("--proc-dir", default=str(PROC_DIR))
+    ap.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    ap.add_argument("--max-covariates", type=int, default=None, help="Tamaño máximo de las combinaciones")
+    ap.add_argument("--folds", type=int, default=FOLDS, help="Pliegues de CV (por año)")
+    ap.add_argument("--rule", choices=["min", "1se"], default="min", help="Elección de la penalización")
+    ap.add_argument("--satellite", default=None, help="CSV zone, year, NDVI, NDBI")
+    ap.add_argument("--no-daily", action="store_true", help="Solo la muestra anual")
+    args = ap.parse_args()
+
+    proc_dir = Path(args.proc_dir)
+    satellite = pd.read_csv(args.satellite) if args.satellite else None
+    designs = annual_designs(load_annual_table(proc_dir / "annual_metrics.parquet"),
+                             satellite=satellite, folds=args.folds)
+    if not args.no_daily:
+        designs += daily_designs(load_merged(proc_dir), folds=args.folds)
+    if not designs:
+        raise SystemExit(f"Sin diseños con muestra suficiente en {proc_dir}")
+    covariates = list(dict.fromkeys(c for d in designs for c in d.columns))
+    configs = configurations(covariates, methods=args.methods, max_size=args.max_covariates)
+
+    with stage("attribution", designs=len(designs), configs=len(configs)) as st:
+        fits = sweep(designs, configs, rule=args.rule)
+        pcor = pd.concat([d.partial_correlations() for d in designs], ignore_index=True)
+        st.rows_out = len(fits)
+
+    fits.to_csv(proc_dir / "uhi_attribution.csv", index=False)
+    pcor.to_csv(proc_dir / "uhi_partial_correlations.csv", index=False)
+    scored = fits.dropna(subset=["cv_r2"])
+    best = scored.loc[scored.groupby("design")["cv_r2"].idxmax(), ["design", "method", "covariates", "cv_r2"]]
+    print(f"Diseños: {len(designs)} | configuraciones: {len(configs)} | ajustes: {len(fits)}")
+    print(best.round(3).to_string(index=False))
+    print("✅ Guardado", proc_dir / "uhi_attribution.csv")
+
+
+if __name__ == "__main__":
+    main()
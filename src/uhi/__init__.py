@@ -0,0 +1,5 @@
+"""
+Reusable helpers for the UHI-Barcelona analysis (loaders, aggregations,
+plotting). Submodules are imported explicitly, e.g. ``from uhi import report``,
+so importing the package itself stays cheap.
+"""
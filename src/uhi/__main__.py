@@ -0,0 +1,6 @@
+# python -m uhi ...
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,276 @@
+# src/uhi/aemet.py
+"""
+Resumable, throttled download of AEMET OpenData daily climatologies.
+
+- ``api_key`` header, read from the environment / ``.env`` only when needed
+- 3-month chunks by default (lighter on the API)
+- honours Retry-After and backs off on 429
+- every chunk is cached as JSON so an interrupted download resumes
+- ``download_observations``: last 24 h of hourly/10-minute observations
+  (``observacion/convencional``), appended to the ``uhi.subdaily`` store
+Nothing runs at import time; ``download_full_station_resume`` is the entry point.
+"""
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import requests
+from dateutil.relativedelta import relativedelta
+
+from .config import RAW_AEMET_DIR
+from .instrument import current_stage, stage
+
+API_ROOT = "https://opendata.aemet.es/opendata/api"
+DAILY_PATH = "/valores/climatologicos/diarios/datos/fechaini/{ini}/fechafin/{fin}/estacion/{est}"
+OBS_PATH = "/observacion/convencional/datos/estacion/{est}"
+BASE_META = API_ROOT + DAILY_PATH
+OBS_META = API_ROOT + OBS_PATH
+USER_AGENT = "TFG-UHI-resume/1.0"
+
+CHUNK_DIR = RAW_AEMET_DIR / "chunks"
+LOG_FILE = RAW_AEMET_DIR / "download_resume.log"
+
+NUMERIC = ["tmed", "tmin", "tmax", "prec", "sol", "velmedia", "racha", "presMax", "presMin", "hrMedia"]
+
+
+def get_api_key():
+    key = os.getenv("AEMET_API_KEY")
+    if not key:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        key = os.getenv("AEMET_API_KEY")
+    if not key:
+        raise RuntimeError("AEMET_API_KEY no encontrada (entorno o .env)")
+    return key
+
+
+def make_logger(log_file=LOG_FILE):
+    """print + append to ``log_file`` (UTC timestamp per line)."""
+    def log(msg):
+        t = datetime.now(timezone.utc).isoformat()
+        print(msg)
+        if log_file is not None:
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+            with open(log_file, "a", encoding="utf-8") as f:
+                f.write(f"{t} {msg}\n")
+    return log
+
+
+def daterange_chunks(start, end, months_chunk=3):
+    cur = start
+    while cur <= end:
+        nxt = cur + relativedelta(months=months_chunk) - relativedelta(days=1)
+        if nxt > end:
+            nxt = end
+        yield cur, nxt
+        cur = nxt + relativedelta(days=1)
+
+
+def chunk_path(chunk_dir, est, ini, fin):
+    return Path(chunk_dir) / f"{est}_{ini.strftime('%Y%m%d')}_{fin.strftime('%Y%m%d')}.json"
+
+
+def save_chunk_file(est, ini, fin, arr, chunk_dir=CHUNK_DIR):
+    fname = chunk_path(chunk_dir, est, ini, fin)
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    with open(fname, "w", encoding="utf-8") as f:
+        json.dump(arr, f, ensure_ascii=False)
+    return fname
+
+
+def read_chunk_file(est, ini, fin, chunk_dir=CHUNK_DIR):
+    fname = chunk_path(chunk_dir, est, ini, fin)
+    if fname.exists():
+        with open(fname, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def fetch_metadata_and_data_with_rate_handling(est, ini_dt, fin_dt, api_key=None, max_attempts=10,
+                                               base_url=BASE_META, log=print):
+    api_key = api_key or get_api_key()
+    headers = {"api_key": api_key, "User-Agent": USER_AGENT}
+    ini = ini_dt.strftime("%Y-%m-%dT00:00:00UTC")
+    fin = fin_dt.strftime("%Y-%m-%dT00:00:00UTC")
+    meta_url = base_url.format(ini=ini, fin=fin, est=est)
+    last_err = None
+    for attempt in range(1, max_attempts+1):
+        try:
+            r = requests.get(meta_url, headers=headers, timeout=30)
+            # Si devuelve 429, mirar Retry-After
+            if r.status_code == 429:
+                ra = r.headers.get("Retry-After")
+                wait = int(ra) if ra and ra.isdigit() else min(60 * attempt, 3600)
+                log(f"[429] meta {ini}->{fin} attempt={attempt} -> esperar {wait}s (Retry-After={ra})")
+                time.sleep(wait)
+                continue
+            r.raise_for_status()
+            try:
+                meta = r.json()
+            except ValueError:
+                last_err = f"Metadata non-JSON status={r.status_code} len={len(r.text)}"
+                log(f"[WARN] {last_err}")
+                # espera larga y reintenta
+                time.sleep(min(60 * attempt, 600))
+                continue
+            datos_url = meta.get("datos")
+            log(f"[META_OK] {ini}->{fin} estado={meta.get('estado')} datos_url={datos_url}")
+            if not datos_url:
+                return None
+            # descargar datos_url
+            for a2 in range(1, max_attempts+1):
+                try:
+                    rr = requests.get(datos_url, headers={"User-Agent": USER_AGENT}, timeout=90)
+                    if rr.status_code == 429:
+                        ra = rr.headers.get("Retry-After")
+                        wait = int(ra) if ra and ra.isdigit() else min(60 * a2, 3600)
+                        log(f"[429] datos_url {ini}->{fin} inner attempt={a2} -> esperar {wait}s")
+                        time.sleep(wait)
+                        continue
+                    rr.raise_for_status()
+                    text = rr.text
+                    st = current_stage()
+                    if st is not None:
+                        st.read(len(rr.content))
+                    if not text or text.strip() == "":
+                        log("[WARN] datos_url body vacío, reintentando")
+                        time.sleep(min(10 * a2, 300))
+                        continue
+                    try:
+                        arr = json.loads(text)
+                    except ValueError:
+                        # intentar leer con pandas si es JSON-like
+                        try:
+                            df_tmp = pd.read_json(text)
+                            arr = df_tmp.to_dict(orient="records")
+                        except Exception as e:
+                            log(f"[ERROR] No JSON en datos_url: {e}")
+                            time.sleep(min(30 * a2, 600))
+                            continue
+                    return arr
+                except requests.RequestException as e2:
+                    log(f"[WARN] error datos_url attempt {a2}: {e2}")
+                    time.sleep(min(5 * a2, 300))
+            # si no se pudo descargar datos_url, reintenta metadata
+        except requests.RequestException as e:
+            last_err = f"Request metadata err attempt {attempt}: {e}"
+            log(f"[WARN] {last_err}")
+            time.sleep(min(10 * attempt, 600))
+    raise RuntimeError(f"Fallo persistente {ini} - {fin}. Last err: {last_err}")
+
+
+def normalize_station(dfs):
+    """Concatenate chunk frames, coerce numerics and reindex to every day."""
+    df_all = pd.concat(dfs, ignore_index=True).drop_duplicates(subset=["fecha"], keep="first")
+    df_all["fecha"] = pd.to_datetime(df_all["fecha"], format="%Y-%m-%d", errors="coerce")
+    df_all = df_all.set_index("fecha").sort_index()
+    # normalizar
+    for c in NUMERIC:
+        if c in df_all.columns:
+            df_all[c] = df_all[c].astype(str).str.replace(",", ".").replace({"Ip": None, "Varias": None, "": None})
+            df_all[c] = pd.to_numeric(df_all[c], errors="coerce")
+    # reindex completo
+    idx = pd.date_range(df_all.index.min(), df_all.index.max(), freq="D")
+    df_all = df_all.reindex(idx)
+    return df_all
+
+
+def download_full_station_resume(est, start_date, end_date, out_csv, months_chunk=3, api_key=None,
+                                 chunk_dir=CHUNK_DIR, log=None, base_url=BASE_META, pause=0.3):
+    log = log or make_logger()
+    dfs = []
+    for ini, fin in daterange_chunks(start_date, end_date, months_chunk=months_chunk):
+        # si chunk ya descargado, lo usamos
+        existing = read_chunk_file(est, ini, fin, chunk_dir)
+        if existing is not None:
+            log(f"Chunk ya en disco: {ini.date()}->{fin.date()}")
+            if len(existing) > 0:
+                dfs.append(pd.DataFrame(existing))
+            continue
+        log(f"Descargando chunk {ini.date()} -> {fin.date()}")
+        with stage("download_chunk", station=est, ini=ini.date(), fin=fin.date()) as st:
+            arr = fetch_metadata_and_data_with_rate_handling(est, ini, fin, api_key=api_key,
+                                                             base_url=base_url, log=log)
+            st.rows_out = 0 if arr is None else len(arr)
+        if arr is None or len(arr) == 0:
+            log(f"Chunk vacío (sin datos) {ini.date()}->{fin.date()} - guardando archivo vacío")
+            save_chunk_file(est, ini, fin, [], chunk_dir)
+            continue
+        # guardar chunk y agregar
+        save_chunk_file(est, ini, fin, arr, chunk_dir)
+        dfs.append(pd.DataFrame(arr))
+        # pausa cortita para no saturar
+        time.sleep(pause)
+    if not dfs:
+        raise RuntimeError("No se descargó ningún chunk con datos en el rango.")
+    with stage("parse", station=est, rows_in=sum(len(d) for d in dfs)) as st:
+        df_all = normalize_station(dfs)
+        st.rows_out = len(df_all)
+    # guardar
+    Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+    with stage("write", station=est, rows_in=len(df_all)) as st:
+        df_all.to_csv(out_csv, index_label="fecha", encoding="utf-8")
+        st.wrote(out_csv)
+    log(f"Guardado CSV final: {out_csv}")
+    return df_all
+
+
+def resume_filename(est, start_date, end_date):
+    return f"aemet_{est}_{start_date.year}_{end_date.year}_resume.csv"
+
+
+def download_stations(stations, start_date, end_date, out_dir=RAW_AEMET_DIR, months_chunk=3, **kwargs):
+    """
+    Download several stations one after another; ``stations`` holds codes or
+    (code, output file name) pairs. Failures are reported and skipped.
+    Returns {code: rows} for the stations that finished.
+    """
+    done = {}
+    for item in stations:
+        est, out = item if isinstance(item, (tuple, list)) else (item, resume_filename(item, start_date, end_date))
+        out = Path(out_dir) / out
+        print("===== INICIANDO ESTACION:", est, "->", out, "=====")
+        try:
+            with stage("download_station", station=est) as st:
+                df = download_full_station_resume(est, start_date, end_date, out, months_chunk=months_chunk, **kwargs)
+                st.rows_out = len(df)
+            print("DONE:", est, "rows:", len(df))
+            done[est] = len(df)
+        except Exception as e:
+            print("ERROR en", est, e)
+            # continuar con la siguiente
+    return done
+
+
+def download_observations(stations, root=None, api_key=None, base_url=OBS_META, log=None):
+    """
+    Fetch the latest sub-daily observations of each station (AEMET serves
+    the last 24 h) and append them to the sub-daily store. Run it at least
+    daily to build up a record. Returns {code: new rows}.
+    """
+    from .clean import clean_observations
+    from .subdaily import SUBDAILY_DIR, write_observations
+
+    log = log or make_logger()
+    root = SUBDAILY_DIR if root is None else root
+    now = datetime.now(timezone.utc)
+    done = {}
+    for est in stations:
+        try:
+            with stage("download_observations", station=est) as st:
+                # the URL template only uses {est}; the dates are ignored
+                arr = fetch_metadata_and_data_with_rate_handling(est, now, now, api_key=api_key,
+                                                                 base_url=base_url, log=log)
+                df = clean_observations(arr or [])
+                st.rows_out = len(df)
+            done[est] = write_observations(df, root)
+            log(f"Observaciones {est}: {len(df)} filas, {done[est]} nuevas")
+        except Exception as e:
+            log(f"ERROR observaciones {est}: {e}")
+    return done
@@ -0,0 +1,190 @@
+# src/uhi/annual.py
+"""
+Materialized annual metrics shared by the notebooks.
+
+The daily AEMET files are aggregated once into a long table
+(indicativo, nombre, year, variable, value, n_days, completeness) stored in
+Parquet. ``annual_frame`` rebuilds the wide per-notebook frames
+(``annual_temp``, ``annual_hr``, ...) from that table with the same valid-year
+rules each notebook used, and ``compute_uhi`` gives the annual UHI series.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import PROC_DIR, RAW_AEMET_DIR
+
+ANNUAL_PATH = PROC_DIR / "annual_metrics.parquet"
+
+DAILY_VARS = ["tmed", "tmin", "tmax", "prec", "sol", "velmedia", "racha",
+              "hrMedia", "presMax", "presMin"]
+
+# name: (variables, min_days, reference variable for the valid-year count)
+# reference None -> each variable is filtered on its own count (as analisi_sol)
+PRESETS = {
+    "annual_temp": (["tmed", "tmax", "tmin"], 250, "tmed"),
+    "annual_hr": (["hrMedia"], 250, "hrMedia"),
+    "annual_press": (["presMax", "presMin"], 200, "tmin"),
+    "annual_sol": (["sol"], 200, None),
+    "annual_vars": (["tmin", "tmax", "tmed", "hrMedia", "sol", "presMax", "presMin", "ATD"], 300, "tmin"),
+}
+
+
+# --- daily input ---
+def read_station_daily(path):
+    """Read one daily station CSV (as written by download_aemet_resume)."""
+    path = Path(path)
+    df = pd.read_csv(path, low_memory=False)
+    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    df = df.dropna(subset=["fecha"])
+    for c in DAILY_VARS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c].astype(str).str.replace(",", "."), errors="coerce")
+    if "indicativo" not in df.columns or df["indicativo"].isna().all():
+        # aemet_<indicativo>_1980_2025_resume.csv
+        parts = path.stem.split("_")
+        df["indicativo"] = parts[1] if len(parts) > 1 else path.stem
+    df["indicativo"] = df["indicativo"].ffill().bfill().astype(str)
+    if "nombre" not in df.columns:
+        df["nombre"] = df["indicativo"]
+    # gap days added by the reindex have no metadata: use the station's name
+    names = df.groupby("indicativo")["nombre"].agg(lambda s: s.dropna().mode().iat[0] if s.notna().any() else None)
+    df["nombre"] = df["indicativo"].map(names).fillna(df["indicativo"])
+    return df
+
+
+def annual_from_daily(daily):
+    """Aggregate a daily frame (fecha, indicativo, nombre, vars) to the long table."""
+    variables = [c for c in DAILY_VARS if c in daily.columns]
+    d = daily[["fecha", "indicativo", "nombre"] + variables]
+    d = d.drop_duplicates(subset=["indicativo", "fecha"], keep="first")
+    year = d["fecha"].dt.year.rename("year")
+    g = d.groupby([d["indicativo"], d["nombre"], year], observed=True)[variables]
+    means = g.mean().stack(future_stack=True).rename("value")
+    counts = g.count().stack(future_stack=True).rename("n_days")
+    out = pd.concat([means, counts], axis=1).reset_index()
+    out = out.rename(columns={out.columns[3]: "variable"})
+    days_in_year = np.where(pd.to_datetime(out["year"].astype(str) + "-12-31").dt.is_leap_year, 366, 365)
+    out["completeness"] = out["n_days"] / days_in_year
+    return _typed(out)
+
+
+def _typed(table):
+    table = table.copy()
+    table["indicativo"] = table["indicativo"].astype("category")
+    table["nombre"] = table["nombre"].astype("category")
+    table["variable"] = table["variable"].astype("category")
+    table["year"] = table["year"].astype("int16")
+    table["value"] = table["value"].astype("float32")
+    table["n_days"] = table["n_days"].astype("int16")
+    table["completeness"] = table["completeness"].astype("float32")
+    return table[["indicativo", "nombre", "year", "variable", "value", "n_days", "completeness"]]
+
+
+# --- build / persist ---
+def build_annual_table(raw_dir=RAW_AEMET_DIR, out_path=ANNUAL_PATH):
+    files = sorted(Path(raw_dir).glob("*.csv"))
+    if not files:
+        raise FileNotFoundError(f"No hay CSV diarios en {raw_dir}")
+    parts = [annual_from_daily(read_station_daily(p)) for p in files]
+    table = pd.concat(parts, ignore_index=True)
+    # same station in several files: keep the most complete aggregate
+    table = (table.sort_values("n_days", ascending=False)
+                  .drop_duplicates(subset=["indicativo", "year", "variable"], keep="first")
+                  .sort_values(["indicativo", "variable", "year"])
+                  .reset_index(drop=True))
+    table = _typed(table)
+    if out_path is not None:
+        out_path = Path(out_path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        table.to_parquet(out_path, index=False)
+    return table
+
+
+def update_annual_table(paths, since, path=ANNUAL_PATH):
+    """
+    Recompute the rows of the stations in ``paths`` (daily CSVs) for the
+    years from ``since`` on, leaving the earlier years as they are.
+    """
+    path = Path(path)
+    table = pd.read_parquet(path)
+    y0 = pd.Timestamp(since).year
+    parts = []
+    for p in paths:
+        daily = read_station_daily(p)
+        parts.append(annual_from_daily(daily[daily["fecha"].dt.year >= y0]))
+    fresh = pd.concat(parts, ignore_index=True)
+    stale = table["indicativo"].isin(fresh["indicativo"].unique()) & (table["year"] >= y0)
+    table = (pd.concat([table[~stale].astype({c: str for c in ("indicativo", "nombre", "variable")}),
+                        fresh.astype({c: str for c in ("indicativo", "nombre", "variable")})], ignore_index=True)
+               .sort_values(["indicativo", "variable", "year"])
+               .reset_index(drop=True))
+    table = _typed(table)
+    table.to_parquet(path, index=False)
+    return table
+
+
+def load_annual_table(path=ANNUAL_PATH, raw_dir=RAW_AEMET_DIR, rebuild=False):
+    """Read the annual table; rebuild it when a daily CSV is newer than it."""
+    path = Path(path)
+    if not rebuild and path.exists():
+        newest = max((p.stat().st_mtime for p in Path(raw_dir).glob("*.csv")), default=0)
+        if newest <= path.stat().st_mtime:
+            return pd.read_parquet(path)
+    return build_annual_table(raw_dir, path)
+
+
+# --- notebook-facing API ---
+def annual_frame(variables=None, min_days=250, ref="tmin", table=None, preset=None):
+    """
+    Wide annual frame (nombre, year, <variables>) like the notebooks' annual_*.
+
+    Station-years are kept when the reference variable has at least
+    ``min_days`` valid days; with ``ref=None`` every variable uses its own
+    count. ``preset`` takes the settings of one notebook (see PRESETS).
+    ATD (tmax - tmin) is added when both temperatures are requested.
+    """
+    if preset is not None:
+        variables, min_days, ref = PRESETS[preset]
+    if table is None:
+        table = load_annual_table()
+    variables = list(variables or DAILY_VARS)
+    base = [v for v in variables if v != "ATD"]
+    if "ATD" in variables:
+        base += [v for v in ("tmin", "tmax") if v not in base]
+
+    t = table[table["variable"].isin(base)]
+    if ref is None:
+        t = t[t["n_days"] >= min_days]
+    else:
+        ok = table.loc[(table["variable"] == ref) & (table["n_days"] >= min_days), ["indicativo", "year"]]
+        t = t.merge(ok, on=["indicativo", "year"])
+
+    wide = t.pivot_table(index=["nombre", "year"], columns="variable", values="value",
+                         observed=True, aggfunc="first")
+    wide = wide.reindex(columns=[v for v in base if v in wide.columns])
+    wide.columns.name = None
+    wide = wide.reset_index().astype({"nombre": str})
+    wide[wide.columns[2:]] = wide[wide.columns[2:]].astype("float64")
+
+    if "ATD" in variables and {"tmin", "tmax"} <= set(wide.columns):
+        wide["ATD"] = wide["tmax"] - wide["tmin"]
+    if ref is None and len(base) == 1:
+        n = t[["nombre", "year", "n_days"]].astype({"nombre": str})
+        wide = wide.merge(n.rename(columns={"n_days": f"n_days_with_{base[0]}"}), on=["nombre", "year"])
+    return wide.sort_values(["nombre", "year"]).reset_index(drop=True)
+
+
+def compute_uhi(annual_df, urban_station, rural_station="MONTSERRAT"):
+    """Annual UHI = tmin_urb - tmin_rur on the years both stations are valid."""
+    urb = annual_df[annual_df["nombre"] == urban_station][["year", "tmin"]].rename(columns={"tmin": "tmin_urb"})
+    rur = annual_df[annual_df["nombre"] == rural_station][["year", "tmin"]].rename(columns={"tmin": "tmin_rur"})
+    merged = pd.merge(urb, rur, on="year", how="inner")
+    merged["UHI"] = merged["tmin_urb"] - merged["tmin_rur"]
+    merged["station"] = urban_station
+    return merged
+
+
+def uhi_series(urban_station, rural_station="MONTSERRAT", preset="annual_vars", table=None):
+    return compute_uhi(annual_frame(preset=preset, table=table), urban_station, rural_station)
@@ -0,0 +1,272 @@
+# src/uhi/arrays.py
+"""
+Dense station-by-day array backend.
+
+One ``<variable>.npy`` per variable, shaped [stations x days] (float32, NaN =
+missing), plus ``index.json`` with the station codes and the first date.
+Files are opened with ``np.load(mmap_mode="r")`` so row/day slices are views
+on the page cache: no DataFrame copies, and several worker processes reading
+the same store share the same pages.
+
+Kernels below (UHI, composites, rolling means, correlations) work on plain
+arrays, so they accept either store slices or in-memory data.
+"""
+import json
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import PROC_DIR
+
+ARRAYS_DIR = PROC_DIR / "arrays"
+INDEX_NAME = "index.json"
+
+
+# --- build ---
+def station_columns(df, var):
+    """{indicativo: column} for the ``<var>_<indicativo>`` columns of a wide frame."""
+    prefix = f"{var}_"
+    out = {}
+    for c in df.columns:
+        if c.startswith(prefix):
+            code = c[len(prefix):]
+            # skip composites such as tmin_rural_median
+            if "_" not in code:
+                out[code] = c
+    return out
+
+
+def create_array_store(root, codes, start, n_days, variables, fill_rows=64):
+    """
+    Empty (all-NaN) store for ``codes`` x ``n_days`` days from ``start``,
+    to be filled with ``write_array_block``. Rows are initialised a few at a
+    time so creating a large store does not need it in memory.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    for var in variables:
+        arr = np.lib.format.open_memmap(root / f"{var}.npy", mode="w+", dtype=np.float32,
+                                        shape=(len(codes), n_days))
+        for i in range(0, len(codes), fill_rows):
+            arr[i:i + fill_rows] = np.nan
+        arr.flush()
+        del arr
+    with open(root / INDEX_NAME, "w", encoding="utf-8") as f:
+        json.dump({"stations": list(codes), "start": str(pd.Timestamp(start).date()), "n_days": int(n_days),
+                   "variables": list(variables), "dtype": "float32"}, f, indent=2)
+    return ArrayStore(root)
+
+
+def write_array_block(root, df, variables=None):
+    """
+    Write the ``<var>_<code>`` columns of a wide frame into an existing store
+    at the positions of its dates. Disjoint date blocks can be written by
+    different processes at the same time.
+    """
+    store = ArrayStore(root)
+    pos = (pd.DatetimeIndex(df.index) - store.start).days.to_numpy()
+    ok = (pos >= 0) & (pos < store.n_days)
+    for var in variables or store.variables:
+        cols = station_columns(df, var)
+        if not cols:
+            continue
+        arr = np.load(store.root / f"{var}.npy", mmap_mode="r+")
+        for code, col in cols.items():
+            if code in store.station_index:
+                arr[store.station_index[code], pos[ok]] = df[col].to_numpy(dtype="float32", na_value=np.nan)[ok]
+        arr.flush()
+        del arr
+    return store
+
+
+def extend_array_store(root, end, fill_rows=64):
+    """
+    Grow every variable of a store so it covers the days up to ``end``
+    (new days NaN). Rows are copied a few at a time.
+    """
+    store = ArrayStore(root)
+    n_days = (pd.Timestamp(end) - store.start).days + 1
+    if n_days <= store.n_days:
+        return store
+    for var in store.variables:
+        path = store.root / f"{var}.npy"
+        tmp = path.with_name(f"{var}.tmp.npy")
+        src = np.load(path, mmap_mode="r")
+        dst = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(len(store.codes), n_days))
+        for i in range(0, len(store.codes), fill_rows):
+            dst[i:i + fill_rows, :store.n_days] = src[i:i + fill_rows]
+            dst[i:i + fill_rows, store.n_days:] = np.nan
+        dst.flush()
+        del src, dst
+        tmp.replace(path)
+    with open(store.root / INDEX_NAME, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["n_days"] = int(n_days)
+    with open(store.root / INDEX_NAME, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return ArrayStore(root)
+
+
+def build_array_store(df, root=ARRAYS_DIR, variables=("tmin", "tmax", "tmed", "velmedia", "prec",
+                                                     "sol", "hrMedia", "presMax", "presMin")):
+    """Write a wide merged frame (DatetimeIndex, ``<var>_<code>`` columns) as a store."""
+    dates = pd.DatetimeIndex(df.index)
+    variables = [v for v in variables if station_columns(df, v)]
+    codes = sorted({code for v in variables for code in station_columns(df, v)})
+    n_days = (dates.max() - dates.min()).days + 1
+    create_array_store(root, codes, dates.min(), n_days, variables)
+    return write_array_block(root, df, variables)
+
+
+# --- read ---
+class ArrayStore:
+    """Read-only, memory-mapped view of an array store directory."""
+
+    def __init__(self, root=ARRAYS_DIR):
+        self.root = Path(root)
+        with open(self.root / INDEX_NAME, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.codes = list(meta["stations"])
+        self.variables = list(meta["variables"])
+        self.start = pd.Timestamp(meta["start"])
+        self.n_days = int(meta["n_days"])
+        self.station_index = {c: i for i, c in enumerate(self.codes)}
+        self._arrays = {}
+
+    @property
+    def dates(self):
+        return pd.date_range(self.start, periods=self.n_days, freq="D")
+
+    def var(self, name):
+        """[stations x days] memmap for one variable."""
+        if name not in self._arrays:
+            if name not in self.variables:
+                raise KeyError(f"Variable no disponible en el store: {name}")
+            self._arrays[name] = np.load(self.root / f"{name}.npy", mmap_mode="r")
+        return self._arrays[name]
+
+    def days(self, start=None, end=None):
+        """Slice of day positions for [start, end] (inclusive dates)."""
+        i0 = 0 if start is None else max((pd.Timestamp(start) - self.start).days, 0)
+        i1 = self.n_days if end is None else min((pd.Timestamp(end) - self.start).days + 1, self.n_days)
+        return slice(i0, max(i1, i0))
+
+    def row(self, name, code, start=None, end=None):
+        """1-D view of one station (no copy)."""
+        return self.var(name)[self.station_index[code], self.days(start, end)]
+
+    def rows(self, name, codes, start=None, end=None):
+        idx = [self.station_index[c] for c in codes]
+        arr = self.var(name)
+        if idx and idx == list(range(idx[0], idx[-1] + 1)):
+            return arr[idx[0]:idx[-1] + 1, self.days(start, end)]  # contiguous -> view
+        return arr[idx, self.days(start, end)]
+
+    def to_frame(self, name, codes=None, start=None, end=None):
+        codes = list(codes or self.codes)
+        sl = self.days(start, end)
+        return pd.DataFrame(self.rows(name, codes, start, end).T,
+                            index=self.dates[sl], columns=[f"{name}_{c}" for c in codes])
+
+
+# --- kernels ---
+def uhi(store, urban, rural, var="tmin", start=None, end=None):
+    """urban - rural for one variable; ``rural`` is a code or a 1-D array."""
+    u = store.row(var, urban, start, end)
+    r = store.row(var, rural, start, end) if isinstance(rural, str) else rural
+    return np.subtract(u, r, dtype=np.float32)
+
+
+def composite(store, codes, var="tmin", how="median", start=None, end=None):
+    """Per-day median/mean over a set of stations (NaN-aware)."""
+    block = store.rows(var, codes, start, end)
+    with warnings.catch_warnings():
+        # all-NaN days -> NaN without warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if how == "median":
+            return np.nanmedian(block, axis=0).astype(np.float32)
+        return np.nanmean(block, axis=0).astype(np.float32)
+
+
+def rolling_mean(x, window, min_periods=None):
+    """Trailing rolling mean along the last axis, ignoring NaN (like pandas)."""
+    x = np.asarray(x, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    pad = [(0, 0)] * (x.ndim - 1) + [(1, 0)]
+    csum = np.pad(np.cumsum(np.where(valid, x, 0.0), axis=-1), pad)
+    ccnt = np.pad(np.cumsum(valid, axis=-1), pad)
+    lo = np.maximum(np.arange(1, x.shape[-1] + 1) - window, 0)
+    hi = np.arange(1, x.shape[-1] + 1)
+    s = csum[..., hi] - csum[..., lo]
+    n = ccnt[..., hi] - ccnt[..., lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = s / n
+    out[n < min_periods] = np.nan
+    return out.astype(np.float32)
+
+
+def nancorr(x, y, min_periods=3):
+    """Pearson r along the last axis on days where both are present."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    m = ~(np.isnan(x) | np.isnan(y))
+    n = m.sum(axis=-1)
+    xs, ys = np.where(m, x, 0.0), np.where(m, y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx, my = xs.sum(-1) / n, ys.sum(-1) / n
+        dx = np.where(m, x - mx[..., None], 0.0)
+        dy = np.where(m, y - my[..., None], 0.0)
+        r = (dx * dy).sum(-1) / np.sqrt((dx * dx).sum(-1) * (dy * dy).sum(-1))
+    return np.where(n >= min_periods, r, np.nan)
+
+
+def corr_matrix(block, min_periods=30):
+    """Station x station Pearson matrix from a [stations x days] block."""
+    x = np.asarray(block, dtype=np.float64)
+    m = (~np.isnan(x)).astype(np.float64)
+    xz = np.where(m > 0, x, 0.0)
+    n = m @ m.T
+    sx = xz @ m.T            # sum of x_i over days where j is present
+    sxx = (xz * xz) @ m.T
+    sxy = xz @ xz.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sx.T
+        var_i = n * sxx - sx * sx
+        r = cov / np.sqrt(var_i * var_i.T)
+    r[n < min_periods] = np.nan
+    return r
+
+
+def runs(mask):
+    """
+    Run-length encoding of the True runs of each row of a 2-D mask.
+    Returns (row, start, length) arrays, ordered by row then start.
+    """
+    mask = np.atleast_2d(np.asarray(mask, dtype=bool))
+    # a False column on each side so runs never join across rows
+    width = mask.shape[1] + 2
+    padded = np.zeros((mask.shape[0], width), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    d = np.diff(padded.ravel())
+    starts = np.flatnonzero(d == 1) + 1
+    ends = np.flatnonzero(d == -1) + 1
+    return starts // width, starts % width - 1, ends - starts
+
+
+def run_lengths(mask):
+    """Length of the True run each cell belongs to (0 where False), per row."""
+    mask = np.atleast_2d(np.asarray(mask, dtype=bool))
+    row, start, length = runs(mask)
+    acc = np.zeros(mask.size + 1, dtype=np.int64)
+    first = row * mask.shape[1] + start
+    acc[first] += length
+    acc[first + length] -= length
+    return np.cumsum(acc[:-1]).reshape(mask.shape)
+
+
+def nan_run_lengths(x):
+    """Length of the NaN run each cell belongs to (0 where valid), per row."""
+    return run_lengths(np.isnan(np.asarray(x, dtype=np.float64)))
@@ -0,0 +1,529 @@
+# src/uhi/attribution.py
+"""
+Multivariate attribution of UHI to meteorological and satellite drivers.
+
+discussions.ipynb correlates annual UHI with one covariate at a time
+(Pearson r against tmin, ATD, hrMedia, sol, presMax, presMin). Here UHI is
+regressed on all covariates together (OLS, ridge, lasso with
+cross-validated penalties, partial correlations), for the daily and the
+annual samples of every urban-rural pair.
+
+Nothing is refitted from the rows. A ``Design`` keeps, per CV fold, the
+weighted sufficient statistics [1 X]'W[1 X], [1 X]'Wy and y'Wy (one pass
+over the data). The training statistics of a fold are total - fold, a
+covariate subset is an index into them, and the held-out error of any
+coefficient vector is a quadratic form in the fold's statistics:
+- ridge: one eigendecomposition of the standardized Gram per covariate
+  subset (all folds at once), cached; each penalty of the path is then a
+  rescaling of the eigenvalues;
+- lasso: the exact piecewise-linear path by homotopy (LARS-lasso) on the
+  standardized Gram, interpolated at the requested penalties;
+- partial correlations of UHI with each covariate given the others, from
+  the inverse of the centered Gram, on the full sample and on every
+  training fold.
+
+Folds are whole years (``year % folds``), so autocorrelated days never sit
+on both sides of a split, and designs of several pairs with the same
+covariates can be pooled by adding their statistics (``pool``).
+"""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from .infill import flag_column
+from .stations import RURAL_CODES, URBAN_CODES, station_name
+
+FOLDS = 5
+N_LAMBDAS = 30
+LASSO_EPS = 1e-3          # smallest / largest penalty of the default lasso path
+RIDGE_RANGE = (1e-4, 1e3)
+INFILLED_WEIGHT = 0.5     # daily rows whose urban or rural tmin was gap-filled
+METHODS = ("ols", "ridge", "lasso")
+
+# discussions.ipynb (annual) and the daily variables of the merged table
+ANNUAL_COVARIATES = ["tmin", "ATD", "hrMedia", "sol", "presMax", "presMin"]
+DAILY_COVARIATES = ["velmedia", "sol", "hrMedia", "presMax", "prec", "ATD"]
+SEASONAL = ["doy_sin", "doy_cos"]
+SATELLITE_COVARIATES = ["NDVI", "NDBI"]
+
+# station name -> satellite zone (zone_uhi_map of the satellite notebook)
+STATION_ZONES = {
+    "BARCELONA, DRASSANES": "BCN_urban",
+    "BARCELONA, FABRA": "Fabra",
+    "BARCELONA AEROPUERTO": "BCN_airport",
+    "SABADELL AEROPUERTO": "Sabadell",
+    "MONTSERRAT": "Montserrat",
+}
+
+
+# --- sufficient statistics ---
+def _stats(X, y, w):
+    """Augmented weighted Gram, [1 X]'Wy and y'Wy of a block of rows."""
+    X1 = np.column_stack([np.ones(len(y)), X])
+    Xw = X1 * w[:, None]
+    return Xw.T @ X1, Xw.T @ y, float((w * y) @ y)
+
+
+def standardize(A, b):
+    """
+    Centered, unit-variance form of augmented statistics (any leading dims).
+
+    Returns (Q, c, mean, scale, ybar): Q is the weighted correlation matrix of
+    the covariates and c their covariance with y over their std, both per
+    unit weight. Constant covariates get scale 1 (and a zero coefficient).
+    """
+    n = A[..., 0, 0]
+    mean = A[..., 0, 1:] / n[..., None]
+    ybar = b[..., 0] / n
+    cov = A[..., 1:, 1:] / n[..., None, None] - mean[..., :, None] * mean[..., None, :]
+    cxy = b[..., 1:] / n[..., None] - mean * ybar[..., None]
+    scale = np.sqrt(np.clip(np.diagonal(cov, axis1=-2, axis2=-1), 0, None))
+    scale = np.where(scale > 1e-12 * (1 + np.abs(mean)), scale, 1.0)
+    Q = cov / (scale[..., :, None] * scale[..., None, :])
+    return Q, cxy / scale, mean, scale, ybar
+
+
+def quadratic_sse(theta, A, b, yy):
+    """Weighted SSE of [intercept, coefs] ``theta`` (..., L, p+1) on statistics (A, b, yy)."""
+    return (yy[..., None] - 2 * np.einsum("...lp,...p->...l", theta, b)
+            + np.einsum("...lp,...pq,...lq->...l", theta, A, theta))
+
+
+# --- penalized paths (standardized units) ---
+def ridge_path(Q, c, lambdas, eig=None):
+    """
+    Ridge coefficients (Q + lambda I)^-1 c for every penalty, shape (..., L, p).
+    ``eig`` = np.linalg.eigh(Q), reused across penalties and calls.
+    """
+    d, V = np.linalg.eigh(Q) if eig is None else eig
+    u = np.einsum("...pi,...p->...i", V, c)
+    denom = d[..., :, None] + lambdas
+    # null directions (collinear covariates, lambda = 0) are left out, as a pseudo-inverse
+    tiny = 1e-10 * np.abs(d).max(axis=-1, initial=0.0)[..., None, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(denom > tiny, u[..., :, None] / denom, 0.0)
+    return np.einsum("...pi,...il->...lp", V, t)
+
+
+def lasso_knots(Q, c, tol=1e-10):
+    """
+    Exact path of min 1/2 b'Qb - c'b + lambda*|b|_1 by homotopy (LARS-lasso).
+
+    Returns (lambdas, betas) at the knots, lambdas decreasing to 0: between
+    knots the coefficients are linear in lambda. Each step solves one system
+    in the active covariates; covariates join when their correlation with the
+    residual reaches lambda and leave when their coefficient crosses zero.
+    """
+    p = len(c)
+    beta = np.zeros(p)
+    lam = float(np.abs(c).max()) if p else 0.0
+    lams, betas = [lam], [beta.copy()]
+    if lam <= tol:
+        return np.array([lam, 0.0]), np.zeros((2, p))
+    active = np.zeros(p, dtype=bool)
+    active[np.argmax(np.abs(c))] = True
+    for _ in range(8 * p + 8):
+        a = np.flatnonzero(active)
+        corr = c - Q @ beta
+        try:
+            w = np.linalg.solve(Q[a][:, a], np.sign(corr[a]))
+        except np.linalg.LinAlgError:
+            break   # collinear active set: keep the coefficients down to 0
+        step, event = lam, None
+        inactive = np.flatnonzero(~active)
+        if len(inactive):
+            aj = Q[inactive][:, a] @ w
+            num = np.concatenate([lam - corr[inactive], lam + corr[inactive]])
+            den = np.concatenate([1 - aj, 1 + aj])
+            cand = np.divide(num, den, out=np.full(len(num), np.inf), where=den > tol)
+            cand[cand <= tol] = np.inf
+            k = int(np.argmin(cand))
+            if cand[k] < step:
+                step, event = cand[k], (True, inactive[k % len(inactive)])
+        cross = np.divide(-beta[a], w, out=np.full(len(a), np.inf), where=w != 0)
+        cross[cross <= tol] = np.inf
+        k = int(np.argmin(cross))
+        if cross[k] < step:
+            step, event = cross[k], (False, a[k])
+        beta[a] += step * w
+        lam -= step
+        if event is not None:
+            joins, j = event
+            active[j] = joins
+            if not joins:
+                beta[j] = 0.0
+        lams.append(lam)
+        betas.append(beta.copy())
+        if event is None or lam <= tol or not active.any():
+            break
+    if lams[-1] > 0:
+        lams.append(0.0)
+        betas.append(beta.copy())
+    return np.array(lams), np.array(betas)
+
+
+def lasso_path(Q, c, lambdas, knots=None):
+    """
+    Lasso coefficients at ``lambdas`` (interpolated between knots), shape
+    (..., L, p). ``knots``: lasso_knots of each leading entry, if known.
+    """
+    lambdas = np.asarray(lambdas, dtype=np.float64)
+    lead = Q.shape[:-2]
+    p = Q.shape[-1]
+    Qf, cf = Q.reshape(-1, p, p), c.reshape(-1, p)
+    if knots is None:
+        knots = [lasso_knots(Qf[i], cf[i]) for i in range(len(Qf))]
+    out = np.empty((len(Qf), len(lambdas), p))
+    for i, (lams, betas) in enumerate(knots):
+        x, betas = lams[::-1], betas[::-1]   # increasing penalties
+        lam = np.clip(lambdas, 0, x[-1])
+        j = np.clip(np.searchsorted(x, lam, side="right"), 1, len(x) - 1)
+        gap = x[j] - x[j - 1]
+        t = np.divide(lam - x[j - 1], gap, out=np.zeros(len(lam)), where=gap > 0)[:, None]
+        out[i] = betas[j - 1] * (1 - t) + betas[j] * t
+    return out.reshape(*lead, len(lambdas), p)
+
+
+# --- design ---
+class Design:
+    """
+    Weighted regression sample of one pair, kept as per-fold statistics.
+
+    ``X`` rows with a missing value, a missing y or a non-positive weight are
+    dropped; ``groups`` (e.g. the year of each row) assign the CV folds as
+    ``groups % folds``. Factorizations are cached per covariate subset.
+    """
+
+    def __init__(self, X, y, weights=None, groups=None, columns=None, folds=FOLDS, name=None):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        w = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+        groups = np.arange(len(y)) if groups is None else np.asarray(groups)
+        ok = np.isfinite(y) & np.isfinite(X).all(axis=1) & np.isfinite(w) & (w > 0)
+        X, y, w, fold = X[ok], y[ok], w[ok], groups[ok].astype(np.int64) % folds
+
+        self.name = name
+        self.columns = list(columns or [f"x{i}" for i in range(X.shape[1])])
+        self.n_rows = int(ok.sum())
+        p1 = X.shape[1] + 1
+        self.A = np.zeros((folds, p1, p1))
+        self.b = np.zeros((folds, p1))
+        self.yy = np.zeros(folds)
+        for k in range(folds):
+            m = fold == k
+            self.A[k], self.b[k], self.yy[k] = _stats(X[m], y[m], w[m])
+        self._cache = {}
+
+    @classmethod
+    def from_frame(cls, df, y, covariates, weight=None, group=None, folds=FOLDS, name=None):
+        return cls(df[covariates].to_numpy(np.float64), df[y].to_numpy(np.float64),
+                   None if weight is None else df[weight].to_numpy(np.float64),
+                   None if group is None else df[group].to_numpy(), covariates, folds, name)
+
+    @property
+    def folds(self):
+        return len(self.yy)
+
+    def _index(self, covariates):
+        if covariates is None:
+            return tuple(range(len(self.columns)))
+        missing = [c for c in covariates if c not in self.columns]
+        if missing:
+            raise KeyError(f"Covariables no disponibles en {self.name}: {missing}")
+        return tuple(self.columns.index(c) for c in covariates)
+
+    def statistics(self, covariates=None):
+        """
+        (train, held_out) statistics for a covariate subset. ``train`` stacks
+        the training sample of every fold and then the full sample (folds + 1
+        entries), ``held_out`` the folds themselves.
+        """
+        sel = np.array((0,) + tuple(i + 1 for i in self._index(covariates)))
+        A, b = self.A[:, sel[:, None], sel], self.b[:, sel]
+        tA, tb, tyy = A.sum(axis=0), b.sum(axis=0), self.yy.sum()
+        train = (np.concatenate([tA - A, tA[None]]), np.concatenate([tb - b, tb[None]]),
+                 np.append(tyy - self.yy, tyy))
+        return train, (A, b, self.yy)
+
+    def _standard(self, covariates, eig=False):
+        key = self._index(covariates)
+        if key not in self._cache:
+            (A, b, train), held = self.statistics(covariates)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # empty training folds (few groups) give NaN statistics: zeroed, left out of CV
+                std = tuple(np.nan_to_num(v) for v in standardize(A, b))
+            self._cache[key] = {"std": std, "held": held, "full": (A[-1], b[-1], train[-1]),
+                                "folds_ok": (A[:-1, 0, 0] > 0) & (held[0][:, 0, 0] > 0)}
+        entry = self._cache[key]
+        if eig and "eig" not in entry:
+            entry["eig"] = np.linalg.eigh(entry["std"][0])
+        return entry
+
+    def lambda_path(self, method, covariates=None, n=N_LAMBDAS):
+        """Default penalties, decreasing; shared by all folds (from the full sample)."""
+        if method == "ols":
+            return np.array([0.0])
+        if method == "ridge":
+            return np.geomspace(RIDGE_RANGE[1], RIDGE_RANGE[0], n)
+        c = self._standard(covariates)["std"][1][-1]
+        top = float(np.abs(c).max()) if len(c) else 0.0
+        return np.geomspace(top, top * LASSO_EPS, n) if top > 0 else np.array([0.0])
+
+    def path(self, method, lambdas, covariates=None):
+        """
+        Coefficients of every training fold and of the full sample at each
+        penalty: (theta in data units (folds+1, L, p+1), beta standardized).
+        """
+        entry = self._standard(covariates, eig=method in ("ols", "ridge"))
+        Q, c, mean, scale, ybar = entry["std"]
+        if method in ("ols", "ridge"):
+            beta = ridge_path(Q, c, lambdas, entry["eig"])
+        elif method == "lasso":
+            if "knots" not in entry:
+                entry["knots"] = [lasso_knots(Q[k], c[k]) for k in range(len(Q))]
+            beta = lasso_path(Q, c, lambdas, entry["knots"])
+        else:
+            raise ValueError(f"Método desconocido: {method} (usar {METHODS})")
+        coef = beta / scale[:, None, :]
+        intercept = ybar[:, None] - np.einsum("klp,kp->kl", coef, mean)
+        return np.concatenate([intercept[..., None], coef], axis=-1), beta
+
+    def _cv(self, method, lambdas, covariates):
+        lambdas = self.lambda_path(method, covariates) if lambdas is None else np.asarray(lambdas, float)
+        theta, beta = self.path(method, lambdas, covariates)
+        entry = self._standard(covariates)
+        A, b, yy = entry["held"]
+        ok = entry["folds_ok"]
+        sse = quadratic_sse(theta[:-1][ok], A[ok], b[ok], yy[ok])
+        # baseline: training mean of each fold
+        base = np.zeros_like(theta[:-1, :1][ok])
+        base[..., 0] = entry["std"][4][:-1][ok, None]
+        sst = quadratic_sse(base, A[ok], b[ok], yy[ok])
+        n = A[ok, 0, 0][:, None]
+        se = (sse / n).std(axis=0, ddof=1) / np.sqrt(len(n)) if len(n) > 1 else np.full(len(lambdas), np.nan)
+        return lambdas, sse.sum(axis=0) / n.sum(), se, 1 - sse.sum(axis=0) / sst.sum(axis=0), theta, beta
+
+    def cv_curve(self, method="ridge", lambdas=None, covariates=None):
+        """Cross-validated error along the penalty path (one row per lambda)."""
+        lambdas, mse, se, r2, _, _ = self._cv(method, lambdas, covariates)
+        return pd.DataFrame({"lambda": lambdas, "cv_mse": mse, "cv_se": se, "cv_r2": r2})
+
+    def fit(self, method="ridge", lambdas=None, covariates=None, rule="min"):
+        """
+        Penalty chosen by CV (``rule`` "min" or "1se") and the full-sample fit
+        there. Returns one flat dict: cv scores, in-sample R², standardized
+        coefficients ``beta_<var>`` (°C of UHI per std of the covariate) and
+        coefficients in data units ``coef_<var>``.
+        """
+        names = [self.columns[i] for i in self._index(covariates)]
+        lambdas, mse, se, r2, theta, beta = self._cv(method, lambdas, covariates)
+        best = int(np.nanargmin(mse)) if np.isfinite(mse).any() else 0
+        if rule == "1se" and np.isfinite(se[best]):
+            best = int(np.flatnonzero(mse <= mse[best] + se[best])[0])   # largest penalty within 1 SE
+        A, b, yy = self._standard(covariates)["full"]
+        base = np.zeros((1, len(b)))
+        base[0, 0] = b[0] / A[0, 0]
+        sse = quadratic_sse(theta[-1, best:best + 1], A, b, np.asarray(yy))[0]
+        sst = quadratic_sse(base, A, b, np.asarray(yy))[0]
+        row = {"design": self.name, "method": method, "covariates": "+".join(names), "n_covariates": len(names),
+               "n_rows": self.n_rows, "lambda": float(lambdas[best]), "cv_mse": float(mse[best]),
+               "cv_se": float(se[best]), "cv_r2": float(r2[best]), "r2": float(1 - sse / sst),
+               "intercept": float(theta[-1, best, 0])}
+        row.update({f"beta_{v}": float(beta[-1, best, j]) for j, v in enumerate(names)})
+        row.update({f"coef_{v}": float(theta[-1, best, j + 1]) for j, v in enumerate(names)})
+        return row
+
+    def partial_correlations(self, covariates=None, shrink=0.0):
+        """
+        Partial correlation of y with each covariate given the others, on the
+        full sample (``pcor``) and across training folds (``pcor_cv_mean``,
+        ``pcor_cv_std``), next to the bivariate ``r`` of the notebooks.
+        ``shrink`` adds a ridge to the correlation matrix before inverting.
+        """
+        names = [self.columns[i] for i in self._index(covariates)]
+        entry = self._standard(covariates)
+        Q, c, _, _, _ = entry["std"]
+        (A, b, yy), _ = self.statistics(covariates)
+        n = A[:, 0, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sy = np.sqrt(yy / n - (b[:, 0] / n) ** 2)
+            r_y = c / sy[:, None]
+        p = len(names)
+        R = np.empty(Q.shape[:-2] + (p + 1, p + 1))
+        R[..., 0, 0] = 1.0
+        R[..., 0, 1:] = R[..., 1:, 0] = r_y
+        R[..., 1:, 1:] = Q
+        R = np.nan_to_num(R) + shrink * np.eye(p + 1)
+        P = np.linalg.pinv(R)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pcor = -P[..., 0, 1:] / np.sqrt(P[..., 0, :1] * np.diagonal(P, axis1=-2, axis2=-1)[..., 1:])
+        folds = pcor[:-1][entry["folds_ok"]]
+        return pd.DataFrame({"design": self.name, "covariate": names, "r": r_y[-1], "pcor": pcor[-1],
+                             "pcor_cv_mean": folds.mean(axis=0), "pcor_cv_std": folds.std(axis=0)})
+
+
+def pool(designs, name="pooled"):
+    """Design of the union of samples with the same covariates and folds (statistics add up)."""
+    designs = list(designs)
+    first = designs[0]
+    if any(d.columns != first.columns or d.folds != first.folds for d in designs):
+        raise ValueError("Solo se pueden agrupar diseños con las mismas covariables y pliegues")
+    out = Design.__new__(Design)
+    out.name, out.columns, out._cache = name, list(first.columns), {}
+    out.n_rows = sum(d.n_rows for d in designs)
+    out.A = sum(d.A for d in designs)
+    out.b = sum(d.b for d in designs)
+    out.yy = sum(d.yy for d in designs)
+    return out
+
+
+# --- sweep ---
+def configurations(covariates, methods=METHODS, min_size=1, max_size=None):
+    """Every covariate subset x method, as dicts for ``sweep``."""
+    max_size = len(covariates) if max_size is None else max_size
+    return [{"method": m, "covariates": list(sub)}
+            for size in range(min_size, max_size + 1)
+            for sub in combinations(covariates, size)
+            for m in methods]
+
+
+def sweep(designs, configs, rule="min"):
+    """
+    Cross-validated fits of every config on every design, one row each.
+    ``designs`` is an iterable of Design; a config is a dict with ``method``
+    and optionally ``covariates`` (None = all), ``lambdas`` and ``rule``.
+    Configs missing a covariate of a design are skipped for that design.
+    """
+    rows = []
+    for design in designs:
+        for cfg in configs:
+            covs = cfg.get("covariates")
+            if covs is not None and not set(covs) <= set(design.columns):
+                continue
+            rows.append(design.fit(cfg["method"], cfg.get("lambdas"), covs, cfg.get("rule", rule)))
+    return pd.DataFrame(rows)
+
+
+# --- samples ---
+def _enough(design, label):
+    """At least 2 non-empty folds and more rows than coefficients, else [SKIP]."""
+    n_folds = int((design.A[:, 0, 0] > 0).sum())
+    if n_folds < 2 or design.n_rows <= len(design.columns) + 1:
+        print(f"[SKIP] {label}: muestra insuficiente ({design.n_rows} filas, {n_folds} pliegues, "
+              f"{len(design.columns)} covariables)")
+        return False
+    return True
+
+
+def _pairs(urbans, rurals, pairs):
+    if pairs is not None:
+        return list(pairs)
+    return [(u, r) for u in urbans for r in rurals]
+
+
+def annual_designs(table=None, pairs=None, covariates=ANNUAL_COVARIATES, satellite=None,
+                   folds=FOLDS, urbans=URBAN_CODES, rurals=RURAL_CODES):
+    """
+    Station-year designs of annual UHI (tmin_urb - tmin_rur, as compute_uhi)
+    on the urban station's annual covariates (preset ``annual_vars``), one
+    per (urban, rural) code pair with data. Rows are weighted by the smaller
+    tmin completeness of the two stations.
+
+    ``satellite``: optional per-zone table (zone, year, NDVI, NDBI, ...) as
+    built in the satellite notebook; its SATELLITE_COVARIATES for the urban
+    station's zone (STATION_ZONES) are added, leaving only satellite years.
+    """
+    from .annual import annual_frame, compute_uhi, load_annual_table
+
+    if table is None:
+        table = load_annual_table()
+    annual = annual_frame(preset="annual_vars", table=table)
+    names = table.drop_duplicates("indicativo").astype({"indicativo": str, "nombre": str})
+    names = dict(zip(names["indicativo"], names["nombre"]))
+    comp = table.loc[table["variable"] == "tmin", ["nombre", "year", "completeness"]].astype({"nombre": str})
+    comp = comp.groupby(["nombre", "year"], as_index=False)["completeness"].max()
+    covariates = list(covariates)
+    sat_cols = []
+    if satellite is not None:
+        sat_cols = [c for c in SATELLITE_COVARIATES if c in satellite.columns]
+        covariates += [c for c in sat_cols if c not in covariates]
+
+    designs = []
+    present = set(annual["nombre"])
+    for urb, rur in _pairs(urbans, rurals, pairs):
+        u_name, r_name = names.get(urb, station_name(urb)), names.get(rur, station_name(rur))
+        if u_name not in present or r_name not in present:
+            continue
+        d = compute_uhi(annual, u_name, r_name)[["year", "UHI"]]
+        d = d.merge(annual[annual["nombre"] == u_name].drop(columns="nombre"), on="year")
+        if sat_cols:
+            zone = STATION_ZONES.get(u_name)
+            sat = satellite[satellite["zone"] == zone][["year"] + sat_cols]
+            d = d.merge(sat, on="year")
+        if d.empty or not set(covariates) <= set(d.columns):
+            print(f"[SKIP] {urb} vs {rur}: sin años comunes o faltan covariables")
+            continue
+        for name, col in ((u_name, "comp_urb"), (r_name, "comp_rur")):
+            c = comp[comp["nombre"] == name].drop(columns="nombre").rename(columns={"completeness": col})
+            d = d.merge(c, on="year", how="left")
+        d["weight"] = d[["comp_urb", "comp_rur"]].min(axis=1)
+        design = Design.from_frame(d, "UHI", covariates, "weight", "year", folds, f"annual_{urb}_vs_{rur}")
+        if _enough(design, f"{urb} vs {rur}"):
+            designs.append(design)
+    return designs
+
+
+def daily_frame(df, urb, rural_col, covariates=DAILY_COVARIATES, seasonal=True):
+    """
+    Daily UHI (tmin_<urb> - rural_col) with the urban station's covariates
+    (ATD = tmax - tmin), day-of-year harmonics, year and weight columns.
+    Rows whose urban or rural tmin was gap-filled weigh INFILLED_WEIGHT.
+    """
+    urban = f"tmin_{urb}"
+    d = pd.DataFrame(index=df.index)
+    d["UHI"] = (df[urban] - df[rural_col]).astype("float64")
+    for v in covariates:
+        if v == "ATD":
+            d["ATD"] = (df[f"tmax_{urb}"] - df[urban]).astype("float64")
+        elif f"{v}_{urb}" in df.columns:
+            d[v] = df[f"{v}_{urb}"].astype("float64")
+    if seasonal:
+        angle = 2 * np.pi * (df.index.dayofyear.to_numpy() - 1) / 365.25
+        d["doy_sin"], d["doy_cos"] = np.sin(angle), np.cos(angle)
+    d["year"] = df.index.year
+    w = np.ones(len(d))
+    for col in (urban, rural_col):
+        flag = flag_column(col)
+        if flag in df.columns:
+            w[(df[flag] == 1).fillna(False).to_numpy()] = INFILLED_WEIGHT
+    d["weight"] = w
+    return d
+
+
+def daily_designs(df, urbans=URBAN_CODES, rurals=RURAL_CODES, rural_median=True,
+                  covariates=DAILY_COVARIATES, seasonal=True, folds=FOLDS):
+    """
+    Daily designs of every urban station against each rural station and the
+    rural median (wide merged table). Pairs whose urban station lacks one
+    of ``covariates`` are skipped.
+    """
+    rural_cols = [f"tmin_{r}" for r in rurals] + (["tmin_rural_median"] if rural_median else [])
+    names = list(covariates) + (SEASONAL if seasonal else [])
+    designs = []
+    for urb in urbans:
+        if f"tmin_{urb}" not in df.columns:
+            continue
+        for rural_col in rural_cols:
+            if rural_col not in df.columns:
+                continue
+            d = daily_frame(df, urb, rural_col, covariates, seasonal)
+            missing = [c for c in names if c not in d.columns]
+            if missing:
+                print(f"[SKIP] {urb} vs {rural_col}: faltan columnas {missing}")
+                continue
+            rural = rural_col.removeprefix("tmin_")
+            design = Design.from_frame(d, "UHI", names, "weight", "year", folds, f"daily_{urb}_vs_{rural}")
+            if _enough(design, f"{urb} vs {rural_col}"):
+                designs.append(design)
+    return designs
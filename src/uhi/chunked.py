@@ -0,0 +1,273 @@
+# src/uhi/chunked.py
+"""
+Out-of-core merge: the same outputs as ``uhi.merge.merge`` (infilled wide
+table, rural composites, UHI pairs, array store) computed one time block
+at a time, so peak memory depends on the number of stations and the block
+length, not on the length of the archive.
+
+1. ``split_station``: each station CSV is streamed in row chunks into
+   ``staging/<YYYY>/<code>.parquet`` (stations in parallel);
+2. infill moments (``infill.monthly_moments``) are summed over all blocks,
+   giving the same neighbour fits as the in-memory merge;
+3. every block of ``years_per_block`` years (plus ``max_gap`` days of halo,
+   so gaps crossing a block edge are measured whole) is joined, infilled,
+   given its rural composites and written straight to
+   ``merged_blocks/<start>.parquet``, the array store and per-pair Parquet
+   pieces (blocks in parallel);
+4. the pair pieces are streamed into the usual ``uhi_input_*.csv``.
+The regime bitmaps and the pre-infill ``merged_all_stations.csv`` are not
+produced in this mode.
+"""
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .arrays import create_array_store, station_columns, write_array_block
+from .config import PROC_DIR, RAW_AEMET_DIR
+from .infill import fits_from_moments, infill_frame, monthly_moments
+from .instrument import stage
+from .merge import CSV_FILES, add_rural_composites
+from .merged import enforce_schema, read_merged, write_merged
+from .pairs import PERIODS, URBANS, pair_frame, urban_rural_median_pair
+from .stations import RURAL_CODES
+
+STAGING_DIR = "staging"
+BLOCKS_DIR = "merged_blocks"
+PAIRS_DIR = "pair_blocks"
+FITS_NAME = "infill_fits.npz"
+INFILL_VARS = ("tmin", "tmax", "tmed")
+ARRAY_VARS = ("tmin", "tmax", "tmed", "velmedia", "prec", "sol", "hrMedia", "presMax", "presMin")
+CHUNK_ROWS = 50_000
+MEDIAN_URBAN = "0076"
+
+
+# --- 1) staging ---
+def split_station(path, code, staging, chunksize=CHUNK_ROWS):
+    """
+    Stream one station CSV into per-year Parquet files. Returns
+    {code, columns, first, last, rows}.
+    """
+    staging = Path(staging)
+    written, pending = set(), {}
+    columns, first, last, rows = [], None, None, 0
+
+    def flush(year):
+        df = pd.concat(pending.pop(year))
+        out = staging / f"{year:04d}" / f"{code}.parquet"
+        if year in written:  # input not in date order: year seen before
+            df = pd.concat([pd.read_parquet(out), df])
+        out.parent.mkdir(parents=True, exist_ok=True)
+        df.sort_index().to_parquet(out)
+        written.add(year)
+
+    with stage("parse", station=code) as st:
+        st.read(path)
+        reader = pd.read_csv(path, parse_dates=["fecha"], index_col="fecha", chunksize=chunksize)
+        for chunk in reader:
+            chunk = enforce_schema(chunk)
+            chunk = chunk[chunk.index.notna()]
+            if chunk.empty:
+                continue
+            columns += [c for c in chunk.columns if c not in columns]
+            first = chunk.index.min() if first is None else min(first, chunk.index.min())
+            last = chunk.index.max() if last is None else max(last, chunk.index.max())
+            rows += len(chunk)
+            years = chunk.index.year
+            for y in np.unique(years):
+                pending.setdefault(int(y), []).append(chunk[years == y])
+            # sorted files: every year before the newest one is complete
+            for y in [y for y in pending if y < years.max()]:
+                flush(y)
+        for y in list(pending):
+            flush(y)
+        st.rows_out = rows
+    return {"code": code, "columns": columns, "first": first, "last": last, "rows": rows}
+
+
+def read_block(staging, layout, start, end, variables=None):
+    """
+    Wide frame (``<col>_<code>``) of all stations for [start, end]; the
+    columns are always ``layout_columns(layout)`` (restricted to
+    ``variables`` when given) so blocks line up.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    staging = Path(staging)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if variables is not None:
+        layout = {code: [c for c in cols if c in variables] for code, cols in layout.items()}
+    frames = []
+    for code, cols in layout.items():
+        if not cols:
+            continue
+        parts = [pq.read_table(p, columns=cols + ["fecha"]) for y in range(start.year, end.year + 1)
+                 if (p := staging / f"{y:04d}" / f"{code}.parquet").exists()]
+        if not parts:
+            continue
+        # one pandas conversion per station, not per yearly file
+        df = pa.concat_tables(parts, promote_options="permissive").to_pandas().loc[start:end]
+        frames.append(df.rename(columns={c: f"{c}_{code}" for c in df.columns}))
+    wide = pd.concat(frames, axis=1).sort_index() if frames else pd.DataFrame(index=pd.DatetimeIndex([]))
+    wide = wide.reindex(columns=layout_columns(layout))
+    wide.index.name = "fecha"
+    return enforce_schema(wide)
+
+
+def layout_columns(layout):
+    return [f"{c}_{code}" for code, cols in layout.items() for c in cols]
+
+
+def blocks(first, last, years_per_block=1):
+    """[(start, end)] calendar-year blocks covering [first, last]."""
+    return [(max(pd.Timestamp(f"{y}-01-01"), first), min(pd.Timestamp(f"{y + years_per_block - 1}-12-31"), last))
+            for y in range(first.year, last.year + 1, years_per_block)]
+
+
+# --- 2) infill fits ---
+def _block_moments(staging, layout, start, end):
+    df = read_block(staging, layout, start, end, variables=INFILL_VARS)
+    months = pd.DatetimeIndex(df.index).month.to_numpy() - 1
+    out = {}
+    for var in INFILL_VARS:
+        cols = station_columns(df, var)
+        if len(cols) >= 2:
+            block = np.vstack([df[c].to_numpy(dtype="float32", na_value=np.nan) for c in cols.values()])
+            out[var] = monthly_moments(block, months)
+    return out
+
+
+# --- 3) blocks ---
+def _merge_block(staging, layout, start, end, out_dir, fits_path, max_gap, rural, pairs, median_urban):
+    out_dir = Path(out_dir)
+    margin = pd.Timedelta(days=max_gap)
+    df = read_block(staging, layout, start - margin, end + margin)
+    infilled = 0
+    if fits_path is not None:
+        with np.load(fits_path) as z:
+            fits = {var: (z[f"{var}_a"], z[f"{var}_b"], z[f"{var}_w"]) for var in INFILL_VARS if f"{var}_a" in z}
+        df = infill_frame(df, INFILL_VARS, max_gap=max_gap, fits=fits, verbose=False)
+    block = df.loc[start:end].copy()
+    del df
+    if fits_path is not None:
+        infilled = int(sum((block[c] == 1).sum() for c in block.columns if c.endswith("_flag")))
+
+    block = add_rural_composites(block, rural)
+    if f"tmin_{median_urban}" in block.columns:
+        block[f"UHI_tmin_{median_urban}_vs_ruralMedian"] = block[f"tmin_{median_urban}"] - block["tmin_rural_median"]
+
+    name = f"{start:%Y%m%d}.parquet"
+    with stage("write", rows_in=len(block), target="block", start=str(start.date())) as st:
+        st.wrote(write_merged(block, out_dir / BLOCKS_DIR / name))
+        write_array_block(out_dir / "arrays", block)
+        for out_name, urb, rural_col, date_slice in pairs:
+            if pd.Timestamp(date_slice[0]) > end or pd.Timestamp(date_slice[1]) < start:
+                continue
+            d, _ = pair_frame(block, urb, rural_col, date_slice)
+            if d is not None and len(d):
+                _write_piece(d, out_dir / PAIRS_DIR / out_name / name)
+        if f"tmin_{median_urban}" in block.columns:
+            _write_piece(urban_rural_median_pair(block, median_urban),
+                         out_dir / PAIRS_DIR / f"uhi_input_{median_urban}_ruralMedian" / name)
+    return {"start": str(start.date()), "rows": len(block), "infilled": infilled}
+
+
+def _write_piece(df, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path)
+
+
+def _run(fn, args, workers):
+    """Yield ``fn(*a)`` for each tuple of ``args`` in order (process pool when workers > 1)."""
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            yield from ex.map(fn, *zip(*args))
+    else:
+        for a in args:
+            yield fn(*a)
+
+
+# --- 4) outputs ---
+def concat_pieces(piece_dir, out_csv):
+    """Append the per-block pieces of one pair to a CSV, one piece at a time."""
+    pieces = sorted(Path(piece_dir).glob("*.parquet"))
+    with stage("write", file=Path(out_csv).name, pieces=len(pieces)) as st:
+        for i, p in enumerate(pieces):
+            pd.read_parquet(p).to_csv(out_csv, mode="w" if i == 0 else "a", header=i == 0, index=True)
+        st.wrote(out_csv)
+    return out_csv
+
+
+def iter_blocks(out_dir=PROC_DIR, columns=None):
+    """Yield the merged blocks in date order (each a typed wide frame)."""
+    for p in sorted((Path(out_dir) / BLOCKS_DIR).glob("*.parquet")):
+        yield read_merged(p, columns=columns)
+
+
+def merge_chunked(files=CSV_FILES, data_dir=RAW_AEMET_DIR, out_dir=PROC_DIR, infill=True, max_gap=5,
+                  years_per_block=1, workers=1, rural=RURAL_CODES, urbans=URBANS, periods=PERIODS,
+                  median_urban=MEDIAN_URBAN, keep_staging=False):
+    """
+    Out-of-core equivalent of ``merge.merge``. Returns a summary dict
+    (stations, blocks, rows, infilled values).
+    """
+    out_dir = Path(out_dir)
+    staging = out_dir / STAGING_DIR
+    for d in (staging, out_dir / BLOCKS_DIR, out_dir / PAIRS_DIR):
+        shutil.rmtree(d, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    # 1) split every station into yearly partitions
+    codes = [Path(f).name.split("_")[1] for f in files]
+    infos = _run(split_station, [(Path(data_dir) / f, c, staging) for f, c in zip(files, codes)], workers)
+    infos = [i for i in infos if i["rows"]]
+    layout = {i["code"]: i["columns"] for i in infos}
+    first, last = min(i["first"] for i in infos), max(i["last"] for i in infos)
+    spans = blocks(first, last, years_per_block)
+    print(f"Staging: {len(layout)} estaciones, {first.date()} -> {last.date()}, {len(spans)} bloques")
+
+    # 2) neighbour fits from moments summed over all blocks
+    fits_path = None
+    if infill:
+        with stage("infill_fits", blocks=len(spans)):
+            total = {}
+            # summed as the blocks finish: one block of moments in memory at a time
+            for part in _run(_block_moments, [(staging, layout, s, e) for s, e in spans], workers):
+                for var, m in part.items():
+                    if var in total:
+                        total[var] += m
+                    else:
+                        total[var] = m
+            arrays = {}
+            for var, m in total.items():
+                a, b, w = fits_from_moments(m)
+                arrays.update({f"{var}_a": a, f"{var}_b": b, f"{var}_w": w})
+            fits_path = staging / FITS_NAME
+            np.savez(fits_path, **arrays)
+
+    # 3) blocks -> merged Parquet pieces, array store, pair pieces
+    all_cols = layout_columns(layout)
+    array_vars = [v for v in ARRAY_VARS if any(c.startswith(f"{v}_") for c in all_cols)]
+    array_codes = sorted({code for code, cols in layout.items() if any(v in cols for v in array_vars)})
+    create_array_store(out_dir / "arrays", array_codes, first, (last - first).days + 1, array_vars)
+    available = set(all_cols) | {"tmin_rural_median"}
+    pairs = [(f"uhi_input_{urb}_{suffix}", urb, rural_col, date_slice)
+             for rural_col, suffix, date_slice in periods for urb in urbans
+             if {f"tmin_{urb}", f"velmedia_{urb}", rural_col} <= available]
+    args = [(staging, layout, s, e, out_dir, fits_path, max_gap, rural, pairs, median_urban) for s, e in spans]
+    results = list(_run(_merge_block, args, workers))
+
+    # 4) pair CSVs
+    for piece_dir in sorted((out_dir / PAIRS_DIR).glob("*")):
+        concat_pieces(piece_dir, out_dir / f"{piece_dir.name}.csv")
+        print(f"Guardado {piece_dir.name}.csv")
+
+    if not keep_staging:
+        shutil.rmtree(staging, ignore_errors=True)
+    summary = {"stations": len(layout), "blocks": len(results), "rows": sum(r["rows"] for r in results),
+               "infilled": sum(r["infilled"] for r in results)}
+    print(f"✅ Merge por bloques: {summary}")
+    return summary
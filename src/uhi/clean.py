@@ -0,0 +1,265 @@
+# src/uhi/clean.py
+"""
+Cleaning of raw AEMET downloads (CSV, JSON array or the malformed "dump"
+with doubled quotes) into a tidy daily table stored as Parquet, and of
+sub-daily ``observacion/convencional`` records into the long table used by
+``uhi.subdaily``.
+"""
+import io
+import json
+import re
+from pathlib import Path
+
+import pandas as pd
+
+from .config import PROC_DIR
+from .instrument import stage
+
+CLEAN_DIR = PROC_DIR / "aemet"
+KEEP = ("fecha", "indicativo", "nombre", "provincia", "altitud", "tmed", "tmin", "tmax", "prec", "racha", "sol")
+NUMERIC = ("tmed", "tmin", "tmax", "prec", "racha", "sol", "altitud")
+
+def to_float(s):
+    if pd.isna(s):
+        return pd.NA
+    s = str(s).strip()
+    if s.lower() == "ip":  # precip inapreciable
+        return 0.0
+    s = s.replace(",", ".")
+    try:
+        return float(s)
+    except ValueError:
+        return pd.NA
+
+# --- 1) Lecturas "normales" ---
+def read_as_csv_std(path: Path):
+    try:
+        df = pd.read_csv(path)
+        return df
+    except Exception:
+        return None
+
+def read_as_csv_aemet(path: Path):
+    try:
+        txt = path.read_text(encoding="utf-8", errors="ignore")
+        df = pd.read_csv(io.StringIO(txt), sep=";", decimal=",")
+        return df
+    except Exception:
+        return None
+
+def read_as_json_array(path: Path):
+    try:
+        txt = path.read_text(encoding="utf-8", errors="ignore").strip()
+        # JSON correcto
+        if txt.startswith("[") and txt.endswith("]"):
+            return pd.DataFrame(json.loads(txt))
+    except Exception:
+        pass
+    return None
+
+# --- 2) Parser para “dump” raro con comillas duplicadas ---
+def read_weird_dump(path: Path):
+    txt = path.read_text(encoding="utf-8", errors="ignore").strip()
+    if not txt:
+        return None
+
+    # Limpia comillas duplicadas: "" -> "
+    t = txt.replace('""', '"')
+
+    # Quita posibles comas sueltas antes de llaves de cierre
+    t = re.sub(r',\s*}', '}', t)
+    t = re.sub(r',\s*]', ']', t)
+
+    # Si es array con objetos, intenta separar manualmente
+    # Normalizamos a algo tipo [{...},{...}]
+    # 1) Quita encabezados/colas extrañas
+    t = t.lstrip(' ,\n\r\t')
+    t = t.rstrip(' ,\n\r\t')
+
+    # Si no empieza por '[' pero parece lista de objetos, intenta envolver
+    if not t.startswith("["):
+        if t.startswith("{") and t.endswith("}"):
+            t = f"[{t}]"
+
+    # Intenta trocear objetos a mano
+    # Quitamos la cabecera '[' y la cola ']'
+    if t.startswith("[") and t.endswith("]"):
+        inner = t[1:-1]
+    else:
+        inner = t
+
+    # Dividimos por "},{" aproximado (tolerante a espacios)
+    parts = re.split(r'\}\s*,\s*\{', inner)
+    recs = []
+    for i, p in enumerate(parts):
+        # reconstruye llaves
+        p_obj = p
+        if not p_obj.strip().startswith("{"):
+            p_obj = "{" + p_obj
+        if not p_obj.strip().endswith("}"):
+            p_obj = p_obj + "}"
+
+        # Extrae pares "clave":"valor" (solo comillas dobles)
+        pairs = re.findall(r'"([^"]+)"\s*:\s*"([^"]*)"', p_obj)
+        if not pairs:
+            # Si falla, intenta limpiar aún más espacios/quotes
+            p_clean = re.sub(r'\s+"', '"', p_obj)
+            pairs = re.findall(r'"([^"]+)"\s*:\s*"([^"]*)"', p_clean)
+        if pairs:
+            recs.append(dict(pairs))
+
+    if recs:
+        return pd.DataFrame(recs)
+    return None
+
+def read_aemet_any(path: Path) -> pd.DataFrame:
+    # Orden de intentos: CSV std -> JSON -> CSV AEMET -> weird dump
+    for reader in (read_as_csv_std, read_as_json_array, read_as_csv_aemet, read_weird_dump):
+        df = reader(path)
+        if df is not None and len(df) > 0:
+            return df
+    raise RuntimeError("No se pudo interpretar el archivo con ningún parser.")
+
+def clean_df(df: pd.DataFrame) -> pd.DataFrame:
+    # normaliza nombres
+    df.columns = [c.strip().lower() for c in df.columns]
+
+    # intenta detectar una columna de fecha por nombre o por patrón de valores
+    date_col = None
+    # 1) por nombre típico
+    for cand in ("fecha","fechao","date","fecha_observacion"):
+        if cand in df.columns:
+            date_col = cand
+            break
+    # 2) por patrón YYYY-MM-DD
+    if date_col is None:
+        for c in df.columns:
+            serie = df[c].astype(str).str.strip()
+            # detecta si >80% de valores parecen YYYY-MM-DD
+            mask = serie.str.match(r"\d{4}-\d{2}-\d{2}")
+            if mask.mean(skipna=True) > 0.8:
+                date_col = c
+                break
+
+    if date_col is None:
+        # Último recurso: intenta extraer una fecha de cadenas tipo '... "fecha":"1980-01-01" ...'
+        # (cuando toda la fila es un texto)
+        if df.shape[1] == 1:
+            s = df.iloc[:,0].astype(str)
+            m = s.str.extract(r'"fecha"\s*:\s*"(\d{4}-\d{2}-\d{2})"')
+            if m[0].notna().any():   # ✅ ahora es booleano
+                df = pd.DataFrame({"fecha": m[0]})
+                date_col = "fecha"
+
+
+    if date_col is None:
+        raise ValueError("No se encuentra columna de fecha (ni por nombre ni por patrón).")
+
+    df["fecha"] = pd.to_datetime(df[date_col], errors="coerce")
+
+    # convierte numéricos
+    for col in NUMERIC:
+        if col in df.columns:
+            df[col] = df[col].map(to_float)
+
+    keep = [c for c in KEEP if c in df.columns]
+    df = df[keep].dropna(subset=["fecha"]).sort_values("fecha").reset_index(drop=True)
+    return df
+
+def parse_fallback(path):
+    """
+    Deep parse of the raw text when the readers only recovered 'fecha':
+    split into pseudo-records at each "fecha" key and pull the key/value pairs.
+    """
+    raw_txt = Path(path).read_text(encoding="utf-8", errors="ignore")
+
+    # Normaliza comillas dobles duplicadas y limpia "comas colgantes"
+    t = raw_txt.replace('""', '"')
+    t = re.sub(r',\s*}', '}', t)
+    t = re.sub(r',\s*]', ']', t)
+
+    # Divide en pseudo-registros aproximando por aparición de "fecha"
+    parts = re.split(r'(?="fecha"\s*:\s*")', t)
+
+    wanted = set(KEEP) | {"dir", "horaracha"}
+    pair_re = re.compile(r'"([^"]+)"\s*:\s*"([^"]*)"')
+
+    records = []
+    for chunk in parts:
+        pairs = dict(pair_re.findall(chunk))
+        if "fecha" in pairs:
+            # Quédate solo con las claves de interés
+            records.append({k: pairs.get(k) for k in wanted if k in pairs})
+    if not records:
+        return None
+
+    df = pd.DataFrame(records)
+    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    for col in NUMERIC:
+        if col in df.columns:
+            df[col] = df[col].map(to_float)
+    keep = [c for c in KEEP if c in df.columns]
+    return df[keep].dropna(subset=["fecha"]).sort_values("fecha").reset_index(drop=True)
+
+
+def default_output(df, inp, out_dir=CLEAN_DIR):
+    """<out_dir>/<indicativo>_daily.parquet (station from the data or the file name)."""
+    station = None
+    if "indicativo" in df.columns and df["indicativo"].notna().any():
+        station = str(df["indicativo"].dropna().iloc[0])
+    if not station:
+        station = Path(inp).stem.split("_")[0]
+    return Path(out_dir) / f"{station}_daily.parquet"
+
+
+def clean_file(inp, outp=None, out_dir=CLEAN_DIR):
+    """Parse + clean one raw AEMET file and write it to Parquet. Returns (path, df)."""
+    inp = Path(inp)
+    with stage("parse", file=inp.name) as st:
+        st.read(inp)
+        df_raw = read_aemet_any(inp)
+        st.rows_out = len(df_raw)
+    with stage("clean", rows_in=len(df_raw), file=inp.name) as st:
+        df = clean_df(df_raw)
+        st.rows_out = len(df)
+
+    # Fallback: si solo tenemos 'fecha', reintenta parseo profundo del bruto
+    if list(df.columns) == ["fecha"]:
+        deep = parse_fallback(inp)
+        if deep is not None:
+            df = deep
+
+    outp = Path(outp) if outp else default_output(df, inp, out_dir)
+    outp.parent.mkdir(parents=True, exist_ok=True)
+    with stage("write", rows_in=len(df), file=outp.name) as st:
+        df.to_parquet(outp, index=False)
+        st.wrote(outp)
+    return outp, df
+
+
+# --- sub-daily observations ---
+def clean_observations(records):
+    """
+    AEMET ``observacion/convencional`` records (list of dicts or DataFrame)
+    -> long frame: ``indicativo``, ``time`` (naive UTC) and the numeric
+    variables of ``subdaily.SCALES`` present, one row per station and time.
+    Vectorised (no per-value ``to_float``): sub-daily payloads are large.
+    """
+    from .subdaily import SCALES
+
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    if df.empty or "idema" not in df.columns or "fint" not in df.columns:
+        return pd.DataFrame(columns=["indicativo", "time"])
+    out = pd.DataFrame({
+        "indicativo": df["idema"].astype(str).str.strip(),
+        "time": pd.to_datetime(df["fint"], utc=True, format="ISO8601", errors="coerce").dt.tz_localize(None),
+    })
+    for col in SCALES:
+        if col in df.columns:
+            s = df[col]
+            if not pd.api.types.is_numeric_dtype(s):
+                s = s.astype("string").str.replace(",", ".", regex=False)
+            out[col] = pd.to_numeric(s, errors="coerce").astype("float32")
+    out = out.dropna(subset=["time"])
+    return (out.drop_duplicates(["indicativo", "time"], keep="last")
+               .sort_values(["indicativo", "time"]).reset_index(drop=True))
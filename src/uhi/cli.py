@@ -0,0 +1,247 @@
+# src/uhi/cli.py
+"""
+``uhi`` command line: one entry point for the pipeline stages.
+
+    uhi download --stations 0076 0200E
+    uhi download --subdaily            # last 24 h, hourly/10-min store
+    uhi clean data/raw/aemet/0076_raw.json
+    uhi merge
+    uhi merge --chunked --workers 4    # one year at a time, bounded memory
+    uhi pairs
+    uhi qc
+    uhi downsample                     # sub-daily store -> daily arrays
+    uhi refresh                        # daemon: new AEMET days -> derived products
+    uhi report --workers 4
+
+Only argparse and the standard library are imported here; pandas, requests,
+scipy and matplotlib are imported inside the subcommand that needs them, so
+``uhi --help`` starts instantly. Every subcommand calls a plain function of
+the package (``uhi.aemet``, ``uhi.clean``, ``uhi.merge``, ``uhi.pairs``,
+``uhi.qc``, ``uhi.refresh``, ``uhi.report``) that can be used directly from Python.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from .config import PROC_DIR, RAW_AEMET_DIR, REPORTS_DIR
+from .stations import PROJECT_CODES, PROJECT_FILES
+
+
+# --- subcommands ---
+def cmd_download(args):
+    from datetime import datetime
+
+    from .aemet import download_observations, download_stations
+
+    if args.subdaily:
+        done = download_observations(args.stations, root=args.subdaily_dir)
+        print(f"✅ Observaciones: {sum(done.values())} filas nuevas en {len(done)}/{len(args.stations)} estaciones")
+        return 0 if len(done) == len(args.stations) else 1
+
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    done = download_stations(args.stations, start, end, out_dir=args.out_dir, months_chunk=args.months_chunk)
+    print(f"✅ Estaciones completadas: {len(done)}/{len(args.stations)}")
+    return 0 if len(done) == len(args.stations) else 1
+
+
+def cmd_clean(args):
+    from .clean import clean_file
+
+    if args.out and len(args.inputs) > 1:
+        raise SystemExit("--out solo se admite con un único archivo de entrada")
+    for inp in args.inputs:
+        outp, df = clean_file(inp, args.out, out_dir=args.out_dir)
+        print(f"✅ Guardado limpio: {outp}  ({len(df)} filas)")
+    return 0
+
+
+def cmd_merge(args):
+    if args.chunked:
+        from .chunked import merge_chunked
+
+        merge_chunked(args.files, args.data_dir, args.out_dir, infill=not args.no_infill, max_gap=args.max_gap,
+                      years_per_block=args.years_per_block, workers=args.workers)
+        return 0
+    from .merge import merge
+
+    merge(args.files, args.data_dir, args.out_dir, infill=not args.no_infill, max_gap=args.max_gap)
+    return 0
+
+
+def cmd_pairs(args):
+    from .pairs import generate_pairs, load_merged, median_pair_csv
+
+    df = load_merged(args.proc_dir)
+    written = generate_pairs(args.proc_dir, urbans=args.urban, df=df)
+    if args.full_median:
+        written += [median_pair_csv(df, urb, args.proc_dir) for urb in args.urban]
+    print("Proceso completado. Archivos guardados en:", args.proc_dir, f"({len(written)})")
+    return 0
+
+
+def cmd_qc(args):
+    from .qc import qc_summary
+
+    df_res = qc_summary(args.files, args.data_dir)
+    df_res.to_csv(args.out, index=False)
+    print("\n======= RESUMEN QC–QA COMPLETADO =======\n")
+    print(df_res.to_string(index=False))
+    print("\nArchivo generado:", args.out)
+    return 0
+
+
+def cmd_downsample(args):
+    from .arrays import build_array_store
+    from .merged import write_merged
+    from .subdaily import DAILY_SPECS, daily_frame
+
+    df = daily_frame(args.root, stations=args.stations, start=args.start, end=args.end,
+                     min_coverage=args.min_coverage)
+    if df.empty:
+        raise SystemExit(f"No hay observaciones sub-diarias en {args.root}")
+    out = Path(args.out)
+    build_array_store(df, out / "arrays", variables=tuple(DAILY_SPECS))
+    path = write_merged(df, out / "daily_from_subdaily.parquet")
+    print(f"✅ {df.shape[1]} series diarias x {len(df)} días -> {out / 'arrays'}, {path.name}")
+    return 0
+
+
+def cmd_refresh(args):
+    from .aemet import API_ROOT, DAILY_PATH
+    from .refresh import refresh_once, run_daemon
+
+    kwargs = dict(stations=args.stations, raw_dir=args.raw_dir, proc_dir=args.proc_dir, today=args.today,
+                  lag_days=args.lag_days, max_gap=args.max_gap, base_url=(args.api_root or API_ROOT) + DAILY_PATH)
+    if args.once:
+        added = refresh_once(**kwargs)
+        print(f"✅ Refresco: {sum(added.values())} días nuevos en {len(added)} estaciones")
+        return 0
+    run_daemon(interval_hours=args.interval_hours, jitter=args.jitter, **kwargs)
+    return 0
+
+
+def cmd_fake_aemet(args):
+    from .fakeaemet import FakeAemet
+
+    api = FakeAemet(n_stations=args.stations, n_years=args.years, start_year=args.start_year,
+                    available_until=args.until, port=args.port)
+    print(f"API AEMET simulada en {api.root} (Ctrl-C para parar)")
+    print(f"  AEMET_API_KEY=local uhi refresh --once --api-root {api.root}")
+    try:
+        api.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_report(args):
+    from .report import render_default_report
+
+    res = render_default_report(reports_dir=args.out, workers=args.workers, force=args.force)
+    print(f"✅ Figuras: {len(res['rendered'])} dibujadas, {len(res['skipped'])} sin cambios, {len(res['empty'])} sin datos")
+    return 0
+
+
+# --- parser ---
+def build_parser():
+    ap = argparse.ArgumentParser(prog="uhi", description="Pipeline UHI-Barcelona (AEMET -> UHI).")
+    ap.add_argument("--trace", metavar="PATH", help="Guardar tiempos por etapa en PATH (JSON lines)")
+    ap.add_argument("--profile", choices=["cprofile", "pyinstrument"], help="Perfilar cada etapa")
+    sub = ap.add_subparsers(dest="command", metavar="<comando>")
+    sub.required = True
+
+    p = sub.add_parser("download", help="Descargar series diarias de AEMET OpenData (reanudable)")
+    p.add_argument("--stations", nargs="+", default=PROJECT_CODES, help="Indicativos AEMET")
+    p.add_argument("--start", default="1980-01-01")
+    p.add_argument("--end", default="2025-12-31")
+    p.add_argument("--out-dir", default=str(RAW_AEMET_DIR))
+    p.add_argument("--months-chunk", type=int, default=3)
+    p.add_argument("--subdaily", action="store_true",
+                   help="Observaciones horarias/10-min (últimas 24 h) en vez de series diarias")
+    p.add_argument("--subdaily-dir", default=str(PROC_DIR / "subdaily"))
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("clean", help="Limpiar CSV/JSON brutos de AEMET a Parquet")
+    p.add_argument("inputs", nargs="+", help="Archivos brutos")
+    p.add_argument("--out", help="Salida Parquet (un único archivo)")
+    p.add_argument("--out-dir", default=str(PROC_DIR / "aemet"))
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser("merge", help="Unir estaciones, rellenar huecos y mediana rural")
+    p.add_argument("--files", nargs="+", default=PROJECT_FILES)
+    p.add_argument("--data-dir", default=str(RAW_AEMET_DIR))
+    p.add_argument("--out-dir", default=str(PROC_DIR))
+    p.add_argument("--no-infill", action="store_true", help="No rellenar huecos cortos")
+    p.add_argument("--max-gap", type=int, default=5, help="Hueco máximo a rellenar (días)")
+    p.add_argument("--chunked", action="store_true",
+                   help="Procesar por bloques de años (memoria acotada; Parquet por bloque en merged_blocks/)")
+    p.add_argument("--years-per-block", type=int, default=1)
+    p.add_argument("--workers", type=int, default=1, help="Bloques en paralelo (con --chunked)")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser("pairs", help="Generar CSVs urbana-rural (uhi_input_*)")
+    p.add_argument("--proc-dir", default=str(PROC_DIR))
+    p.add_argument("--urban", nargs="+", default=["0200E", "0076"])
+    p.add_argument("--full-median", action="store_true",
+                   help="Añadir también uhi_input_<urb>_ruralMedian.csv (rango completo)")
+    p.set_defaults(func=cmd_pairs)
+
+    p = sub.add_parser("qc", help="Resumen QC/QA por estación")
+    p.add_argument("--files", nargs="+", default=PROJECT_FILES)
+    p.add_argument("--data-dir", default=str(RAW_AEMET_DIR))
+    p.add_argument("--out", default="QC_summary_all_stations.csv")
+    p.set_defaults(func=cmd_qc)
+
+    p = sub.add_parser("downsample", help="Agregados diarios y nocturnos del almacén sub-diario")
+    p.add_argument("--root", default=str(PROC_DIR / "subdaily"))
+    p.add_argument("--out", default=str(PROC_DIR / "subdaily_daily"))
+    p.add_argument("--stations", nargs="+", default=None)
+    p.add_argument("--start", default=None)
+    p.add_argument("--end", default=None)
+    p.add_argument("--min-coverage", type=float, default=0.75,
+                   help="Fracción mínima de la ventana con observaciones")
+    p.set_defaults(func=cmd_downsample)
+
+    p = sub.add_parser("refresh", help="Añadir los días nuevos de AEMET y actualizar los derivados (incremental)")
+    p.add_argument("--stations", nargs="+", default=PROJECT_CODES, help="Indicativos AEMET")
+    p.add_argument("--raw-dir", default=str(RAW_AEMET_DIR))
+    p.add_argument("--proc-dir", default=str(PROC_DIR))
+    p.add_argument("--once", action="store_true", help="Un solo refresco (sin planificador)")
+    p.add_argument("--interval-hours", type=float, default=24.0)
+    p.add_argument("--jitter", type=float, default=0.1, help="Variación aleatoria del intervalo (fracción)")
+    p.add_argument("--lag-days", type=int, default=4, help="Retraso de publicación de AEMET (días)")
+    p.add_argument("--max-gap", type=int, default=5, help="Hueco máximo a rellenar (días)")
+    p.add_argument("--api-root", default=None, help="Raíz de la API (p. ej. la de uhi fake-aemet)")
+    p.add_argument("--today", default=None, help="Fecha de referencia YYYY-MM-DD (pruebas)")
+    p.set_defaults(func=cmd_refresh)
+
+    p = sub.add_parser("fake-aemet", help="Servir una API AEMET sintética en localhost (pruebas)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--stations", type=int, default=8)
+    p.add_argument("--years", type=int, default=3)
+    p.add_argument("--start-year", type=int, default=2023)
+    p.add_argument("--until", default=None, help="Último día publicado (YYYY-MM-DD)")
+    p.set_defaults(func=cmd_fake_aemet)
+
+    p = sub.add_parser("report", help="Redibujar figuras de reports/ (incremental, paralelo)")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--force", action="store_true")
+    p.add_argument("--out", default=str(REPORTS_DIR))
+    p.set_defaults(func=cmd_report)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # read by uhi.instrument when each stage finishes
+    if args.trace:
+        os.environ["UHI_TRACE"] = str(Path(args.trace).resolve())
+    if args.profile:
+        os.environ["UHI_PROFILE"] = args.profile
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
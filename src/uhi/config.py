@@ -0,0 +1,28 @@
+# src/uhi/config.py
+"""
+Project paths shared by scripts, notebooks and the ``uhi`` package.
+
+The project root is, in order: the ``UHI_ROOT`` environment variable; the
+source checkout (``pip install -e .`` or running from ``src/``); otherwise
+the current directory, so a regular ``pip install .`` does not read and
+write ``data/`` inside site-packages.
+"""
+import os
+from pathlib import Path
+
+
+def project_root():
+    env = os.environ.get("UHI_ROOT")
+    if env:
+        return Path(env).expanduser().resolve()
+    checkout = Path(__file__).resolve().parents[2]
+    if (checkout / "pyproject.toml").exists():
+        return checkout
+    return Path.cwd()
+
+
+BASE_DIR = project_root()
+DATA_DIR = BASE_DIR / "data"
+RAW_AEMET_DIR = DATA_DIR / "raw" / "aemet"
+PROC_DIR = DATA_DIR / "processed"
+REPORTS_DIR = BASE_DIR / "reports"
@@ -0,0 +1,129 @@
+# src/uhi/events.py
+"""
+Extreme-event spells on station x day arrays.
+
+A spell is a run of consecutive days meeting a condition, found for all
+stations at once with ``arrays.runs`` (run-length encoding of the
+[stations x days] mask); peak and mean values per spell come from
+``np.maximum.reduceat`` / ``np.add.reduceat`` over the flattened values.
+A missing day (NaN) always ends a spell.
+
+Standard events:
+- tropical nights: tmin >= 20 °C;
+- torrid nights: tmin >= 25 °C;
+- heatwaves: tmax above the station's Jul-Aug 95th percentile of the
+  reference period for >= 3 days (AEMET-style);
+- UHI spells: urban - rural tmin above a threshold for >= N days.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .arrays import composite, runs
+from .stations import RURAL_CODES, URBAN_CODES
+
+TROPICAL_NIGHT = 20.0
+TORRID_NIGHT = 25.0
+HEATWAVE_Q = 95
+HEATWAVE_MONTHS = (7, 8)
+HEATWAVE_MIN_DAYS = 3
+HEATWAVE_REF = ("1981-01-01", "2010-12-31")
+UHI_SPELL = 3.0
+UHI_MIN_DAYS = 3
+
+CATALOGUE_COLUMNS = ["event", "station", "start", "end", "n_days", "peak", "mean"]
+
+
+def spells(values, mask, dates, names, event, min_days=1):
+    """
+    Catalogue of runs of ``mask`` lasting >= ``min_days`` (one row per spell).
+    ``values`` [rows x days] gives peak/mean; ``names`` labels the rows.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    mask = np.atleast_2d(mask) & ~np.isnan(values)
+    row, start, length = runs(mask)
+    keep = length >= min_days
+    row, start, length = row[keep], start[keep], length[keep]
+    dates = pd.DatetimeIndex(dates)
+    if len(row) == 0:
+        return pd.DataFrame(columns=CATALOGUE_COLUMNS)
+
+    # spells are disjoint, so their cells can be gathered into one flat array
+    first = np.repeat(np.cumsum(length) - length, length)
+    offs = np.arange(length.sum()) - first
+    cells = values[np.repeat(row, length), np.repeat(start, length) + offs]
+    bounds = np.cumsum(length) - length
+    peak = np.maximum.reduceat(cells, bounds)
+    mean = np.add.reduceat(cells, bounds) / length
+
+    return pd.DataFrame({
+        "event": event,
+        "station": np.asarray(names, dtype=object)[row],
+        "start": dates[start],
+        "end": dates[start + length - 1],
+        "n_days": length,
+        "peak": peak.round(2),
+        "mean": mean.round(2),
+    })
+
+
+def per_year(catalogue, days=False):
+    """Events (or event days, ``days=True``) per event x station x year of start."""
+    if catalogue.empty:
+        return pd.DataFrame(columns=["event", "station", "year", "count"])
+    c = catalogue.assign(year=catalogue["start"].dt.year)
+    agg = c.groupby(["event", "station", "year"])["n_days"]
+    out = agg.sum() if days else agg.size()
+    return out.rename("count").reset_index()
+
+
+def heatwave_thresholds(tmax, dates, q=HEATWAVE_Q, months=HEATWAVE_MONTHS, ref=HEATWAVE_REF):
+    """Per-station tmax percentile over ``months`` of the reference period."""
+    dates = pd.DatetimeIndex(dates)
+    sel = dates.month.isin(months) & (dates >= ref[0]) & (dates <= ref[1])
+    if sel.sum() == 0:  # archive outside the reference period: use all of it
+        sel = dates.month.isin(months)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(np.asarray(tmax, dtype=np.float64)[:, sel], q, axis=1)
+
+
+def detect_events(store, codes=None, start=None, end=None, urban=URBAN_CODES, rural=RURAL_CODES,
+                  uhi_threshold=UHI_SPELL, uhi_min_days=UHI_MIN_DAYS):
+    """
+    All standard events for an ``ArrayStore``.
+    Returns (catalogue, per-year counts of events and event days).
+    """
+    codes = list(codes or store.codes)
+    dates = store.dates[store.days(start, end)]
+    parts = []
+
+    if "tmin" in store.variables:
+        tmin = np.asarray(store.rows("tmin", codes, start, end), dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            parts.append(spells(tmin, tmin >= TROPICAL_NIGHT, dates, codes, "tropical_night"))
+            parts.append(spells(tmin, tmin >= TORRID_NIGHT, dates, codes, "torrid_night"))
+
+        rural_in = [c for c in rural if c in store.station_index]
+        urban_in = [c for c in urban if c in store.station_index]
+        if rural_in and urban_in:
+            ref = composite(store, rural_in, "tmin", "median", start, end)
+            u = np.asarray(store.rows("tmin", urban_in, start, end), dtype=np.float64) - ref
+            with np.errstate(invalid="ignore"):
+                parts.append(spells(u, u > uhi_threshold, dates,
+                                    [f"{c}-rural_median" for c in urban_in], "uhi_spell", uhi_min_days))
+
+    if "tmax" in store.variables:
+        tmax = np.asarray(store.rows("tmax", codes, start, end), dtype=np.float64)
+        thr = heatwave_thresholds(store.rows("tmax", codes), store.dates)
+        with np.errstate(invalid="ignore"):
+            parts.append(spells(tmax, tmax > thr[:, None], dates, codes, "heatwave", HEATWAVE_MIN_DAYS))
+
+    parts = [p for p in parts if not p.empty]
+    catalogue = (pd.concat(parts, ignore_index=True) if parts
+                 else pd.DataFrame(columns=CATALOGUE_COLUMNS))
+    counts = per_year(catalogue)
+    if not counts.empty:
+        counts["days"] = per_year(catalogue, days=True)["count"].to_numpy()
+    return catalogue, counts
@@ -0,0 +1,126 @@
+# src/uhi/fakeaemet.py
+"""
+Local stand-in for the AEMET OpenData daily-climatology API.
+
+Serves a synthetic network (``uhi.synthetic``) on 127.0.0.1 with the same
+two-step protocol as the real service: the metadata URL answers
+``{"estado": 200, "datos": <url>}`` (or ``estado`` 404 when there is
+nothing in the range) and the ``datos`` URL returns the JSON records.
+Only days up to ``available_until`` are published, so moving it forward
+simulates new days appearing; ``rate_limit_every`` answers every n-th
+metadata request with 429 to exercise the retry path. Used for end-to-end
+runs of ``uhi download`` / ``uhi refresh`` without an API key or quota::
+
+    with FakeAemet(n_years=3, start_year=2023) as api:
+        download_stations(codes, start, end, api_key="local", base_url=api.base_url)
+"""
+import bisect
+import itertools
+import json
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from .aemet import DAILY_PATH
+from .synthetic import generate_network, to_raw_records
+
+API_PREFIX = "/opendata/api"
+NO_DATA = {"descripcion": "No hay datos que satisfagan esos criterios", "estado": 404}
+
+
+class FakeAemet:
+    """Synthetic AEMET API on a background thread (context manager)."""
+
+    def __init__(self, n_stations=8, n_years=3, start_year=2023, seed=0, available_until=None,
+                 rate_limit_every=0, host="127.0.0.1", port=0):
+        self.records = {}
+        for code, df in generate_network(n_stations, n_years, start_year, seed):
+            recs = to_raw_records(df)
+            self.records[code] = (recs, [r["fecha"] for r in recs])
+        last = f"{start_year + n_years - 1}-12-31"
+        self.available_until = pd.Timestamp(available_until or last)
+        self.rate_limit_every = rate_limit_every
+        self.calls = deque(maxlen=10000)   # request paths, newest last
+        self._meta_requests = itertools.count(1)
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._thread = None
+
+    # --- data ---
+    def select(self, est, ini, fin):
+        """Records of ``est`` dated in [ini, fin] (ISO strings), up to ``available_until``."""
+        if est not in self.records:
+            return []
+        recs, fechas = self.records[est]
+        fin = min(fin, str(self.available_until.date()))
+        return recs[bisect.bisect_left(fechas, ini):bisect.bisect_right(fechas, fin)]
+
+    # --- server ---
+    @property
+    def root(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    @property
+    def base_url(self):
+        """Metadata URL template, as ``aemet.BASE_META``."""
+        return self.root + DAILY_PATH
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _handler(api):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body, headers=()):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            api.calls.append(self.path)
+            parts = self.path.strip("/").split("/")
+            if parts[-4:-3] == ["datos"]:
+                # /datos/<est>/<ini>/<fin>
+                est, ini, fin = parts[-3:]
+                return self._send(200, api.select(est, ini, fin))
+            if "fechaini" not in parts:
+                return self._send(404, {"descripcion": "Not found", "estado": 404})
+            if not self.headers.get("api_key"):
+                return self._send(401, {"descripcion": "API key invalido", "estado": 401})
+            n_meta = next(api._meta_requests)
+            if api.rate_limit_every and n_meta % api.rate_limit_every == 0:
+                return self._send(429, {"descripcion": "Limite de peticiones", "estado": 429},
+                                  [("Retry-After", "0")])
+            ini = parts[parts.index("fechaini") + 1][:10]
+            fin = parts[parts.index("fechafin") + 1][:10]
+            est = parts[parts.index("estacion") + 1]
+            if not api.select(est, ini, fin):
+                return self._send(200, NO_DATA)
+            return self._send(200, {"descripcion": "exito", "estado": 200,
+                                    "datos": f"{api.root}/datos/{est}/{ini}/{fin}"})
+    return Handler
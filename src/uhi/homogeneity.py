@@ -0,0 +1,200 @@
+# src/uhi/homogeneity.py
+"""
+Breakpoint screening of urban-rural (or any station-pair) difference series.
+
+Stations move and change instruments, and the pair CSVs mix reference
+periods (0229I until 2016, the rural median from 2005). A step in
+``station_a - station_b`` shows up as a break in the difference series.
+
+Everything works on a [pairs x time] matrix with NaN gaps:
+- ``snht``: Alexandersson's SNHT, T(k) = k*z1² + (n-k)*z2², from cumulative
+  sums of the standardized series;
+- ``pettitt``: Pettitt's U(k) = 2*sum(ranks up to k) - k*(n+1), from
+  cumulative sums of ranks;
+- ``homogenize``: detect -> shift the earlier segment onto the later one ->
+  re-test, up to ``max_breaks`` per pair, optionally across a process pool.
+Tests are meant for monthly anomalies (``monthly_anomalies``); daily values
+are too autocorrelated for the critical values used here.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from .arrays import station_columns
+from .stations import RURAL_CODES, URBAN_CODES
+
+ALPHA = 0.05
+MIN_SEGMENT = 12     # months on each side of a break
+
+
+# --- input series ---
+def pair_differences(df, pairs=None, var="tmin"):
+    """
+    Daily ``a - b`` for each pair of a wide merged frame. ``pairs`` defaults to
+    urban x (rural stations + rural median). Columns are named ``"a-b"``.
+    """
+    cols = station_columns(df, var)
+    if pairs is None:
+        rural = [c for c in RURAL_CODES if c in cols]
+        if f"{var}_rural_median" in df.columns:
+            rural.append("rural_median")
+        pairs = [(u, r) for u, r in product(URBAN_CODES, rural) if u in cols]
+    cols = {**cols, "rural_median": f"{var}_rural_median"}
+    out = {}
+    for a, b in pairs:
+        if a in cols and b in cols and cols[a] in df.columns and cols[b] in df.columns:
+            x = df[cols[a]].to_numpy(dtype="float64", na_value=np.nan)
+            y = df[cols[b]].to_numpy(dtype="float64", na_value=np.nan)
+            out[f"{a}-{b}"] = x - y
+    return pd.DataFrame(out, index=df.index)
+
+
+def monthly_anomalies(diff, min_days=20):
+    """Monthly means (months with < ``min_days`` values -> NaN) minus each calendar month's mean."""
+    g = diff.groupby(diff.index.to_period("M"))
+    monthly = g.mean().where(g.count() >= min_days)
+    clim = monthly.groupby(monthly.index.month).transform("mean")
+    return monthly - clim
+
+
+# --- tests (vectorized over rows) ---
+def _valid_cumsums(x):
+    valid = ~np.isnan(x)
+    cnt = np.cumsum(valid, axis=1)
+    return valid, cnt, cnt[:, -1:]
+
+
+def snht(x):
+    """
+    SNHT statistic for each row of [pairs x time].
+    Returns (T max, position of the last value of the first segment, n valid).
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    valid, k, n = _valid_cumsums(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = np.nanmean(x, axis=1, keepdims=True)
+        sd = np.nanstd(x, axis=1, ddof=1, keepdims=True)
+        z = np.where(valid, (x - mu) / sd, 0.0)
+        cz = np.cumsum(z, axis=1)
+        z1 = cz / k
+        z2 = (cz[:, -1:] - cz) / (n - k)
+        t = k * z1 ** 2 + (n - k) * z2 ** 2
+    ok = valid & (k >= MIN_SEGMENT) & (n - k >= MIN_SEGMENT)
+    t = np.where(ok, t, -np.inf)
+    pos = np.argmax(t, axis=1)
+    tmax = t[np.arange(len(t)), pos]
+    return np.where(np.isfinite(tmax), tmax, np.nan), pos, n[:, 0]
+
+
+def _ranks(x):
+    """
+    Ranks 1..n among the valid values of each row (NaN -> 0). Ties (0.1 °C
+    resolution) get their average rank, so U does not depend on input order.
+    """
+    from scipy.stats import rankdata
+
+    # NaN -> +inf: they rank above every valid value and are zeroed afterwards
+    ranks = rankdata(np.where(np.isnan(x), np.inf, x), method="average", axis=1)
+    return np.where(np.isnan(x), 0, ranks).astype(np.float64)
+
+
+def pettitt(x):
+    """
+    Pettitt statistic per row. Returns (K = max|U|, break position, n valid,
+    approximate p-value).
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+    valid, k, n = _valid_cumsums(x)
+    u = 2 * np.cumsum(_ranks(x), axis=1) - k * (n + 1)
+    ok = valid & (k >= MIN_SEGMENT) & (n - k >= MIN_SEGMENT)
+    au = np.where(ok, np.abs(u), -np.inf)
+    pos = np.argmax(au, axis=1)
+    kmax = au[np.arange(len(au)), pos]
+    kmax = np.where(np.isfinite(kmax), kmax, np.nan)
+    nn = n[:, 0].astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        p = np.minimum(2 * np.exp(-6 * kmax ** 2 / (nn ** 3 + nn ** 2)), 1.0)
+    return kmax, pos, n[:, 0], p
+
+
+@lru_cache(maxsize=None)
+def snht_critical(n, alpha=ALPHA, sims=2000, seed=0):
+    """Monte Carlo critical value of T max for ``n`` values (cached by n)."""
+    rng = np.random.default_rng(seed)
+    t, _, _ = snht(rng.normal(size=(sims, n)))
+    return float(np.nanquantile(t, 1 - alpha))
+
+
+def _critical(n, alpha):
+    # simulate on a coarse grid of lengths; the value varies slowly with n
+    grid = np.maximum(10 * np.round(np.asarray(n) / 10).astype(int), 2 * MIN_SEGMENT + 1)
+    return np.array([snht_critical(int(g), alpha) for g in grid])
+
+
+# --- detection + adjustment ---
+def _homogenize_block(x, alpha, max_breaks, test):
+    x = np.array(x, dtype=np.float64)
+    found = []
+    active = np.ones(len(x), dtype=bool)
+    for it in range(max_breaks):
+        rows = np.flatnonzero(active)
+        if len(rows) == 0:
+            break
+        sub = x[rows]
+        t, pos_s, n = snht(sub)
+        k, pos_p, _, p = pettitt(sub)
+        sig_s = t > _critical(n, alpha)
+        sig_p = p < alpha
+        if test == "snht":
+            sig, pos = sig_s, pos_s
+        elif test == "pettitt":
+            sig, pos = sig_p, pos_p
+        else:  # both must agree on a break (SNHT location)
+            sig, pos = sig_s & sig_p, pos_s
+        sig &= ~np.isnan(t)
+        active[rows[~sig]] = False
+        for j in np.flatnonzero(sig):
+            r, b = rows[j], pos[j]
+            before, after = x[r, :b + 1], x[r, b + 1:]
+            shift = np.nanmean(after) - np.nanmean(before)
+            x[r, :b + 1] = before + shift   # align the earlier segment to the recent one
+            found.append((r, b, it + 1, t[j], k[j], p[j], shift))
+    return x, found
+
+
+def homogenize(series, alpha=ALPHA, max_breaks=3, test="both", workers=1, chunk=64):
+    """
+    Detect and adjust breaks in every column of ``series`` (time x pairs).
+
+    Returns (breaks DataFrame, adjusted series). ``workers > 1`` splits the
+    pairs in chunks over a process pool.
+    """
+    x = series.to_numpy(dtype=np.float64).T
+    blocks = [(lo, x[lo:lo + chunk]) for lo in range(0, len(x), chunk)]
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futs = [ex.submit(_homogenize_block, blk, alpha, max_breaks, test) for _, blk in blocks]
+            results = [f.result() for f in futs]
+    else:
+        results = [_homogenize_block(blk, alpha, max_breaks, test) for _, blk in blocks]
+
+    adjusted = np.empty_like(x)
+    rows = []
+    for (lo, blk), (adj, found) in zip(blocks, results):
+        adjusted[lo:lo + len(blk)] = adj
+        for r, b, it, t, k, p, shift in found:
+            rows.append({
+                "pair": series.columns[lo + r],
+                "break_after": series.index[b],
+                "iteration": it,
+                "snht_T": t,
+                "pettitt_K": k,
+                "pettitt_p": p,
+                "shift": shift,
+            })
+    breaks = pd.DataFrame(rows, columns=["pair", "break_after", "iteration", "snht_T",
+                                         "pettitt_K", "pettitt_p", "shift"])
+    return breaks, pd.DataFrame(adjusted.T, index=series.index, columns=series.columns)
@@ -0,0 +1,177 @@
+# src/uhi/infill.py
+"""
+Cross-station infilling of short gaps in the daily station series.
+
+download_full_station_resume reindexes every station to a full daily range,
+so gaps are NaN rows; the UHI generators then drop any day where either
+station is missing. Here short gaps (<= ``max_gap`` days) are filled from
+correlated neighbours:
+
+1. per calendar month, fit target ~ neighbour for every station pair at once
+   (sufficient statistics via matrix products, as in ``arrays.corr_matrix``):
+   ``regression`` -> a + b*x, ``anomaly`` -> x + (mean_t - mean_n);
+2. keep pairs with enough overlap and r >= ``min_r``;
+3. every fillable cell takes the r²-weighted mean of its ``k`` best
+   available neighbours, computed in batches of cells (no per-gap loop).
+
+Each value gets a provenance flag: ``FLAG_OBSERVED``, ``FLAG_INFILLED`` or
+``FLAG_MISSING``. Merged tables carry them as ``<var>_<code>_flag`` columns.
+"""
+import numpy as np
+import pandas as pd
+
+from .arrays import nan_run_lengths, station_columns
+from .instrument import stage
+
+FLAG_OBSERVED = 0
+FLAG_INFILLED = 1
+FLAG_MISSING = 2
+
+# cells x stations handled per batch (bounds the temporary arrays)
+BATCH_ELEMENTS = 4_000_000
+
+
+def monthly_moments(block, months):
+    """
+    Per-month sufficient statistics of a [stations x days] block, each
+    [12 x S x S]: overlap count n, sum and sum of squares of the target
+    over the overlap, and the cross sum. They add up over time blocks, so
+    an archive processed in chunks gets the same fits as in one piece.
+    """
+    x = np.asarray(block, dtype=np.float64)
+    S = x.shape[0]
+    out = np.zeros((4, 12, S, S))
+    n, s_t, ss_t, s_tn = out            # views: filled in place
+    for m in range(12):
+        xm = x[:, months == m]
+        if xm.shape[1] == 0:
+            continue
+        p = (~np.isnan(xm)).astype(np.float64)
+        xz = np.where(p > 0, xm, 0.0)
+        n[m] = p @ p.T
+        s_t[m] = xz @ p.T               # sum of target i where neighbour j present
+        ss_t[m] = (xz * xz) @ p.T
+        s_tn[m] = xz @ xz.T
+    return out
+
+
+def fits_from_moments(moments, method="regression", min_overlap=60, min_r=0.8):
+    """(a, b, w) of ``monthly_fits`` from (summed) ``monthly_moments``."""
+    n, s_t, ss_t, s_tn = moments
+    s_n, ss_n = s_t.transpose(0, 2, 1), ss_t.transpose(0, 2, 1)   # same sums for the neighbour
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mt, mn = s_t / n, s_n / n
+        cov = s_tn / n - mt * mn
+        vt = ss_t / n - mt * mt
+        vn = ss_n / n - mn * mn
+        r = cov / np.sqrt(vt * vn)
+        if method == "regression":
+            slope = cov / vn
+        elif method == "anomaly":
+            slope = np.ones_like(cov)
+        else:
+            raise ValueError(f"Método desconocido: {method}")
+        icpt = mt - slope * mn
+    ok = (n >= min_overlap) & (r >= min_r) & np.isfinite(slope)
+    S = n.shape[1]
+    ok[:, np.arange(S), np.arange(S)] = False
+    a = np.where(ok, icpt, np.nan).astype(np.float32)
+    b = np.where(ok, slope, np.nan).astype(np.float32)
+    w = np.where(ok, r * r, np.nan).astype(np.float32)
+    return a, b, w
+
+
+def monthly_fits(block, months, method="regression", min_overlap=60, min_r=0.8):
+    """
+    Per-month pair fits for a [stations x days] block.
+
+    Returns (a, b, w), each [12 x S x S]: prediction of station i from
+    station j is ``a[m, i, j] + b[m, i, j] * x_j``; ``w`` is r² (NaN when the
+    pair is not usable, and on the diagonal).
+    """
+    return fits_from_moments(monthly_moments(block, months), method, min_overlap, min_r)
+
+
+def infill_block(block, dates, max_gap=5, k=3, method="regression", min_overlap=60, min_r=0.8, fits=None):
+    """
+    Fill short gaps of a [stations x days] block from neighbour stations.
+
+    Returns (filled float32 block, int8 flags). Fits use observed values
+    only; pass ``fits`` (a, b, w) computed over a longer record to reuse them.
+    """
+    x = np.asarray(block, dtype=np.float32)
+    months = pd.DatetimeIndex(dates).month.to_numpy() - 1
+    a, b, w = fits if fits is not None else monthly_fits(x, months, method, min_overlap, min_r)
+
+    filled = x.copy()
+    flags = np.where(np.isnan(x), FLAG_MISSING, FLAG_OBSERVED).astype(np.int8)
+    runs = nan_run_lengths(x)
+    ti, di = np.nonzero((runs > 0) & (runs <= max_gap))
+    if len(ti) == 0:
+        return filled, flags
+
+    S = x.shape[0]
+    k = min(k, S - 1)
+    step = max(BATCH_ELEMENTS // max(S, 1), 1)
+    for lo in range(0, len(ti), step):
+        t, d = ti[lo:lo + step], di[lo:lo + step]
+        mo = months[d]
+        nb = x[:, d].T                      # [cells x S] neighbour values that day
+        wt = w[mo, t]                       # [cells x S] r² of target <- neighbour
+        wt = np.where(np.isnan(nb), np.nan, wt)
+        score = np.where(np.isnan(wt), -1.0, wt)
+        if k < S:
+            best = np.argpartition(-score, k - 1, axis=1)[:, :k]
+        else:
+            best = np.broadcast_to(np.arange(S), score.shape)
+        rows = np.arange(len(t))[:, None]
+        wk = wt[rows, best]
+        pred = a[mo[:, None], t[:, None], best] + b[mo[:, None], t[:, None], best] * nb[rows, best]
+        use = ~np.isnan(wk) & ~np.isnan(pred)
+        wsum = np.where(use, wk, 0.0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            val = np.where(use, wk * pred, 0.0).sum(axis=1) / wsum
+        got = wsum > 0
+        filled[t[got], d[got]] = val[got]
+        flags[t[got], d[got]] = FLAG_INFILLED
+    return filled, flags
+
+
+def flag_column(col):
+    return f"{col}_flag"
+
+
+def infill_frame(df, variables=("tmin", "tmax", "tmed"), max_gap=5, k=3, method="regression",
+                 min_overlap=60, min_r=0.8, fits=None, verbose=True):
+    """
+    Infill the ``<var>_<code>`` columns of a wide merged frame (daily index)
+    and add ``<var>_<code>_flag`` columns. Returns a new frame.
+    ``fits``: optional {var: (a, b, w)} in the order of ``station_columns``.
+    """
+    out = df.copy()
+    dates = pd.DatetimeIndex(df.index)
+    for var in variables:
+        cols = station_columns(df, var)
+        if len(cols) < 2:
+            continue
+        names = list(cols.values())
+        with stage("infill", rows_in=len(df), variable=var, stations=len(names)) as st:
+            block = np.vstack([df[c].to_numpy(dtype="float32", na_value=np.nan) for c in names])
+            filled, flags = infill_block(block, dates, max_gap, k, method, min_overlap, min_r,
+                                         fits=None if fits is None else fits.get(var))
+            for i, c in enumerate(names):
+                out[c] = pd.array(filled[i], dtype="Float32")
+                out[flag_column(c)] = pd.array(flags[i], dtype="Int8")
+            st.rows_out = int((flags == FLAG_INFILLED).sum())
+        if verbose:
+            print(f"  infill {var}: {st.rows_out} valores rellenados "
+                  f"({int((flags == FLAG_MISSING).sum())} siguen vacíos)")
+    return out
+
+
+def infill_summary(df):
+    """Observed / infilled / missing counts per flag column."""
+    flag_cols = [c for c in df.columns if c.endswith("_flag")]
+    counts = {c[:-len("_flag")]: df[c].value_counts().reindex(
+        [FLAG_OBSERVED, FLAG_INFILLED, FLAG_MISSING], fill_value=0).to_numpy() for c in flag_cols}
+    return pd.DataFrame(counts, index=["observed", "infilled", "missing"]).T
@@ -0,0 +1,223 @@
+# src/uhi/instrument.py
+"""
+Lightweight timing/profiling hooks for the pipeline stages.
+
+Usage::
+
+    with stage("merge", rows_in=n) as st:
+        merged = ...
+        st.rows_out = len(merged)
+
+    @timed("qc")
+    def qc_summary(...): ...
+
+Each finished stage records wall time, CPU time, peak RSS, rows in/out and
+bytes read/written. Records are kept in ``RECORDS`` and, when the
+``UHI_TRACE`` environment variable points to a file, appended to it as JSON
+lines. ``UHI_PROFILE=cprofile`` (or ``pyinstrument``) additionally dumps a
+profile per stage into ``UHI_PROFILE_DIR`` (default: next to the trace).
+Nothing needs to change in the scripts to switch tracing on or off.
+"""
+import functools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+TRACE_ENV = "UHI_TRACE"
+PROFILE_ENV = "UHI_PROFILE"
+PROFILE_DIR_ENV = "UHI_PROFILE_DIR"
+
+# last records in memory (bounded so long-running processes do not grow)
+RECORDS = deque(maxlen=10000)
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def current_stage():
+    """Innermost active stage (or None), to add bytes/rows from helpers."""
+    st = _stack()
+    return st[-1] if st else None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unknown)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 ** 2
+    except ImportError:
+        return None
+
+
+def _size(path_or_n):
+    if isinstance(path_or_n, (int, float)):
+        return int(path_or_n)
+    try:
+        return os.path.getsize(path_or_n)
+    except OSError:
+        return 0
+
+
+class _Profiler:
+    def __init__(self, kind):
+        self.kind = kind
+        self.prof = None
+
+    def start(self):
+        if self.kind == "cprofile":
+            import cProfile
+            self.prof = cProfile.Profile()
+            self.prof.enable()
+        elif self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self.prof = Profiler()
+            self.prof.start()
+
+    def stop(self, out_base):
+        if self.prof is None:
+            return None
+        out_base.parent.mkdir(parents=True, exist_ok=True)
+        if self.kind == "cprofile":
+            self.prof.disable()
+            out = out_base.with_suffix(".prof")
+            self.prof.dump_stats(out)
+        else:
+            self.prof.stop()
+            out = out_base.with_suffix(".html")
+            out.write_text(self.prof.output_html(), encoding="utf-8")
+        return str(out)
+
+
+class Stage:
+    """Context manager measuring one pipeline stage."""
+
+    def __init__(self, name, rows_in=None, **meta):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.meta = meta
+        self.record = None
+
+    def read(self, path_or_n):
+        self.bytes_read += _size(path_or_n)
+
+    def wrote(self, path_or_n):
+        self.bytes_written += _size(path_or_n)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        kind = os.getenv(PROFILE_ENV, "").lower()
+        self._profiler = _Profiler(kind) if kind and not self.parent else None
+        if self._profiler:
+            self._profiler.start()
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._c0
+        _stack().pop()
+        stamp = datetime.now(timezone.utc)
+        rec = {
+            "ts": stamp.isoformat(),
+            "stage": self.name,
+            "parent": self.parent,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "ok": exc_type is None,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            **{k: _jsonable(v) for k, v in self.meta.items()},
+        }
+        if self._profiler:
+            prof_dir = Path(os.getenv(PROFILE_DIR_ENV) or Path(os.getenv(TRACE_ENV) or ".").parent / "profiles")
+            base = prof_dir / f"{self.name}_{stamp.strftime('%Y%m%dT%H%M%S%f')}_{os.getpid()}"
+            rec["profile"] = self._profiler.stop(base)
+        self.record = rec
+        _emit(rec)
+        # bytes of nested stages also count for the enclosing one
+        parent = current_stage()
+        if parent is not None:
+            parent.bytes_read += self.bytes_read
+            parent.bytes_written += self.bytes_written
+        return False
+
+
+def _jsonable(v):
+    if isinstance(v, (str, int, float, bool)) or v is None:
+        return v
+    return str(v)
+
+
+def _emit(rec):
+    with _lock:
+        RECORDS.append(rec)
+        path = os.getenv(TRACE_ENV)
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+def stage(name, rows_in=None, **meta):
+    return Stage(name, rows_in=rows_in, **meta)
+
+
+def timed(name=None, **meta):
+    """Decorator form of ``stage``; rows_out is len(result) when available."""
+    def deco(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Stage(name or func.__qualname__, **meta) as st:
+                res = func(*args, **kwargs)
+                if st.rows_out is None and hasattr(res, "__len__") and not isinstance(res, (str, bytes)):
+                    st.rows_out = len(res)
+            return res
+        return wrapper
+    return deco
+
+
+def load_trace(path):
+    """Read a JSON-lines trace into a DataFrame (pandas imported lazily)."""
+    import pandas as pd
+    return pd.read_json(path, lines=True)
+
+
+def summarize_trace(path):
+    """Total/mean wall and CPU time, rows and bytes per stage, slowest first."""
+    df = load_trace(path)
+    g = df.groupby("stage")
+    out = g.agg(calls=("wall_s", "size"), wall_s=("wall_s", "sum"), wall_mean_s=("wall_s", "mean"),
+                cpu_s=("cpu_s", "sum"), rows_out=("rows_out", "sum"),
+                bytes_read=("bytes_read", "sum"), bytes_written=("bytes_written", "sum"),
+                peak_rss_mb=("peak_rss_mb", "max"))
+    return out.sort_values("wall_s", ascending=False)
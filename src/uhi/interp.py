@@ -0,0 +1,243 @@
+# src/uhi/interp.py
+"""
+Station -> grid interpolation of daily or annual fields (UHI, tmin, ...).
+
+Weights depend only on the station and grid positions, so they are built
+once (neighbours from a KD-tree, then IDW or kriging weights) into a sparse
+[grid cells x stations] matrix. Interpolating T days is then one sparse
+product with the [stations x T] value matrix::
+
+    table = station_table()
+    grid = Grid.over(BCN_BBOX, res_km=0.5)
+    W = idw_weights(table, grid)            # or kriging_weights(...)
+    field = interpolate(W, values)          # [cells x days]
+
+Stations missing on a given day are dropped and the remaining weights of
+that cell renormalised (exact for IDW, an approximation for kriging).
+NDVI/NDBI covariates enter kriging as external drift.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# lon_min, lat_min, lon_max, lat_max: Barcelona city + airport
+BCN_BBOX = (2.05, 41.27, 2.23, 41.47)
+# Sentinel-2 / Landsat zones of uhi_satellite_ndvi_ndbi_lst.ipynb
+SAT_ZONES = {
+    "BCN_urban": (2.14, 41.36, 2.20, 41.41),
+    "Fabra": (2.11, 41.41, 2.14, 41.44),
+    "BCN_airport": (2.06, 41.27, 2.13, 41.32),
+    "Sabadell": (2.06, 41.52, 2.14, 41.58),
+    "Montserrat": (1.78, 41.57, 1.86, 41.63),
+}
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON_EQ = 111.32
+LAT0 = 41.4
+
+
+def to_km(lon, lat, lat0=LAT0):
+    """Local equirectangular projection (km), good enough at city scale."""
+    lon, lat = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+    return np.column_stack([lon * KM_PER_DEG_LON_EQ * np.cos(np.radians(lat0)), lat * KM_PER_DEG_LAT])
+
+
+@dataclass(frozen=True)
+class Grid:
+    lon: np.ndarray
+    lat: np.ndarray
+
+    @classmethod
+    def over(cls, bbox=BCN_BBOX, res_km=0.5):
+        lon_min, lat_min, lon_max, lat_max = bbox
+        dlat = res_km / KM_PER_DEG_LAT
+        dlon = res_km / (KM_PER_DEG_LON_EQ * np.cos(np.radians((lat_min + lat_max) / 2)))
+        return cls(np.arange(lon_min, lon_max + dlon / 2, dlon), np.arange(lat_min, lat_max + dlat / 2, dlat))
+
+    @property
+    def shape(self):
+        return len(self.lat), len(self.lon)
+
+    def points(self):
+        """(lon, lat) of every cell, row-major over (lat, lon)."""
+        lon, lat = np.meshgrid(self.lon, self.lat)
+        return lon.ravel(), lat.ravel()
+
+    def reshape(self, field):
+        """[cells x T] -> [T x lat x lon] (or [lat x lon] for one column)."""
+        field = np.asarray(field)
+        if field.ndim == 1:
+            return field.reshape(self.shape)
+        return field.T.reshape((field.shape[1],) + self.shape)
+
+
+def _neighbours(table, grid, k):
+    from scipy.spatial import cKDTree
+
+    st = to_km(table["lon"], table["lat"])
+    glon, glat = grid.points()
+    k = min(k, len(st))
+    dist, idx = cKDTree(st).query(to_km(glon, glat), k=k)
+    return st, dist.reshape(-1, k), idx.reshape(-1, k)
+
+
+def _sparse(weights, idx, n_stations):
+    from scipy.sparse import csr_matrix
+
+    n_cells, k = idx.shape
+    indptr = np.arange(0, n_cells * k + 1, k)
+    return csr_matrix((weights.ravel(), idx.ravel(), indptr), shape=(n_cells, n_stations))
+
+
+def idw_weights(table, grid, k=4, power=2.0):
+    """Inverse-distance weights to the ``k`` nearest stations."""
+    _, dist, idx = _neighbours(table, grid, k)
+    with np.errstate(divide="ignore"):
+        w = 1.0 / np.maximum(dist, 1e-6) ** power
+    w /= w.sum(axis=1, keepdims=True)
+    return _sparse(w, idx, len(table))
+
+
+# --- kriging ---
+def exponential_variogram(h, nugget=0.0, sill=1.0, range_km=10.0):
+    return nugget + (sill - nugget) * (1.0 - np.exp(-3.0 * np.asarray(h) / range_km))
+
+
+def fit_variogram(table, values):
+    """
+    Exponential variogram fitted to the empirical semivariance of station
+    pairs (``values``: [stations x T], mean over time of 0.5*(zi - zj)²).
+    Falls back to defaults with fewer than 3 pairs.
+    """
+    xy = to_km(table["lon"], table["lat"])
+    v = np.asarray(values, dtype=np.float64)
+    i, j = np.triu_indices(len(xy), 1)
+    h = np.hypot(*(xy[i] - xy[j]).T)
+    with np.errstate(invalid="ignore"):
+        g = 0.5 * np.nanmean((v[i] - v[j]) ** 2, axis=1)
+    ok = np.isfinite(g)
+    if ok.sum() < 3:
+        return {"nugget": 0.0, "sill": float(np.nanvar(v)) or 1.0, "range_km": 10.0}
+    from scipy.optimize import curve_fit
+
+    p0 = (0.0, float(g[ok].max()), float(h[ok].mean()))
+    # keep the fit inside the scale of the data (few pairs -> poorly constrained)
+    bounds = ([0.0, 1e-6, 0.1], [2 * g[ok].max(), 10 * g[ok].max(), 10 * h[ok].max()])
+    try:
+        (nugget, sill, rng), _ = curve_fit(exponential_variogram, h[ok], g[ok], p0=p0, bounds=bounds)
+    except RuntimeError:
+        nugget, sill, rng = p0
+    return {"nugget": float(nugget), "sill": float(max(sill, nugget + 1e-6)), "range_km": float(rng)}
+
+
+def kriging_weights(table, grid, k=8, variogram=None, covariates=None):
+    """
+    Ordinary kriging weights (external drift when ``covariates`` is given).
+
+    ``covariates``: {name: (values at stations [S], values at cells [G])},
+    e.g. NDVI/NDBI from ``zone_covariate``. All cells' (k+1+p)-sized systems
+    are solved in one batched ``np.linalg.solve``.
+    """
+    variogram = variogram or {"nugget": 0.0, "sill": 1.0, "range_km": 10.0}
+    st, dist, idx = _neighbours(table, grid, k)
+    n_cells, k = idx.shape
+
+    drift_st, drift_cell = [], []
+    for name, (at_st, at_cell) in (covariates or {}).items():
+        drift_st.append(np.asarray(at_st, dtype=np.float64))
+        drift_cell.append(np.asarray(at_cell, dtype=np.float64))
+    p = len(drift_st)
+    if k < 2 + p:
+        raise ValueError(f"Se necesitan al menos {2 + p} estaciones vecinas (k={k})")
+
+    n = k + 1 + p
+    A = np.zeros((n_cells, n, n))
+    b = np.zeros((n_cells, n))
+    pts = st[idx]                                          # [G x k x 2]
+    hij = np.linalg.norm(pts[:, :, None, :] - pts[:, None, :, :], axis=-1)
+    A[:, :k, :k] = exponential_variogram(hij, **variogram)
+    A[:, :k, k] = A[:, k, :k] = 1.0
+    b[:, :k] = exponential_variogram(dist, **variogram)
+    b[:, k] = 1.0
+    for q in range(p):
+        A[:, :k, k + 1 + q] = A[:, k + 1 + q, :k] = drift_st[q][idx]
+        b[:, k + 1 + q] = drift_cell[q]
+    # the diagonal of gamma is 0 (no nugget at zero distance)
+    A[:, np.arange(k), np.arange(k)] = 0.0
+    lam = np.linalg.solve(A, b[..., None])[..., 0][:, :k]
+    return _sparse(lam, idx, len(table))
+
+
+def zone_covariate(values_by_zone, grid=None, table=None, zones=SAT_ZONES):
+    """
+    Per-zone satellite values (e.g. NDVI means by zone) spread to points:
+    each point takes the value of the nearest zone centre. Returns the
+    values at the grid cells and/or at the stations.
+    """
+    from scipy.spatial import cKDTree
+
+    names = [z for z in zones if z in values_by_zone and np.isfinite(values_by_zone[z])]
+    centres = np.array([((zones[z][0] + zones[z][2]) / 2, (zones[z][1] + zones[z][3]) / 2) for z in names])
+    vals = np.array([values_by_zone[z] for z in names], dtype=np.float64)
+    tree = cKDTree(to_km(centres[:, 0], centres[:, 1]))
+    out = []
+    if table is not None:
+        out.append(vals[tree.query(to_km(table["lon"], table["lat"]))[1]])
+    if grid is not None:
+        out.append(vals[tree.query(to_km(*grid.points()))[1]])
+    return out[0] if len(out) == 1 else tuple(out)
+
+
+# --- apply ---
+def interpolate(weights, values):
+    """
+    [stations x T] values (NaN = missing) -> [cells x T] field with one
+    sparse product; weights of missing stations are renormalised away.
+    """
+    v = np.asarray(values, dtype=np.float64)
+    if v.ndim == 1:
+        v = v[:, None]
+    valid = ~np.isnan(v)
+    num = weights @ np.where(valid, v, 0.0)
+    den = weights @ valid.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = num / den
+    out[np.abs(den) < 1e-9] = np.nan
+    return out.astype(np.float32)
+
+
+def station_values(store, codes, var="tmin", start=None, end=None, reference=None):
+    """
+    [stations x days] from an ``ArrayStore``; with ``reference`` (1-D series,
+    e.g. the rural median) the stations' UHI is returned instead.
+    """
+    v = np.asarray(store.rows(var, codes, start, end), dtype=np.float64)
+    return v if reference is None else v - np.asarray(reference, dtype=np.float64)
+
+
+def interpolate_annual(annual, table, grid, method="idw", stations=None, **kwargs):
+    """
+    Annual station values (DataFrame year x indicativo, e.g. UHI per year)
+    -> [years x lat x lon] field. ``method``: 'idw' or 'kriging'.
+    ``stations`` selects the columns to use; by default every column with
+    coordinates in ``table`` (COORDS or data/stations.csv), the rest are
+    dropped with a warning.
+    """
+    if stations is None:
+        codes = [c for c in annual.columns if c in table.index]
+        dropped = [c for c in annual.columns if c not in table.index]
+        if dropped:
+            print(f"[WARN] Estaciones sin coordenadas, se omiten (añadir a data/stations.csv): {dropped}")
+    else:
+        codes = list(stations)
+        missing = [c for c in codes if c not in table.index]
+        if missing:
+            raise KeyError(f"Estaciones sin coordenadas (añadir a data/stations.csv): {missing}")
+    if not codes:
+        raise KeyError("Ninguna estación con coordenadas")
+    t = table.loc[codes]
+    if method == "kriging":
+        W = kriging_weights(t, grid, **kwargs)
+    else:
+        W = idw_weights(t, grid, **kwargs)
+    return grid.reshape(interpolate(W, annual[codes].to_numpy(dtype="float64").T))
+
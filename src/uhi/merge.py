@@ -0,0 +1,127 @@
+# src/uhi/merge.py
+"""
+Merge of the per-station daily files into the wide table
+(``<var>_<indicativo>`` columns), short-gap infilling, rural composites and
+the derived stores (Parquet, station x day arrays, regime bitmaps).
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .arrays import build_array_store
+from .config import PROC_DIR, RAW_AEMET_DIR
+from .infill import FLAG_INFILLED, FLAG_MISSING, FLAG_OBSERVED, flag_column, infill_frame
+from .instrument import stage
+from .merged import enforce_schema, write_merged
+from .pairs import median_pair_csv
+from .regimes import build_regime_index
+from .stations import PROJECT_FILES, RURAL_CODES
+
+CSV_FILES = PROJECT_FILES
+
+def load_and_normalize(path):
+    df = pd.read_csv(path, parse_dates=["fecha"], index_col="fecha", dayfirst=False)
+    # normalize decimals and common bad values ("Ip", "Varias" -> NA);
+    # measurements are coerced so one bad value no longer leaves a string column
+    return enforce_schema(df)
+
+# 1) Load each and rename columns with suffix _<indicativo>
+def load_stations(files=CSV_FILES, data_dir=RAW_AEMET_DIR):
+    dfs = {}
+    for fname in files:
+        path = Path(data_dir) / fname
+        ind = Path(fname).name.split("_")[1]
+        with stage("parse", station=ind) as st:
+            st.read(path)
+            df = load_and_normalize(path)
+            st.rows_out = len(df)
+        # rename numeric columns: add suffix
+        dfs[ind] = df.rename(columns={col: f"{col}_{ind}" for col in df.columns})
+    return dfs
+
+# 2) Outer merge all
+def merge_stations(dfs):
+    with stage("merge", rows_in=sum(len(d) for d in dfs.values()), stations=len(dfs)) as st:
+        merged = None
+        for ind, df in dfs.items():
+            if merged is None:
+                merged = df.copy()
+            else:
+                merged = merged.join(df, how="outer")
+        merged.sort_index(inplace=True)
+        st.rows_out = len(merged)
+    return merged
+
+# 3) Function: get common window between two indicatives
+def common_window(merged, ind_u, ind_r):
+    col_tmin_u = f"tmin_{ind_u}"
+    col_tmin_r = f"tmin_{ind_r}"
+    if col_tmin_u not in merged.columns or col_tmin_r not in merged.columns:
+        raise ValueError("Columnas tmin no encontradas en merged.")
+    dfpair = merged[[col_tmin_u, col_tmin_r]].dropna(how='any')
+    start = dfpair.index.min()
+    end = dfpair.index.max()
+    n_days = len(dfpair)
+    return start, end, n_days
+
+# 4) Create composite rural (median of available rural tmin columns per day)
+def add_rural_composites(merged, rural=RURAL_CODES):
+    with stage("composite", rows_in=len(merged)) as st:
+        tmin_r_cols = [f"tmin_{i}" for i in rural if f"tmin_{i}" in merged.columns]
+        merged["tmin_rural_median"] = merged[tmin_r_cols].median(axis=1, skipna=True)
+        merged["tmax_rural_median"] = merged[[c.replace("tmin","tmax") for c in tmin_r_cols if c.replace("tmin","tmax") in merged.columns]].median(axis=1, skipna=True)
+        # provenance of the composite: infilled if any contributing rural value was
+        for var in ("tmin", "tmax"):
+            flag_cols = [flag_column(c.replace("tmin", var)) for c in tmin_r_cols
+                         if flag_column(c.replace("tmin", var)) in merged.columns]
+            if flag_cols:
+                comp = f"{var}_rural_median"
+                any_filled = (merged[flag_cols] == FLAG_INFILLED).any(axis=1)
+                merged[flag_column(comp)] = pd.array(
+                    np.where(merged[comp].isna(), FLAG_MISSING,
+                             np.where(any_filled, FLAG_INFILLED, FLAG_OBSERVED)), dtype="Int8")
+        st.rows_out = len(merged)
+    return merged
+
+def merge(files=CSV_FILES, data_dir=RAW_AEMET_DIR, out_dir=PROC_DIR, infill=True, max_gap=5):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    merged = merge_stations(load_stations(files, data_dir))
+    with stage("write", rows_in=len(merged)) as st:
+        merged.to_csv(out_dir / "merged_all_stations.csv", index=True)
+        st.wrote(out_dir / "merged_all_stations.csv")
+    print("Guardado merged_all_stations.csv, shape:", merged.shape)
+
+    # fill short gaps from correlated neighbours (flags in <col>_flag)
+    if infill:
+        merged = infill_frame(merged, variables=("tmin", "tmax", "tmed"), max_gap=max_gap)
+
+    merged = add_rural_composites(merged)
+
+    # 5) Example: prepare UHI input for pair (urbana=0076, rural_median)
+    urb = "0076"
+    merged["UHI_tmin_0076_vs_ruralMedian"] = merged[f"tmin_{urb}"] - merged["tmin_rural_median"]
+
+    # Save cleaned merged with rural median (CSV for compatibility + typed Parquet)
+    with stage("write", rows_in=len(merged)) as st:
+        merged.to_csv(out_dir / "merged_all_stations_with_ruralMedian.csv", index=True)
+        st.wrote(out_dir / "merged_all_stations_with_ruralMedian.csv")
+        st.wrote(write_merged(merged, out_dir / "merged_all_stations_with_ruralMedian.parquet"))
+    print("Guardado merged_all_stations_with_ruralMedian.csv / .parquet")
+
+    # Station x day arrays (memory-mapped backend for UHI / correlation kernels)
+    with stage("write", rows_in=len(merged), target="arrays"):
+        build_array_store(merged, out_dir / "arrays")
+    print("Guardado store de arrays en", out_dir / "arrays")
+
+    # Day-regime bitmaps (calm, dry, clear, high pressure, heatwave, season)
+    with stage("write", rows_in=len(merged), target="regimes") as st:
+        regimes = build_regime_index(merged)
+        st.wrote(regimes.save(out_dir / "regimes.npz"))
+    print(f"Guardado regimes.npz ({len(regimes.names)} regímenes)")
+
+    median_pair_csv(merged, urb, out_dir)
+    print(f"Guardado uhi_input_{urb}_ruralMedian.csv")
+    return merged
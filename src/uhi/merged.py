@@ -0,0 +1,123 @@
+# src/uhi/merged.py
+"""
+Schema-enforced reader/writer for the merged wide station table
+(``merged_all_stations_with_ruralMedian``).
+
+Columns are ``<variable>_<indicativo>`` plus derived composites. On load:
+- measurements -> nullable ``Float32`` (values + mask, no "Ip"/"Varias" strings)
+- station metadata and hh:mm fields -> ``category``
+- infill provenance flags (``<col>_flag``) -> nullable ``Int8``
+- the date index is stored on disk as int32 days since 1970-01-01
+The Parquet file is the primary format; the legacy CSV is still readable.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import PROC_DIR
+
+MERGED_CSV = PROC_DIR / "merged_all_stations_with_ruralMedian.csv"
+MERGED_PARQUET = PROC_DIR / "merged_all_stations_with_ruralMedian.parquet"
+
+EPOCH = pd.Timestamp("1970-01-01")
+DAY_COL = "day"
+
+METADATA = {"indicativo", "nombre", "provincia"}
+# AEMET markers that mean "no numeric value"
+SENTINELS = ["Ip", "Varias", "nan", ""]
+
+
+def column_kind(col):
+    """'measure', 'category' or 'flag' for a merged column name."""
+    if col.endswith("_flag"):
+        return "flag"
+    base = col.rsplit("_", 1)[0] if "_" in col else col
+    if base in METADATA or base.startswith("hora"):
+        return "category"
+    # measurements, composites (tmin_rural_median) and UHI_* columns
+    return "measure"
+
+
+def to_measure(s):
+    """Any series -> Float32 with NA for sentinels / unparsable values."""
+    if s.dtype == object or pd.api.types.is_string_dtype(s):
+        s = pd.to_numeric(s.astype("string").str.replace(",", ".", regex=False), errors="coerce")
+    return s.astype("Float32")
+
+
+def enforce_schema(df):
+    """Return ``df`` with the merged-table dtypes (index: DatetimeIndex 'fecha')."""
+    out = {}
+    for c in df.columns:
+        kind = column_kind(c)
+        s = df[c]
+        if kind == "category":
+            if isinstance(s.dtype, pd.CategoricalDtype) and not s.cat.categories.isin(SENTINELS).any():
+                out[c] = s  # already clean (e.g. read back from Parquet)
+            else:
+                out[c] = s.where(~s.isin(SENTINELS)).astype("category")
+        elif kind == "flag":
+            out[c] = s if s.dtype == "Int8" else pd.to_numeric(s, errors="coerce").astype("Int8")
+        else:
+            out[c] = s if s.dtype == "Float32" else to_measure(s)
+    res = pd.DataFrame(out, index=df.index)
+    if not isinstance(res.index, pd.DatetimeIndex):
+        res.index = pd.to_datetime(res.index, errors="coerce")
+    res.index.name = "fecha"
+    return res
+
+
+def write_merged(df, path=MERGED_PARQUET):
+    """
+    Write the merged table to Parquet with the int32 day index. Rows with a
+    missing date (NaT, e.g. an unparseable ``fecha``) are dropped with a warning.
+    """
+    df = enforce_schema(df)
+    bad = pd.isna(df.index)
+    if bad.any():
+        print(f"[WARN] {int(bad.sum())} filas sin fecha válida descartadas al escribir {Path(path).name}")
+        df = df[~bad]
+    days = ((df.index - EPOCH) // pd.Timedelta(days=1)).astype("int32")
+    table = df.reset_index(drop=True)
+    table.insert(0, DAY_COL, np.asarray(days, dtype="int32"))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table.to_parquet(path, index=False)
+    return path
+
+
+def read_merged(path=None, columns=None):
+    """
+    Load the merged table with the enforced schema. Without ``path`` the
+    Parquet file is used when present, otherwise the legacy CSV.
+    """
+    if path is None:
+        path = MERGED_PARQUET if MERGED_PARQUET.exists() else MERGED_CSV
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No se encuentra {path}")
+
+    if path.suffix == ".parquet":
+        cols = None if columns is None else [DAY_COL] + list(columns)
+        table = pd.read_parquet(path, columns=cols)
+        days = table.pop(DAY_COL).to_numpy("int64")
+        table.index = pd.DatetimeIndex(EPOCH + pd.to_timedelta(days, unit="D"), name="fecha")
+        return enforce_schema(table)
+
+    usecols = None if columns is None else ["fecha"] + list(columns)
+    dtypes = None
+    if columns is not None:
+        dtypes = {c: "category" for c in columns if column_kind(c) == "category"}
+    df = pd.read_csv(path, usecols=usecols, dtype=dtypes, na_values=SENTINELS,
+                     parse_dates=["fecha"], index_col="fecha", low_memory=False)
+    return enforce_schema(df)
+
+
+def memory_report(df):
+    """Bytes in memory per dtype (deep), for comparing loaders."""
+    mem = df.memory_usage(deep=True, index=True)
+    kinds = pd.Series({c: str(df[c].dtype) for c in df.columns})
+    by_dtype = mem.drop("Index").groupby(kinds).sum()
+    by_dtype["Index"] = mem["Index"]
+    return by_dtype.sort_values(ascending=False)
@@ -0,0 +1,157 @@
+# src/uhi/pairs.py
+"""
+Urban-rural pair tables (``uhi_input_*.csv``) built from the merged table:
+tmin of both stations, urban wind speed, weak_wind flag and UHI_tmin.
+"""
+from pathlib import Path
+
+import pandas as pd
+
+from .config import PROC_DIR
+from .infill import flag_column
+from .instrument import stage
+from .merged import read_merged
+
+URBANS = ["0200E", "0076"]
+RURAL_MEDIAN_COL = "tmin_rural_median"
+RURAL_0229_COL = "tmin_0229I"
+
+# (rural column, file suffix, date slice): 0229I for the long period, the
+# rural median for the recent one
+PERIODS = [
+    (RURAL_0229_COL, "vs_0229I_1980_2016", ("1980-01-01", "2016-12-31")),
+    (RURAL_MEDIAN_COL, "ruralMedian_2005_2025", ("2005-01-01", "2025-12-31")),
+]
+
+
+def load_merged(proc_dir=PROC_DIR):
+    """Merged table with rural median (Parquet if present, else CSV)."""
+    merged_path = Path(proc_dir) / "merged_all_stations_with_ruralMedian.parquet"
+    if not merged_path.exists():
+        merged_path = merged_path.with_suffix(".csv")
+    if not merged_path.exists():
+        raise FileNotFoundError(f"No se encuentra merged_all_stations_with_ruralMedian en {proc_dir}")
+
+    # typed schema: Float32 measurements, categorical metadata
+    with stage("parse", file=merged_path.name) as st:
+        st.read(merged_path)
+        df = read_merged(merged_path)
+        st.rows_out = len(df)
+    return df
+
+
+def pair_frame(df, urb, rural_col, date_slice):
+    """
+    Urban-rural pair table for ``date_slice`` (None when a column is missing).
+    Returns (pair frame, rows before dropping incomplete days).
+    """
+    col_tmin_urb = f"tmin_{urb}"
+    col_vel_urb  = f"velmedia_{urb}"
+
+    # verificar columnas
+    needed = [col_tmin_urb, col_vel_urb, rural_col]
+    missing = [c for c in needed if c not in df.columns]
+
+    if missing:
+        print(f"[SKIP] {urb} vs {rural_col}: faltan columnas {missing}")
+        return None, 0
+
+    with stage("uhi", rows_in=len(df), pair=f"{urb}_vs_{rural_col}") as st:
+        # extraer columnas relevantes
+        d = df[[col_tmin_urb, rural_col, col_vel_urb]].copy()
+        d = d.rename(columns={
+            col_tmin_urb: "tmin_urban",
+            rural_col: "tmin_rural",
+            col_vel_urb: "velmedia_urban"
+        })
+        # provenance of gap-infilled values (0 observado, 1 rellenado)
+        for col, name in ((col_tmin_urb, "flag_urban"), (rural_col, "flag_rural")):
+            if flag_column(col) in df.columns:
+                d[name] = df[flag_column(col)]
+
+        # recorte temporal
+        start, end = date_slice
+        d = d.loc[(d.index >= pd.to_datetime(start)) & (d.index <= pd.to_datetime(end))]
+
+        before = len(d)
+        d = d.dropna(subset=["tmin_urban", "tmin_rural"])
+
+        # viento débil
+        d["weak_wind"] = (d["velmedia_urban"] < 3.0).fillna(False)
+
+        # UHI
+        d["UHI_tmin"] = d["tmin_urban"] - d["tmin_rural"]
+        st.rows_out = len(d)
+    return d, before
+
+
+def make_pair_csv(df, urb, rural_col, out_name, date_slice, out_dir=PROC_DIR):
+    """
+    Crea CSV de comparación urbana-rural para UHI.
+    - df: tabla merged (índice fecha)
+    - urb: código urbana (ej: "0200E")
+    - rural_col: nombre columna rural (ej: "tmin_0229I" o "tmin_rural_median")
+    - out_name: nombre del archivo de salida
+    - date_slice: (fecha_inicial, fecha_final)
+    """
+    d, before = pair_frame(df, urb, rural_col, date_slice)
+    if d is None:
+        return None
+    after = len(d)
+
+    # guardar
+    out_path = Path(out_dir) / out_name
+    with stage("write", rows_in=after, file=out_name) as st:
+        d.to_csv(out_path, index=True)
+        st.wrote(out_path)
+
+    print(f"✔ Guardado {out_name} | filas {after}/{before}")
+    print(f"  Rango: {d.index.min()} → {d.index.max()}")
+    print(f"  UHI mean={d['UHI_tmin'].mean():.3f}, median={d['UHI_tmin'].median():.3f}")
+    print(f"  weak_wind={d['weak_wind'].mean():.3f}")
+    if "flag_urban" in d.columns or "flag_rural" in d.columns:
+        filled = sum((d[c] == 1) for c in ("flag_urban", "flag_rural") if c in d.columns) > 0
+        print(f"  días con valor rellenado={int(filled.sum())}")
+    print("")
+
+    return out_path
+
+
+# Pair table urban vs rural median over the full range (velmedia < 3 m/s flag)
+def urban_rural_median_pair(merged, urb):
+    with stage("uhi", rows_in=len(merged), pair=f"{urb}_ruralMedian") as st:
+        urb_col_vel = f"velmedia_{urb}"
+        cols = [f"tmin_{urb}", "tmin_rural_median", urb_col_vel]
+        cols += [flag_column(c) for c in cols[:2] if flag_column(c) in merged.columns]
+        pair_df = merged[cols].copy()
+        # keep only rows where both tmin present
+        pair_df = pair_df.dropna(subset=[f"tmin_{urb}", "tmin_rural_median"])
+        # Example filter: weak wind nights
+        pair_df["weak_wind"] = (pair_df[urb_col_vel] < 3.0).fillna(False)
+        st.rows_out = len(pair_df)
+    return pair_df
+
+
+def median_pair_csv(df, urb, out_dir=PROC_DIR):
+    """Full-range ``uhi_input_<urb>_ruralMedian.csv``."""
+    pair_df = urban_rural_median_pair(df, urb)
+    out_path = Path(out_dir) / f"uhi_input_{urb}_ruralMedian.csv"
+    with stage("write", rows_in=len(pair_df), file=out_path.name) as st:
+        pair_df.to_csv(out_path, index=True)
+        st.wrote(out_path)
+    return out_path
+
+
+def generate_pairs(proc_dir=PROC_DIR, urbans=URBANS, periods=PERIODS, df=None):
+    """All pair CSVs for ``urbans`` x ``periods``; returns the written paths."""
+    proc_dir = Path(proc_dir)
+    proc_dir.mkdir(parents=True, exist_ok=True)
+    df = load_merged(proc_dir) if df is None else df
+    written = []
+    for rural_col, suffix, date_slice in periods:
+        for urb in urbans:
+            path = make_pair_csv(df, urb=urb, rural_col=rural_col, out_name=f"uhi_input_{urb}_{suffix}.csv",
+                                 date_slice=date_slice, out_dir=proc_dir)
+            if path is not None:
+                written.append(path)
+    return written
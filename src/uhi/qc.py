@@ -0,0 +1,70 @@
+# src/uhi/qc.py
+"""
+QC/QA summary per station file: period covered, % missing per variable and
+days with tmin > tmax.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import RAW_AEMET_DIR
+from .instrument import stage
+from .stations import PROJECT_FILES as CSV_FILES, classify_station
+
+NUM_VARS = ["tmin", "tmax", "tmed", "velmedia", "racha", "sol", "hrMedia", "presMin", "presMax", "prec"]
+
+
+def load_station(filename, data_dir=RAW_AEMET_DIR):
+    filepath = Path(data_dir) / filename
+    with stage("parse", file=Path(filename).name) as st:
+        st.read(filepath)
+        df = pd.read_csv(filepath, parse_dates=["fecha"], index_col="fecha")
+        st.rows_out = len(df)
+    return df
+
+
+def qc_station(file, df):
+    indicativo = Path(file).name.split("_")[1]
+
+    start = df.index.min()
+    end = df.index.max()
+    total_days = len(df)
+
+    missing = {}
+
+    for v in NUM_VARS:
+        if v in df.columns:
+            missing[v] = df[v].isna().mean() * 100
+        else:
+            missing[v] = np.nan
+
+    if "tmin" in df.columns and "tmax" in df.columns:
+        temp_inversion = (df["tmin"] > df["tmax"]).sum()
+        temp_inversion_pct = temp_inversion / len(df) * 100
+    else:
+        temp_inversion = np.nan
+        temp_inversion_pct = np.nan
+
+    station_class = classify_station(indicativo)
+
+    return {
+        "indicativo": indicativo,
+        "archivo": file,
+        "clase_estacion": station_class,
+        "fecha_inicio": start,
+        "fecha_fin": end,
+        "dias_totales": total_days,
+        "tmin>tmax_count": temp_inversion,
+        "tmin>tmax_%": temp_inversion_pct,
+        **{f"missing_{k}": v for k, v in missing.items()}
+    }
+
+
+def qc_summary(files=CSV_FILES, data_dir=RAW_AEMET_DIR):
+    results = []
+    for file in files:
+        df = load_station(file, data_dir)
+        with stage("qc", rows_in=len(df), file=Path(file).name):
+            results.append(qc_station(file, df))
+    return pd.DataFrame(results).sort_values("indicativo")
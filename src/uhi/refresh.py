@@ -0,0 +1,350 @@
+# src/uhi/refresh.py
+"""
+Incremental refresh: keep the station files and the derived products
+current without re-downloading or rebuilding them.
+
+Every station has a high-water mark (last day of its daily CSV, kept in
+``refresh_state.json``). A refresh asks AEMET only for the days after it,
+up to ``today - lag_days`` (the publication delay of the daily
+climatologies), and appends them to the CSV. The derived products are then
+updated from the first new day on:
+
+- merged table (Parquet + CSVs): the tail from ``max_gap`` days before the
+  first new day is re-infilled (reading another ``max_gap`` days of halo so
+  gaps are measured whole, with fits from the whole observed record) and
+  gets its rural composites and UHI column; earlier rows are kept as they
+  were, including their infill, even though the fits now come from a longer
+  record (a gap the grown record would fill stays NA, and vice versa);
+- array store, grown to the new last day;
+- ``uhi_input_*`` pair CSVs present in ``proc_dir`` (rows replaced in place);
+- annual metrics of the years touched;
+- regime bitmaps, rebuilt (their thresholds are monthly percentiles of the
+  whole record).
+
+The state records the first day not yet folded into the derived products,
+so an interrupted update is redone on the next pass. The tail, pair CSVs,
+array store and annual table match a full rebuild; the infill of rows
+before the refreshed tail does not, and ``uhi merge`` (full rebuild) is
+needed to bring it up to date. ``run_daemon`` repeats the refresh every
+``interval_hours`` with random jitter, and stations are spaced by random
+pauses, to stay within the API quota. ``uhi.fakeaemet`` serves a synthetic
+network on localhost for end-to-end runs.
+"""
+import json
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from .aemet import BASE_META, daterange_chunks, fetch_metadata_and_data_with_rate_handling, make_logger, \
+    normalize_station
+from .annual import ANNUAL_PATH, update_annual_table
+from .arrays import extend_array_store, station_columns, write_array_block
+from .config import PROC_DIR, RAW_AEMET_DIR
+from .infill import FLAG_INFILLED, fits_from_moments, flag_column, infill_frame, monthly_moments
+from .instrument import stage
+from .merge import add_rural_composites, load_and_normalize
+from .merged import enforce_schema, read_merged, write_merged
+from .pairs import PERIODS, URBANS, pair_frame, urban_rural_median_pair
+from .regimes import build_regime_index
+from .stations import PROJECT_CODES, RURAL_CODES
+
+STATE_NAME = "refresh_state.json"
+MERGED_NAME = "merged_all_stations_with_ruralMedian"
+PRE_INFILL_CSV = "merged_all_stations.csv"
+INFILL_VARS = ("tmin", "tmax", "tmed")
+MEDIAN_URBAN = "0076"
+
+LAG_DAYS = 4             # AEMET publishes the daily values a few days late
+INTERVAL_HOURS = 24
+JITTER = 0.1             # +-10 % on every interval
+PAUSE = (1.0, 5.0)       # seconds between stations (uniform)
+
+
+# --- state ---
+def load_state(path):
+    path = Path(path)
+    if not path.exists():
+        return {"stations": {}, "pending": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, path):
+    """Write the state atomically (an interrupted write keeps the old one)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(path)
+
+
+def station_file(est, raw_dir, state):
+    """Daily CSV of a station: from the state, else the newest aemet_<est>_*_resume.csv."""
+    known = state["stations"].get(est, {}).get("file")
+    if known:
+        return Path(raw_dir) / known
+    found = sorted(Path(raw_dir).glob(f"aemet_{est}_*_resume.csv"))
+    return found[-1] if found else None
+
+
+def last_day(csv_path):
+    """Last date of a daily station CSV (None when it has no rows)."""
+    fechas = pd.to_datetime(pd.read_csv(csv_path, usecols=["fecha"])["fecha"], errors="coerce")
+    d = fechas.max()
+    return None if pd.isna(d) else d
+
+
+# --- new days ---
+def fetch_new_days(est, after, until, months_chunk=3, **kwargs):
+    """AEMET records of ``est`` for the days in (after, until]."""
+    records = []
+    start = (after + pd.Timedelta(days=1)).to_pydatetime()
+    for ini, fin in daterange_chunks(start, until.to_pydatetime(), months_chunk):
+        records += fetch_metadata_and_data_with_rate_handling(est, ini, fin, **kwargs) or []
+    return records
+
+
+def append_days(csv_path, records, after):
+    """
+    Append the records dated after ``after`` to a daily station CSV, with
+    the file's columns and empty rows for missing days. Returns the rows added.
+    """
+    df = normalize_station([pd.DataFrame(records)])
+    df = df.loc[df.index > after]
+    if df.empty:
+        return df
+    columns = pd.read_csv(csv_path, nrows=0, index_col=0).columns
+    days = pd.date_range(after + pd.Timedelta(days=1), df.index.max(), freq="D")
+    df = df.reindex(index=days, columns=columns)
+    df.to_csv(csv_path, mode="a", header=False, encoding="utf-8")
+    return df
+
+
+def refresh_stations(stations, raw_dir, state, until, pause=PAUSE, rng=None, sleep=time.sleep, log=print,
+                     **fetch_kwargs):
+    """
+    Fetch and append the new days of every station. Updates ``state`` in
+    place; returns {station: days added}.
+    """
+    rng = rng or random.Random()
+    added = {}
+    for i, est in enumerate(stations):
+        path = station_file(est, raw_dir, state)
+        if path is None or not path.exists():
+            log(f"[SKIP] {est}: sin CSV diario en {raw_dir} (descargar antes con uhi download)")
+            continue
+        info = state["stations"].get(est) or {}
+        hwm = pd.Timestamp(info["last"]) if info.get("last") else last_day(path)
+        if hwm is None or hwm >= until:
+            continue
+        if i and pause:
+            sleep(rng.uniform(*pause))
+        try:
+            with stage("refresh_station", station=est) as st:
+                records = fetch_new_days(est, hwm, until, log=log, **fetch_kwargs)
+                new = append_days(path, records, hwm) if records else pd.DataFrame()
+                st.rows_out = len(new)
+        except Exception as e:
+            log(f"ERROR refresco {est}: {e}")
+            continue
+        if len(new):
+            first = new.index.min()
+            pending = state.get("pending")
+            state["pending"] = str(min(first, pd.Timestamp(pending)).date()) if pending else str(first.date())
+            hwm = new.index.max()
+            added[est] = len(new)
+            log(f"{est}: {len(new)} días nuevos ({first.date()} -> {hwm.date()})")
+        state["stations"][est] = {"file": path.name, "last": str(hwm.date()),
+                                  "checked": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+    return added
+
+
+# --- derived products ---
+def observed(df):
+    """Station columns of a merged frame with the infilled values back to NA."""
+    cols = list(df.columns[[not c.endswith("_flag") and "_" in c and "_" not in c.split("_", 1)[1]
+                            for c in df.columns]])
+    out = df[cols].copy()
+    for c in cols:
+        if flag_column(c) in df.columns:
+            out[c] = out[c].mask((df[flag_column(c)] == FLAG_INFILLED).fillna(False))
+    return out
+
+
+def replace_csv_tail(path, df, start):
+    """
+    Replace the rows dated >= ``start`` of a date-indexed CSV by ``df``
+    (in the file's column order) without rewriting the rows before.
+    """
+    key = str(pd.Timestamp(start).date()).encode()
+    with open(path, "r+b") as f:
+        header = f.readline()
+        pos = f.tell()
+        for line in iter(f.readline, b""):
+            if line[:10] >= key:  # ISO dates sort as text
+                break
+            pos = f.tell()
+        f.seek(pos)
+        f.truncate()
+    columns = header.decode("utf-8").rstrip("\r\n").split(",")[1:]
+    df.reindex(columns=columns).to_csv(path, mode="a", header=False)
+    return path
+
+
+def _fits(parts, var):
+    """Infill fits of ``var`` from monthly moments summed over frames with the same columns."""
+    total = None
+    for part in parts:
+        cols = list(station_columns(part, var).values())
+        if len(cols) < 2 or part.empty:
+            continue
+        block = part[cols].to_numpy(dtype="float32", na_value=float("nan")).T
+        m = monthly_moments(block, part.index.month.to_numpy() - 1)
+        total = m if total is None else total + m
+    return None if total is None else fits_from_moments(total)
+
+
+def update_merged(files, since, proc_dir=PROC_DIR, max_gap=5, rural=RURAL_CODES, median_urban=MEDIAN_URBAN):
+    """
+    Fold the days from ``since`` of the station ``files`` into the merged
+    table. Returns (refreshed tail, full merged table).
+    """
+    proc_dir = Path(proc_dir)
+    path = proc_dir / f"{MERGED_NAME}.parquet"
+    old = read_merged(path)
+    keep_from = since - pd.Timedelta(days=max_gap)
+    halo_from = keep_from - pd.Timedelta(days=max_gap)
+
+    with stage("merge", target="refresh", stations=len(files)) as st:
+        new = []
+        for f in files:
+            code = Path(f).name.split("_")[1]
+            df = load_and_normalize(f).loc[halo_from:]
+            new.append(df.rename(columns={c: f"{c}_{code}" for c in df.columns}))
+        wide = pd.concat(new, axis=1)
+        head = observed(old.loc[:halo_from - pd.Timedelta(days=1)])
+        # the station values of the tail: new files first, the table where they have nothing
+        tail = enforce_schema(wide.combine_first(observed(old.loc[halo_from:])).reindex(columns=head.columns))
+        unknown = sorted(set(wide.columns) - set(head.columns))
+        if unknown:
+            print(f"[WARN] columnas nuevas ignoradas (rehacer con uhi merge): {unknown[:5]}")
+        st.rows_out = len(tail)
+
+    fits = {var: f for var in INFILL_VARS if (f := _fits([head, tail], var)) is not None}
+    window = infill_frame(tail, INFILL_VARS, max_gap=max_gap, fits=fits, verbose=False).loc[keep_from:]
+    window = add_rural_composites(window, rural)
+    uhi_col = f"UHI_tmin_{median_urban}_vs_ruralMedian"
+    if uhi_col in old.columns:
+        window[uhi_col] = window[f"tmin_{median_urban}"] - window["tmin_rural_median"]
+    window = enforce_schema(window.reindex(columns=old.columns))
+    merged = pd.concat([old.loc[:keep_from - pd.Timedelta(days=1)], window])
+
+    with stage("write", rows_in=len(window), target="refresh") as st:
+        st.wrote(write_merged(merged, path))
+        if path.with_suffix(".csv").exists():
+            st.wrote(replace_csv_tail(path.with_suffix(".csv"), window, keep_from))
+        if (proc_dir / PRE_INFILL_CSV).exists():
+            st.wrote(replace_csv_tail(proc_dir / PRE_INFILL_CSV, tail.loc[keep_from:], keep_from))
+    return window, merged
+
+
+def update_pairs(window, proc_dir=PROC_DIR, urbans=URBANS, periods=PERIODS):
+    """Replace the refreshed dates in the ``uhi_input_*`` CSVs present in ``proc_dir``."""
+    proc_dir = Path(proc_dir)
+    start = window.index.min()
+    written = []
+    for rural_col, suffix, date_slice in periods:
+        for urb in urbans:
+            path = proc_dir / f"uhi_input_{urb}_{suffix}.csv"
+            if not path.exists() or pd.Timestamp(date_slice[1]) < start:
+                continue
+            d, _ = pair_frame(window, urb, rural_col, date_slice)
+            if d is not None:
+                written.append(replace_csv_tail(path, d, start))
+    for path in sorted(proc_dir.glob("uhi_input_*_ruralMedian.csv")):
+        urb = path.stem.split("_")[2]
+        if f"tmin_{urb}" in window.columns:
+            written.append(replace_csv_tail(path, urban_rural_median_pair(window, urb), start))
+    return written
+
+
+def update_derived(files, since, proc_dir=PROC_DIR, max_gap=5):
+    """Bring every derived product present in ``proc_dir`` up to date from ``since``."""
+    proc_dir = Path(proc_dir)
+    since = pd.Timestamp(since)
+    done = []
+    if (proc_dir / f"{MERGED_NAME}.parquet").exists():
+        window, merged = update_merged(files, since, proc_dir, max_gap)
+        done.append(f"{MERGED_NAME}.parquet")
+        if (proc_dir / "arrays").exists():
+            with stage("write", rows_in=len(window), target="arrays"):
+                extend_array_store(proc_dir / "arrays", merged.index.max())
+                write_array_block(proc_dir / "arrays", window)
+            done.append("arrays")
+        done += [p.name for p in update_pairs(window, proc_dir)]
+        if (proc_dir / "regimes.npz").exists():
+            with stage("write", rows_in=len(merged), target="regimes") as st:
+                st.wrote(build_regime_index(merged).save(proc_dir / "regimes.npz"))
+            done.append("regimes.npz")
+    if (proc_dir / ANNUAL_PATH.name).exists():
+        update_annual_table(files, since, proc_dir / ANNUAL_PATH.name)
+        done.append(ANNUAL_PATH.name)
+    return done
+
+
+# --- entry points ---
+def refresh_once(stations=PROJECT_CODES, raw_dir=RAW_AEMET_DIR, proc_dir=PROC_DIR, today=None, lag_days=LAG_DAYS,
+                 max_gap=5, pause=PAUSE, rng=None, sleep=time.sleep, log=None, api_key=None, base_url=BASE_META):
+    """
+    One refresh pass: new days of ``stations`` -> daily CSVs -> derived
+    products. ``today`` (default: current UTC date) and ``lag_days`` set
+    the last day asked for. Returns {station: days added}.
+    """
+    raw_dir, proc_dir = Path(raw_dir), Path(proc_dir)
+    log = log or make_logger(raw_dir / "refresh.log")
+    state_path = proc_dir / STATE_NAME
+    state = load_state(state_path)
+    today = pd.Timestamp(today or datetime.now(timezone.utc).date())
+    until = today - pd.Timedelta(days=lag_days)
+
+    with stage("refresh", stations=len(stations)) as st:
+        added = refresh_stations(stations, raw_dir, state, until, pause=pause, rng=rng, sleep=sleep, log=log,
+                                 api_key=api_key, base_url=base_url)
+        save_state(state, state_path)
+        if state.get("pending"):
+            files = [p for est in state["stations"] if (p := station_file(est, raw_dir, state)).exists()]
+            done = update_derived(files, state["pending"], proc_dir, max_gap)
+            log(f"Actualizados desde {state['pending']}: {', '.join(done) or 'nada'}")
+            state["pending"] = None
+            save_state(state, state_path)
+        st.rows_out = sum(added.values())
+    return added
+
+
+def run_daemon(interval_hours=INTERVAL_HOURS, jitter=JITTER, max_runs=None, rng=None, sleep=time.sleep, log=None,
+               **kwargs):
+    """
+    ``refresh_once`` every ``interval_hours`` (each wait scaled by a random
+    factor in 1 +- ``jitter``) until interrupted or after ``max_runs`` passes.
+    A failed pass is logged and the loop goes on. Returns the number of passes.
+    """
+    rng = rng or random.Random()
+    log = log or make_logger(Path(kwargs.get("raw_dir", RAW_AEMET_DIR)) / "refresh.log")
+    runs = 0
+    while max_runs is None or runs < max_runs:
+        try:
+            added = refresh_once(rng=rng, sleep=sleep, log=log, **kwargs)
+            log(f"Refresco {runs + 1}: {sum(added.values())} días nuevos en {len(added)} estaciones")
+        except Exception as e:
+            log(f"ERROR refresco: {e}")
+        runs += 1
+        if max_runs is not None and runs >= max_runs:
+            break
+        wait = interval_hours * 3600 * (1 + rng.uniform(-jitter, jitter))
+        log(f"Próximo refresco en {wait / 3600:.2f} h")
+        sleep(wait)
+    return runs
@@ -0,0 +1,268 @@
+# src/uhi/regimes.py
+"""
+Per-day regime bitmaps for conditional UHI statistics.
+
+Every regime (calm, clear sky, dry, high pressure, heatwave, season, ...)
+is one bit per day of the merged table, packed 8 days per byte. Regimes
+are built per station (``calm_0076``) and for the rural composite
+(``calm_rural``, from the median of the rural stations), and combine with
+``&``, ``|``, ``^`` and ``~``::
+
+    idx = RegimeIndex.load()
+    mask = idx.query("calm_0076 & dry_0076 & (JJA | SON)")
+    uhi[idx.align(mask, merged.index)].mean()
+
+The index is saved as ``regimes.npz`` next to the merged table.
+"""
+import ast
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .arrays import run_lengths, station_columns
+from .config import PROC_DIR
+from .stations import RURAL_CODES
+
+REGIMES_PATH = PROC_DIR / "regimes.npz"
+
+CALM_WIND = 3.0          # m/s, same threshold as weak_wind in the pair CSVs
+DRY_PREC = 0.0           # mm
+CLEAR_SOL_Q = 0.75       # sol above the 75th percentile of its calendar month
+HIGH_PRES_Q = 0.75       # presMax above the 75th percentile of its calendar month
+HEAT_TMAX_Q = 0.90       # tmax above the 90th percentile of its calendar month ...
+HEAT_MIN_DAYS = 3        # ... for at least 3 consecutive days
+
+SEASONS = {"DJF": (12, 1, 2), "MAM": (3, 4, 5), "JJA": (6, 7, 8), "SON": (9, 10, 11)}
+
+# number of set bits for every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class Bitset:
+    """Fixed-length set of days stored as packed bits."""
+
+    __slots__ = ("bits", "n")
+
+    def __init__(self, bits, n):
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self.n = int(n)
+
+    @classmethod
+    def from_bool(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask), len(mask))
+
+    @classmethod
+    def full(cls, n, value=False):
+        return cls.from_bool(np.full(n, value, dtype=bool))
+
+    def _check(self, other):
+        if self.n != other.n:
+            raise ValueError(f"Bitsets de distinta longitud: {self.n} vs {other.n}")
+
+    def __and__(self, other):
+        self._check(other)
+        return Bitset(self.bits & other.bits, self.n)
+
+    def __or__(self, other):
+        self._check(other)
+        return Bitset(self.bits | other.bits, self.n)
+
+    def __xor__(self, other):
+        self._check(other)
+        return Bitset(self.bits ^ other.bits, self.n)
+
+    def __invert__(self):
+        bits = ~self.bits
+        tail = self.n % 8
+        if tail:
+            # keep the padding bits of the last byte at 0
+            bits[-1] &= np.uint8((0xFF << (8 - tail)) & 0xFF)
+        return Bitset(bits, self.n)
+
+    def __len__(self):
+        return self.n
+
+    def count(self):
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def to_bool(self):
+        return np.unpackbits(self.bits, count=self.n).astype(bool)
+
+    def indices(self):
+        return np.flatnonzero(self.to_bool())
+
+    def __repr__(self):
+        return f"Bitset({self.count()}/{self.n} días)"
+
+
+def _monthly_quantile_flag(x, months, q):
+    """x above the ``q`` quantile of its calendar month (NaN -> False)."""
+    thr = pd.Series(x).groupby(months).transform(lambda s: s.quantile(q)).to_numpy()
+    with np.errstate(invalid="ignore"):
+        return x > thr
+
+
+def station_regimes(values, months):
+    """
+    Regime masks from one station's (or composite's) daily values.
+    ``values`` maps variable -> 1-D float array; missing variables are skipped.
+    """
+    out = {}
+    with np.errstate(invalid="ignore"):
+        if "velmedia" in values:
+            out["calm"] = values["velmedia"] < CALM_WIND
+        if "prec" in values:
+            out["dry"] = values["prec"] <= DRY_PREC
+            out["wet"] = values["prec"] > DRY_PREC
+        if "sol" in values:
+            out["clear"] = _monthly_quantile_flag(values["sol"], months, CLEAR_SOL_Q)
+        if "presMax" in values:
+            out["highp"] = _monthly_quantile_flag(values["presMax"], months, HIGH_PRES_Q)
+        if "tmax" in values:
+            hot = _monthly_quantile_flag(values["tmax"], months, HEAT_TMAX_Q)
+            out["heatwave"] = run_lengths(hot)[0] >= HEAT_MIN_DAYS
+    return out
+
+
+class RegimeIndex:
+    """Named day bitsets over a daily date range."""
+
+    def __init__(self, start, n_days, bitsets=None):
+        self.start = pd.Timestamp(start)
+        self.n_days = int(n_days)
+        self.bitsets = dict(bitsets or {})
+
+    @property
+    def dates(self):
+        return pd.date_range(self.start, periods=self.n_days, freq="D")
+
+    @property
+    def names(self):
+        return sorted(self.bitsets)
+
+    def __getitem__(self, name):
+        try:
+            return self.bitsets[name]
+        except KeyError:
+            raise KeyError(f"Régimen desconocido: {name}") from None
+
+    def __contains__(self, name):
+        return name in self.bitsets
+
+    def add(self, name, mask):
+        mask = np.asarray(mask, dtype=bool)
+        if len(mask) != self.n_days:
+            raise ValueError(f"{name}: {len(mask)} días, se esperaban {self.n_days}")
+        self.bitsets[name] = Bitset.from_bool(mask)
+
+    def all_of(self, *names):
+        out = Bitset.full(self.n_days, True)
+        for n in names:
+            out = out & self[n]
+        return out
+
+    def any_of(self, *names):
+        out = Bitset.full(self.n_days, False)
+        for n in names:
+            out = out | self[n]
+        return out
+
+    def query(self, expr):
+        """Combine regimes with a ``&``, ``|``, ``^``, ``~`` expression."""
+        return _eval(ast.parse(expr, mode="eval").body, self)
+
+    def counts(self):
+        return pd.Series({n: b.count() for n, b in self.bitsets.items()}).sort_index()
+
+    def align(self, mask, dates):
+        """Bitset/bool mask -> bool array over ``dates`` (days outside -> False)."""
+        m = mask.to_bool() if isinstance(mask, Bitset) else np.asarray(mask, dtype=bool)
+        pos = (pd.DatetimeIndex(dates) - self.start).days.to_numpy()
+        ok = (pos >= 0) & (pos < self.n_days)
+        out = np.zeros(len(pos), dtype=bool)
+        out[ok] = m[pos[ok]]
+        return out
+
+    def save(self, path=REGIMES_PATH):
+        arrays = {f"bits__{n}": b.bits for n, b in self.bitsets.items()}
+        np.savez_compressed(path, start=np.array(str(self.start.date())),
+                            n_days=np.array(self.n_days), **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path=REGIMES_PATH):
+        with np.load(path) as z:
+            n_days = int(z["n_days"])
+            bitsets = {k[len("bits__"):]: Bitset(z[k], n_days) for k in z.files if k.startswith("bits__")}
+            return cls(str(z["start"]), n_days, bitsets)
+
+
+_OPS = {ast.BitAnd: lambda a, b: a & b, ast.BitOr: lambda a, b: a | b, ast.BitXor: lambda a, b: a ^ b}
+
+
+def _eval(node, idx):
+    if isinstance(node, ast.Name):
+        return idx[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+        return _OPS[type(node.op)](_eval(node.left, idx), _eval(node.right, idx))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Invert):
+        return ~_eval(node.operand, idx)
+    raise ValueError(f"Expresión de régimen no soportada: {ast.dump(node)}")
+
+
+def build_regime_index(df, rural=RURAL_CODES, variables=("velmedia", "prec", "sol", "presMax", "tmax")):
+    """Regime index for a wide merged frame (daily index, ``<var>_<code>`` columns)."""
+    dates = pd.DatetimeIndex(df.index)
+    full = pd.date_range(dates.min(), dates.max(), freq="D")
+    pos = full.get_indexer(dates)
+    months = full.month.to_numpy()
+    idx = RegimeIndex(full[0], len(full))
+
+    for name, months_in in SEASONS.items():
+        idx.add(name, np.isin(months, months_in))
+    for m in range(1, 13):
+        idx.add(f"month{m:02d}", months == m)
+
+    per_station = {}
+    for var in variables:
+        for code, col in station_columns(df, var).items():
+            x = np.full(len(full), np.nan)
+            x[pos] = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            per_station.setdefault(code, {})[var] = x
+
+    for code, values in per_station.items():
+        for reg, mask in station_regimes(values, months).items():
+            idx.add(f"{reg}_{code}", mask)
+
+    # rural composite: regimes on the median of the rural stations
+    rural_vals = {}
+    for var in variables:
+        rows = [per_station[c][var] for c in rural if var in per_station.get(c, {})]
+        if rows:
+            with warnings.catch_warnings():
+                # all-NaN days -> NaN, they simply stay out of every regime
+                warnings.simplefilter("ignore", RuntimeWarning)
+                rural_vals[var] = np.nanmedian(np.vstack(rows), axis=0)
+    for reg, mask in station_regimes(rural_vals, months).items():
+        idx.add(f"{reg}_rural", mask)
+    return idx
+
+
+def conditional_stats(values, dates, idx, exprs):
+    """
+    Mean / median / count of a daily series under each regime expression.
+    ``exprs`` is a list of query strings or a {label: query} dict.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    exprs = exprs if isinstance(exprs, dict) else {e: e for e in exprs}
+    valid = ~np.isnan(values)
+    rows = []
+    for label, q in exprs.items():
+        m = idx.align(idx.query(q), dates) & valid
+        v = values[m]
+        rows.append({"regime": label, "n_days": int(m.sum()),
+                     "mean": v.mean() if len(v) else np.nan,
+                     "median": np.median(v) if len(v) else np.nan})
+    return pd.DataFrame(rows).set_index("regime")
@@ -0,0 +1,353 @@
+# src/uhi/report.py
+"""
+Incremental, parallel rendering of the figures under ``reports/``.
+
+A report is a list of ``FigureSpec`` (station, variable, kind). Each spec is
+rendered from the annual frame of its preset (``annual.PRESETS``, columns
+``nombre``, ``year`` + variables) in a process pool with the Agg backend. A manifest stores a hash of the spec and of
+the data slice it was drawn from, so figures whose inputs did not change are
+skipped on the next run.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .annual import annual_frame, compute_uhi, load_annual_table
+from .config import REPORTS_DIR
+from .instrument import stage
+
+# Bump when the drawing code changes so every figure is redrawn once
+RENDER_VERSION = 1
+MANIFEST_NAME = ".render_manifest.json"
+
+# Sub-folder of reports/ for each variable (same layout as the notebooks)
+VAR_DIRS = {
+    "tmin": "temp",
+    "tmax": "temp",
+    "tmed": "temp",
+    "ATD": "ATD",
+    "hrMedia": "humidity",
+    "presMax": "pressure",
+    "presMin": "pressure",
+    "sol": "sol",
+    "UHI": "uhi_climatology",
+}
+
+VAR_UNITS = {
+    "tmin": "°C", "tmax": "°C", "tmed": "°C", "ATD": "°C", "UHI": "°C",
+    "hrMedia": "%", "presMax": "hPa", "presMin": "hPa", "sol": "h",
+}
+
+
+@dataclass(frozen=True)
+class FigureSpec:
+    station: str               # 'nombre' as it appears in the AEMET files
+    variable: str              # annual column to plot (or 'UHI')
+    kind: str = "trend"        # one of RENDERERS
+    rural: str = "MONTSERRAT"  # reference station for UHI kinds
+    label: str = ""            # short label used in titles/filenames
+    preset: str = "annual_vars"      # annual frame of ``variable`` (annual.PRESETS)
+    uhi_preset: str = "annual_vars"  # annual frame the UHI is computed from
+    output: str = ""                 # path under reports/ (default: out_path's layout)
+
+    @property
+    def name(self):
+        return self.label or self.station
+
+    def presets(self):
+        if self.kind == "trend":
+            return {self.preset}
+        if self.kind == "uhi_series":
+            return {self.uhi_preset}
+        return {self.preset, self.uhi_preset}
+
+    def filename(self):
+        if self.kind == "trend":
+            st = self.station.replace(",", "").replace(" ", "_")
+            return f"{st}_{self.variable}_trend.png"
+        slug = self.name.replace(" ", "_").lower()
+        if self.kind == "uhi_scatter":
+            return f"uhi_vs_{self.variable}_{slug}.png"
+        return f"{self.kind}_{slug}.png"
+
+    def out_path(self, reports_dir=REPORTS_DIR):
+        if self.output:
+            return Path(reports_dir) / self.output
+        subdir = "uhi_climatology" if self.kind == "uhi_series" else VAR_DIRS.get(self.variable, "misc")
+        return Path(reports_dir) / subdir / self.filename()
+
+
+# --- data slicing / hashing ---
+def spec_data(spec, annual):
+    """
+    Minimal slice of the annual data needed to draw ``spec``. ``annual`` is
+    one annual frame, or a dict preset -> frame (see ``report_frames``).
+    """
+    def frame(preset):
+        return annual[preset] if isinstance(annual, dict) else annual
+
+    if spec.kind == "trend":
+        var = frame(spec.preset)
+        cols = ["year", spec.variable]
+        return var.loc[var["nombre"] == spec.station, cols].sort_values("year").reset_index(drop=True)
+
+    uhi = compute_uhi(frame(spec.uhi_preset), spec.station, spec.rural)[["year", "UHI"]]
+    if spec.kind == "uhi_series" or spec.variable == "UHI":
+        return uhi.sort_values("year").reset_index(drop=True)
+    var = frame(spec.preset)
+    var = var.loc[var["nombre"] == spec.station, ["year", spec.variable]]
+    return pd.merge(uhi, var, on="year", how="inner").sort_values("year").reset_index(drop=True)
+
+
+def spec_hash(spec, data):
+    h = hashlib.sha1()
+    h.update(json.dumps({"spec": asdict(spec), "v": RENDER_VERSION}, sort_keys=True).encode())
+    h.update(np.ascontiguousarray(pd.util.hash_pandas_object(data, index=False).to_numpy()).tobytes())
+    h.update(",".join(map(str, data.columns)).encode())
+    return h.hexdigest()
+
+
+def load_manifest(reports_dir=REPORTS_DIR):
+    p = Path(reports_dir) / MANIFEST_NAME
+    if p.exists():
+        with open(p, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest, reports_dir=REPORTS_DIR):
+    p = Path(reports_dir) / MANIFEST_NAME
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(p, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+# --- renderers (run inside worker processes) ---
+def _plot_trend(ax, spec, data):
+    d = data.dropna(subset=[spec.variable])
+    years, values = d["year"].to_numpy(float), d[spec.variable].to_numpy(float)
+    unit = VAR_UNITS.get(spec.variable, "")
+    ax.plot(years, values, label=f"{spec.variable} anual")
+    if len(d) >= 3:
+        slope, intercept = np.polyfit(years, values, 1)
+        ax.plot(years, slope * years + intercept, "--",
+                label=f"Tendència ({slope * 10:.2f} {unit}/dècada)")
+    ax.set_title(f"{spec.station} – Tendència {spec.variable}")
+    ax.set_xlabel("Any")
+    ax.set_ylabel(f"{spec.variable} ({unit})")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+
+def _plot_uhi_series(ax, spec, data):
+    d = data.dropna(subset=["UHI"])
+    ax.plot(d["year"], d["UHI"], marker="o", ms=3, label="UHI anual")
+    if len(d) >= 5:
+        ax.plot(d["year"], d["UHI"].rolling(5, center=True, min_periods=3).mean(),
+                lw=2, label="Mitjana mòbil 5 anys")
+    ax.set_title(f"UHI (Tmin) — {spec.name} vs {spec.rural}")
+    ax.set_xlabel("Any")
+    ax.set_ylabel("UHI (°C)")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+
+def _plot_uhi_scatter(ax, spec, data):
+    d = data.dropna(subset=[spec.variable, "UHI"])
+    x, y = d[spec.variable].to_numpy(float), d["UHI"].to_numpy(float)
+    ax.scatter(x, y, s=40)
+    if len(d) >= 3 and np.ptp(x) > 0:
+        slope, intercept = np.polyfit(x, y, 1)
+        xs = np.linspace(x.min(), x.max(), 50)
+        ax.plot(xs, slope * xs + intercept, lw=2, color="purple")
+        r = np.corrcoef(x, y)[0, 1]
+        ax.text(0.05, 0.95, f"r = {r:.2f}\nN = {len(d)}", transform=ax.transAxes,
+                fontsize=10, verticalalignment="top",
+                bbox=dict(facecolor="white", alpha=0.7, edgecolor="gray"))
+    unit = VAR_UNITS.get(spec.variable, "")
+    ax.set_title(f"UHI vs {spec.variable} — {spec.name}")
+    ax.set_xlabel(f"{spec.variable} ({unit})")
+    ax.set_ylabel("UHI (°C)")
+    ax.grid(True, alpha=0.3)
+
+
+RENDERERS = {
+    "trend": _plot_trend,
+    "uhi_series": _plot_uhi_series,
+    "uhi_scatter": _plot_uhi_scatter,
+}
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_one(spec, data, out_path, dpi=300):
+    _init_worker()
+    import matplotlib.pyplot as plt
+
+    with stage("plot", rows_in=len(data), figure=Path(out_path).name) as st:
+        fig, ax = plt.subplots(figsize=(9, 4.5) if spec.kind != "uhi_scatter" else (6, 4))
+        try:
+            RENDERERS[spec.kind](ax, spec, data)
+            out_path = Path(out_path)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            fig.savefig(out_path, dpi=dpi, bbox_inches="tight")
+            st.wrote(out_path)
+        finally:
+            plt.close(fig)
+    return str(out_path)
+
+
+def render_report(specs, annual, reports_dir=REPORTS_DIR, workers=None, force=False, dpi=300):
+    """
+    Render ``specs`` from ``annual`` (a frame or a dict preset -> frame),
+    skipping unchanged figures.
+    Returns a dict with the lists of 'rendered', 'skipped' and 'empty' paths.
+    """
+    reports_dir = Path(reports_dir)
+    manifest = load_manifest(reports_dir)
+    todo, result = [], {"rendered": [], "skipped": [], "empty": []}
+
+    for spec in specs:
+        if spec.kind not in RENDERERS:
+            raise ValueError(f"Tipo de figura desconocido: {spec.kind}")
+        out = spec.out_path(reports_dir)
+        key = out.relative_to(reports_dir).as_posix()
+        data = spec_data(spec, annual)
+        if data.empty:
+            result["empty"].append(key)
+            continue
+        digest = spec_hash(spec, data)
+        if not force and manifest.get(key) == digest and out.exists():
+            result["skipped"].append(key)
+            continue
+        todo.append((spec, data, out, key, digest))
+
+    if workers is None:
+        workers = min(len(todo), os.cpu_count() or 1)
+
+    failed = {}
+
+    def done(key, digest):
+        manifest[key] = digest
+        result["rendered"].append(key)
+
+    try:
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+                futures = {ex.submit(_render_one, spec, data, out, dpi): (key, digest)
+                           for spec, data, out, key, digest in todo}
+                for fut in as_completed(futures):
+                    key, digest = futures[fut]
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        failed[key] = e
+                    else:
+                        done(key, digest)
+        else:
+            for spec, data, out, key, digest in todo:
+                try:
+                    _render_one(spec, data, out, dpi)
+                except Exception as e:
+                    failed[key] = e
+                else:
+                    done(key, digest)
+    finally:
+        # keep whatever was drawn even if one figure failed
+        save_manifest(manifest, reports_dir)
+    if failed:
+        first = next(iter(failed.values()))
+        raise RuntimeError(f"{len(failed)} figuras fallaron: {sorted(failed)}") from first
+    return result
+
+
+# --- default report (figures produced by the notebooks) ---
+URBAN_LABELS = {
+    "BARCELONA, DRASSANES": "Drassanes (urban core)",
+    "BARCELONA, FABRA": "Fabra (urban-high)",
+    "BARCELONA AEROPUERTO": "BCN Airport",
+    "SABADELL AEROPUERTO": "Sabadell Airport",
+}
+REPORT_STATIONS = list(URBAN_LABELS) + ["MONTSERRAT"]
+
+# valid-year rule of the notebook that draws each variable
+VAR_PRESETS = {
+    "tmin": "annual_temp",
+    "tmax": "annual_temp",
+    "tmed": "annual_temp",
+    "ATD": "annual_temp",
+    "hrMedia": "annual_hr",
+    "presMax": "annual_press",
+    "presMin": "annual_press",
+    "sol": "annual_sol",
+}
+
+
+# UHI vs presMax figures kept under their hand-written names
+PRESSURE_SCATTERS = {
+    "BCN Airport": "UHI vs presMax (hPa) BCN airport.png",
+    "Sabadell Airport": "UHI vs presMax (hPa) Sabadell airport.png",
+    "Fabra (urban-high)": "uhi vs presMax (hPa) - Fabra (urban-high).png",
+}
+SOL_STATIONS = ["BARCELONA, FABRA", "BARCELONA AEROPUERTO", "MONTSERRAT"]
+
+
+def default_specs():
+    """Per-station figures of the analisi_* notebooks, under their file names in reports/."""
+    specs = []
+    for st in REPORT_STATIONS:
+        for var in ("tmin", "tmax", "tmed"):
+            specs.append(FigureSpec(st, var, "trend", preset=VAR_PRESETS[var],
+                                    output=f"temp/{st.replace(',', '').replace(' ', '_')}_{var}_trend.png"))
+        specs.append(FigureSpec(st, "hrMedia", "trend", preset=VAR_PRESETS["hrMedia"],
+                                output=f"humidity/humitat_relativa_mitjana_anual_{st.replace(' ', '_')}.png"))
+    for st in SOL_STATIONS:
+        slug = st.replace(",", "").replace(" ", "_").lower()
+        specs.append(FigureSpec(st, "sol", "trend", preset=VAR_PRESETS["sol"],
+                                output=f"sol/annual_sol_trend_{slug}.png"))
+
+    # the analisi_* notebooks take the UHI of their scatters from annual_temp
+    def scatter(st, var, label, output):
+        return FigureSpec(st, var, "uhi_scatter", label=label, preset=VAR_PRESETS[var],
+                          uhi_preset="annual_temp", output=output)
+
+    for st, label in URBAN_LABELS.items():
+        for var in ("tmin", "ATD"):
+            specs.append(scatter(st, var, label, f"temp/UHI_vs_{var}_{label.replace(',', '').replace(' ', '_')}.png"))
+        specs.append(scatter(st, "hrMedia", label,
+                             f"humidity/uhi_vs_humidity_{label.replace(' ', '_').lower()}.png"))
+        if label in PRESSURE_SCATTERS:
+            specs.append(scatter(st, "presMax", label, f"pressure/{PRESSURE_SCATTERS[label]}"))
+        if st in SOL_STATIONS:
+            specs.append(scatter(st, "sol", label,
+                                 f"sol/uhi_vs_sol_{label.replace(' ', '_').replace(',', '').lower()}.png"))
+    return specs
+
+
+def report_frames(specs, table=None):
+    """Annual frame of every preset used by ``specs`` (dict preset -> frame)."""
+    if table is None:
+        table = load_annual_table()
+    frames = {}
+    for preset in sorted(set().union(*(spec.presets() for spec in specs))):
+        frames[preset] = annual_frame(preset=preset, table=table)
+    if "annual_temp" in frames:
+        # analisi_temp_estacions adds ATD to annual_temp before its scatters
+        t = frames["annual_temp"]
+        t["ATD"] = t["tmax"] - t["tmin"]
+    return frames
+
+
+def render_default_report(reports_dir=REPORTS_DIR, workers=None, force=False):
+    """Annual table -> every default figure (incremental)."""
+    specs = default_specs()
+    return render_report(specs, report_frames(specs), reports_dir=reports_dir, workers=workers, force=force)
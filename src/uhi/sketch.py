@@ -0,0 +1,269 @@
+# src/uhi/sketch.py
+"""
+Mergeable quantile sketches (t-digest) for UHI distributions.
+
+A ``TDigest`` keeps at most ~delta/2 weighted centroids whatever the number
+of values added, with more resolution in the tails (P1/P99) than in the
+middle. Digests built on different chunks or worker processes merge into
+the digest of the union, so percentile climatologies per pair x month x
+regime are built in one pass over the data and never need the daily
+series in memory or sorted.
+
+``SketchSet`` holds one digest per key (pair, month, regime) and is
+persisted as a long Parquet table (one row per centroid).
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .config import PROC_DIR
+
+SKETCHES_PATH = PROC_DIR / "uhi_sketches.parquet"
+DELTA = 200          # compression: higher -> more centroids, smaller rank error
+BUFFER = 4096        # values buffered before a compression pass
+QUANTILES = (0.10, 0.50, 0.90, 0.99)
+KEY = ["pair", "month", "regime"]
+
+
+def _k1(q, delta):
+    # scale function: small centroids near q=0 and q=1
+    return delta / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0.0, 1.0) - 1)
+
+
+def _compress(means, weights, delta):
+    """Merge sorted-by-mean centroids so each spans at most 1 unit of k."""
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    q_left = (np.cumsum(weights) - weights) / total
+    gid = np.floor(_k1(q_left, delta) - _k1(0.0, delta)).astype(np.int64)
+    # group ids are sorted: bincount over their compacted labels
+    _, gid = np.unique(gid, return_inverse=True)
+    w = np.bincount(gid, weights)
+    m = np.bincount(gid, weights * means) / w
+    return m, w
+
+
+class TDigest:
+    """Merging t-digest over float values (NaN ignored)."""
+
+    def __init__(self, delta=DELTA):
+        self.delta = delta
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buf = []
+        self._nbuf = 0
+
+    @property
+    def count(self):
+        self._flush()
+        return float(self.weights.sum())
+
+    def add(self, values):
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        if len(v) == 0:
+            return self
+        self.min = min(self.min, v.min())
+        self.max = max(self.max, v.max())
+        self._buf.append(v)
+        self._nbuf += len(v)
+        if self._nbuf >= BUFFER:
+            self._flush()
+        return self
+
+    def _flush(self):
+        if not self._buf:
+            return
+        v = np.concatenate(self._buf)
+        self._buf, self._nbuf = [], 0
+        self.means, self.weights = _compress(np.concatenate([self.means, v]),
+                                             np.concatenate([self.weights, np.ones(len(v))]), self.delta)
+
+    def merge(self, other):
+        """Add the contents of ``other`` (another TDigest) to this one."""
+        other._flush()
+        self._flush()
+        if len(other.weights):
+            self.means, self.weights = _compress(np.concatenate([self.means, other.means]),
+                                                 np.concatenate([self.weights, other.weights]), self.delta)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Quantile(s) ``q`` in [0, 1]; NaN for an empty digest."""
+        self._flush()
+        q = np.asarray(q, dtype=np.float64)
+        if len(self.weights) == 0:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        # centroid centres on the cumulative-weight axis, anchored at min/max
+        centres = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[0.0], centres, [total]])
+        y = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q * total, x, y)
+
+    def cdf(self, value):
+        self._flush()
+        if len(self.weights) == 0:
+            return np.nan
+        centres = np.cumsum(self.weights) - self.weights / 2
+        x = np.concatenate([[self.min], self.means, [self.max]])
+        y = np.concatenate([[0.0], centres, [self.weights.sum()]]) / self.weights.sum()
+        return np.interp(value, x, y)
+
+    @classmethod
+    def from_centroids(cls, means, weights, vmin, vmax, delta=DELTA):
+        d = cls(delta)
+        d.means = np.asarray(means, dtype=np.float64)
+        d.weights = np.asarray(weights, dtype=np.float64)
+        d.min, d.max = float(vmin), float(vmax)
+        return d
+
+
+class SketchSet:
+    """One TDigest per key tuple (pair, month, regime)."""
+
+    def __init__(self, delta=DELTA):
+        self.delta = delta
+        self.digests = {}
+
+    def __len__(self):
+        return len(self.digests)
+
+    def digest(self, key):
+        d = self.digests.get(key)
+        if d is None:
+            d = self.digests[key] = TDigest(self.delta)
+        return d
+
+    def add(self, key, values):
+        self.digest(key).add(values)
+        return self
+
+    def add_grouped(self, pair, regime, values, months):
+        """Add a chunk of values split by calendar month (1..12)."""
+        values = np.asarray(values, dtype=np.float64)
+        months = np.asarray(months)
+        if len(values) == 0:
+            return self
+        order = np.argsort(months, kind="stable")
+        m_sorted = months[order]
+        bounds = np.flatnonzero(np.diff(m_sorted)) + 1
+        for chunk, month in zip(np.split(values[order], bounds), m_sorted[np.r_[0, bounds]]):
+            self.add((pair, int(month), regime), chunk)
+        return self
+
+    def merge(self, other):
+        for key, d in other.digests.items():
+            self.digest(key).merge(d)
+        return self
+
+    def combined(self, pair, months=None, regime="all"):
+        """Digest of a pair/regime over several months (all when None)."""
+        out = TDigest(self.delta)
+        for (p, m, r), d in self.digests.items():
+            if p == pair and r == regime and (months is None or m in months):
+                out.merge(d)
+        return out
+
+    def quantiles(self, q=QUANTILES, by_month=True, regime=None):
+        """Table of quantiles per key (or per pair x regime when not by month)."""
+        rows = []
+        keys = sorted(self.digests)
+        if not by_month:
+            keys = sorted({(p, None, r) for p, _, r in keys})
+        for p, m, r in keys:
+            if regime is not None and r != regime:
+                continue
+            d = self.digests[(p, m, r)] if by_month else self.combined(p, None, r)
+            row = {"pair": p, "month": m, "regime": r, "n": int(d.count)}
+            row.update({f"P{round(x * 100):02d}": v for x, v in zip(q, d.quantile(q))})
+            rows.append(row)
+        out = pd.DataFrame(rows)
+        return out.drop(columns="month") if not by_month else out
+
+    # --- persistence ---
+    def to_frame(self):
+        parts = []
+        for (p, m, r), d in self.digests.items():
+            d._flush()
+            n = len(d.means)
+            parts.append(pd.DataFrame({"pair": [p] * n, "month": np.full(n, m, dtype="int8"),
+                                       "regime": [r] * n, "mean": d.means, "weight": d.weights,
+                                       "min": np.full(n, d.min), "max": np.full(n, d.max)}))
+        if not parts:
+            return pd.DataFrame(columns=KEY + ["mean", "weight", "min", "max"])
+        df = pd.concat(parts, ignore_index=True)
+        df["pair"] = df["pair"].astype("category")
+        df["regime"] = df["regime"].astype("category")
+        return df
+
+    def save(self, path=SKETCHES_PATH):
+        self.to_frame().to_parquet(path, index=False)
+        return path
+
+    @classmethod
+    def load(cls, path=SKETCHES_PATH, delta=DELTA):
+        df = pd.read_parquet(path)
+        out = cls(delta)
+        for (p, m, r), g in df.groupby(KEY, observed=True, sort=False):
+            out.digests[(p, int(m), r)] = TDigest.from_centroids(
+                g["mean"].to_numpy(), g["weight"].to_numpy(), g["min"].iat[0], g["max"].iat[0], delta)
+        return out
+
+
+# --- building from the array store ---
+def _sketch_block(root, pairs, regimes, start, end, delta):
+    from .arrays import ArrayStore, composite
+    from .regimes import RegimeIndex
+
+    store = ArrayStore(root)
+    idx = RegimeIndex.load(regimes[0]) if regimes else None
+    sl = store.days(start, end)
+    dates = store.dates[sl]
+    months = dates.month.to_numpy()
+    out = SketchSet(delta)
+    for urban, rural in pairs:
+        if isinstance(rural, (list, tuple)):
+            ref = composite(store, list(rural), "tmin", "median", start, end)
+            name = f"{urban}-rural_median"
+        else:
+            ref = store.row("tmin", rural, start, end)
+            name = f"{urban}-{rural}"
+        u = np.asarray(store.row("tmin", urban, start, end), dtype=np.float64) - ref
+        out.add_grouped(name, "all", u, months)
+        for reg in (regimes[1] if regimes else []):
+            m = idx.align(idx.query(reg), dates)
+            out.add_grouped(name, reg, u[m], months[m])
+    return out
+
+
+def build_uhi_sketches(store, pairs, regimes=(), regimes_path=None, years_per_chunk=5,
+                       workers=1, delta=DELTA):
+    """
+    UHI (tmin urban - rural) sketches per pair x month x regime.
+
+    ``pairs``: [(urban, rural code or list of rural codes for the median)];
+    ``regimes``: regime expressions (see ``uhi.regimes``) besides 'all'.
+    The archive is streamed in blocks of ``years_per_chunk`` years, optionally
+    on a process pool, and the partial sketches are merged.
+    """
+    dates = store.dates
+    years = range(dates[0].year, dates[-1].year + 1, years_per_chunk)
+    blocks = [(f"{y}-01-01", f"{y + years_per_chunk - 1}-12-31") for y in years]
+    reg = (str(regimes_path), list(regimes)) if regimes else None
+    args = [(str(store.root), pairs, reg, s, e, delta) for s, e in blocks]
+    result = SketchSet(delta)
+    if workers > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for part in ex.map(_sketch_block, *zip(*args)):
+                result.merge(part)
+    else:
+        for a in args:
+            result.merge(_sketch_block(*a))
+    return result
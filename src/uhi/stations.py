@@ -0,0 +1,83 @@
+# src/uhi/stations.py
+"""Station metadata used across the project (AEMET indicativo -> name, class, coordinates)."""
+
+# Stations downloaded by batch_download.py / merged by merge_and_prepare_uhi.py
+PROJECT_CODES = ["0066X", "0076", "0149X", "0158O", "0171X", "0200E", "0201X", "0229I"]
+
+# Daily files written by the download step (data/raw/aemet)
+PROJECT_FILES = [f"aemet_{code}_1980_2025_resume.csv" for code in PROJECT_CODES]
+
+URBAN_CODES = ["0066X", "0076", "0200E", "0201X"]
+RURAL_CODES = ["0149X", "0171X", "0229I", "0158O"]
+
+# Names as they appear in the 'nombre' field of the AEMET files
+NAMES = {
+    "0076": "BARCELONA AEROPUERTO",
+    "0200E": "BARCELONA, FABRA",
+    "0201X": "BARCELONA, DRASSANES",
+    "0229I": "SABADELL AEROPUERTO",
+    "0158O": "MONTSERRAT",
+}
+
+
+def station_name(code):
+    return NAMES.get(code, f"ESTACION {code}")
+
+
+def classify_station(code):
+    if code in URBAN_CODES:
+        return "urbana"
+    if code in RURAL_CODES:
+        return "rural"
+    return "desconocida"
+
+
+# --- coordinates ---
+# Approximate positions (WGS84) and altitude from the AEMET station
+# inventory; other stations can be added through data/stations.csv
+# (columns indicativo, nombre, lat, lon, altitud).
+COORDS = {
+    "0076": (41.2928, 2.0700, 4),
+    "0200E": (41.4181, 2.1239, 408),
+    "0201X": (41.3750, 2.1747, 6),
+    "0229I": (41.5236, 2.1047, 146),
+    "0158O": (41.5933, 1.8372, 720),
+}
+
+STATIONS_CSV = "stations.csv"
+
+
+def parse_dms(value):
+    """AEMET inventory coordinate ('412917N', '020412E') -> decimal degrees."""
+    value = str(value).strip()
+    hemi = value[-1].upper()
+    digits = value[:-1]
+    deg, minutes, seconds = int(digits[:-4]), int(digits[-4:-2]), int(digits[-2:])
+    dec = deg + minutes / 60 + seconds / 3600
+    return -dec if hemi in ("S", "W") else dec
+
+
+def station_table(path=None):
+    """
+    Station coordinate table (indicativo, nombre, lat, lon, altitud), from
+    COORDS plus data/stations.csv when present (the CSV wins on conflicts).
+    """
+    import pandas as pd
+    from .config import DATA_DIR
+
+    rows = [{"indicativo": c, "nombre": station_name(c), "lat": lat, "lon": lon, "altitud": alt}
+            for c, (lat, lon, alt) in COORDS.items()]
+    table = pd.DataFrame(rows)
+    path = DATA_DIR / STATIONS_CSV if path is None else path
+    try:
+        extra = pd.read_csv(path, dtype={"indicativo": str})
+    except FileNotFoundError:
+        extra = None
+    if extra is not None:
+        # inventory-style coordinates ("412917N") are converted
+        for col in ("lat", "lon"):
+            if extra[col].dtype == object:
+                extra[col] = extra[col].map(parse_dms)
+        table = pd.concat([table[~table["indicativo"].isin(extra["indicativo"])], extra],
+                          ignore_index=True)
+    return table.set_index("indicativo")
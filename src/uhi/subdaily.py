@@ -0,0 +1,356 @@
+# src/uhi/subdaily.py
+"""
+Sub-daily (hourly / 10-minute) AEMET observations: columnar store and
+downsampling.
+
+Layout: one Parquet file per station and month,
+``<root>/<YYYY>/<MM>/<indicativo>.parquet`` (zstd), with
+- ``minute``: int32 minutes since 1970-01-01 UTC, sorted, unique;
+- each variable as int16 scaled by ``SCALES`` (null = missing), or
+  float32 when it has no scale.
+Scales are written in the file metadata, so old files stay readable if
+``SCALES`` changes. Hourly data take ~24x and 10-minute data ~144x the
+daily row count; the time partitions keep appends and date-range scans
+from touching more than the months involved.
+
+``aggregate`` scans the partitions one file at a time and reduces them on
+the fly to daily or window aggregates (e.g. night-only minimum), so the
+full raw volume is never in memory. ``daily_frame`` returns those as a
+wide ``<var>_<indicativo>`` table that the daily code (array store,
+merged table) reads as usual.
+"""
+import json
+import os
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import PROC_DIR
+from .instrument import stage
+
+SUBDAILY_DIR = PROC_DIR / "subdaily"
+STATION_COL = "indicativo"
+TIME_COL = "minute"
+EPOCH = pd.Timestamp("1970-01-01")
+SCALES_KEY = b"uhi.scales"
+
+# AEMET ``observacion/convencional`` fields -> int16 step
+SCALES = {
+    "ta": 0.01, "tamin": 0.01, "tamax": 0.01, "tpr": 0.01, "ts": 0.01,  # °C
+    "hr": 0.1,                     # %
+    "vv": 0.01, "vmax": 0.01,      # m/s
+    "dv": 1.0, "dmax": 1.0,        # degrees
+    "prec": 0.1,                   # mm
+    "pres": 0.1, "pres_nmar": 0.1,  # hPa
+    "inso": 0.1,                   # minutes of sun in the period
+}
+INT16_MIN, INT16_MAX = -32767, 32767
+
+# windows in UTC hours [start, end); start > end crosses midnight and the
+# window is labelled with the day it ends on (AEMET tmin convention)
+DAY = (0, 24)
+NIGHT = (18, 8)
+
+# daily variables derived from the sub-daily record: name -> (var, how, window)
+DAILY_SPECS = {
+    "tmin": ("tamin", "min", DAY),
+    "tmax": ("tamax", "max", DAY),
+    "tmed": ("ta", "mean", DAY),
+    "prec": ("prec", "sum", DAY),
+    "velmedia": ("vv", "mean", DAY),
+    "racha": ("vmax", "max", DAY),
+    "hrMedia": ("hr", "mean", DAY),
+    "presMax": ("pres", "max", DAY),
+    "presMin": ("pres", "min", DAY),
+    "tminNight": ("ta", "min", NIGHT),
+    "tNightStart": ("ta", "first", NIGHT),
+}
+HOWS = ("min", "max", "mean", "sum", "count", "first", "last")
+
+
+# --- encoding ---
+def encode(df, scales=SCALES):
+    """Long frame (``minute`` + float columns) -> pyarrow Table with scaled ints."""
+    import pyarrow as pa
+
+    cols = {TIME_COL: pa.array(df[TIME_COL].to_numpy(dtype=np.int32), type=pa.int32())}
+    used = {}
+    for c in df.columns:
+        if c in (TIME_COL, STATION_COL):
+            continue
+        v = df[c].to_numpy(dtype=np.float64, na_value=np.nan)
+        scale = scales.get(c)
+        if scale is None:
+            cols[c] = pa.array(v.astype(np.float32), mask=np.isnan(v), type=pa.float32())
+            continue
+        with np.errstate(invalid="ignore"):
+            q = np.round(v / scale)
+        # out-of-range values are corrupt readings: stored as missing
+        bad = np.isnan(q) | (q < INT16_MIN) | (q > INT16_MAX)
+        cols[c] = pa.array(np.where(bad, 0, q).astype(np.int16), mask=bad, type=pa.int16())
+        used[c] = scale
+    table = pa.table(cols)
+    return table.replace_schema_metadata({SCALES_KEY: json.dumps(used).encode()})
+
+
+def decode(table):
+    """pyarrow Table -> (minute int64 array, {var: float32 array})."""
+    meta = table.schema.metadata or {}
+    scales = json.loads(meta.get(SCALES_KEY, b"{}"))
+    minute = table.column(TIME_COL).to_numpy().astype(np.int64)
+    out = {}
+    for name in table.column_names:
+        if name == TIME_COL:
+            continue
+        # nulls come back as NaN (float64)
+        v = table.column(name).to_numpy(zero_copy_only=False).astype(np.float32)
+        if name in scales:
+            v *= np.float32(scales[name])
+        out[name] = v
+    return minute, out
+
+
+def to_minutes(times):
+    """Datetimes (naive UTC) -> int minutes since the epoch."""
+    return ((pd.DatetimeIndex(times) - EPOCH) // pd.Timedelta(minutes=1)).to_numpy(dtype=np.int64)
+
+
+# --- store ---
+def partition_path(root, code, year, month):
+    return Path(root) / f"{year:04d}" / f"{month:02d}" / f"{code}.parquet"
+
+
+def read_partition(path, columns=None):
+    import pyarrow.parquet as pq
+
+    f = pq.ParquetFile(path)
+    cols = None
+    if columns is not None:
+        available = set(f.schema_arrow.names)
+        cols = [TIME_COL] + [c for c in columns if c != TIME_COL and c in available]
+    # files are small: threads cost more than they save
+    return decode(f.read(columns=cols, use_threads=False))
+
+
+def _write_table(table, path):
+    import pyarrow.parquet as pq
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def write_observations(df, root=SUBDAILY_DIR):
+    """
+    Append a long frame (``indicativo``, ``time`` + variables, as returned by
+    ``clean.clean_observations``) to the store. Rows already stored for the
+    same station and minute are replaced. Returns the number of new rows.
+    """
+    root = Path(root)
+    if df.empty:
+        return 0
+    d = df.drop(columns="time")
+    d.insert(0, TIME_COL, to_minutes(df["time"]))
+    years, months = df["time"].dt.year.to_numpy(), df["time"].dt.month.to_numpy()
+    added = 0
+    with stage("write", rows_in=len(df), target="subdaily") as st:
+        for (code, y, m), part in d.groupby([d[STATION_COL].to_numpy(), years, months], sort=True):
+            part = part.drop(columns=STATION_COL)
+            path = partition_path(root, code, y, m)
+            n_old = 0
+            if path.exists():
+                minute, values = read_partition(path)
+                old = pd.DataFrame(values)
+                old.insert(0, TIME_COL, minute)
+                n_old = len(old)
+                part = pd.concat([old, part], ignore_index=True)
+            part = (part.drop_duplicates(TIME_COL, keep="last")
+                        .sort_values(TIME_COL, kind="stable").reset_index(drop=True))
+            _write_table(encode(part), path)
+            st.wrote(path)
+            added += len(part) - n_old
+        st.rows_out = added
+    return added
+
+
+def partitions(root=SUBDAILY_DIR, stations=None, start=None, end=None):
+    """[(code, year, month, path)] in the store, by station then time."""
+    root = Path(root)
+
+    def month_number(ts):
+        return ts.year * 12 + ts.month - 1
+
+    # one day of margin: a night window crosses into the previous month
+    lo = -np.inf if start is None else month_number(pd.Timestamp(start) - pd.Timedelta(days=1))
+    hi = np.inf if end is None else month_number(pd.Timestamp(end) + pd.Timedelta(days=1))
+    wanted = None if stations is None else set(stations)
+    out = []
+    for path in root.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/*.parquet"):
+        y, m, code = int(path.parent.parent.name), int(path.parent.name), path.stem
+        if (wanted is None or code in wanted) and lo <= y * 12 + m - 1 <= hi:
+            out.append((code, y, m, path))
+    return sorted(out)
+
+
+def read_observations(root=SUBDAILY_DIR, station=None, start=None, end=None, columns=None):
+    """Decoded observations of one station as a DataFrame (small queries)."""
+    parts = []
+    for code, _, _, path in partitions(root, [station], start, end):
+        minute, values = read_partition(path, columns)
+        df = pd.DataFrame(values)
+        df.index = EPOCH + pd.to_timedelta(minute, unit="min")
+        parts.append(df)
+    if not parts:
+        return pd.DataFrame()
+    df = pd.concat(parts)
+    df.index.name = "time"
+    return df.loc[start:end] if (start or end) else df
+
+
+# --- downsampling ---
+def window_labels(minute, window=DAY):
+    """(keep mask, day label since epoch) of each sample for ``window``."""
+    start, end = window
+    if start < end:
+        hour = (minute // 60) % 24
+        return (hour >= start) & (hour < end), minute // 1440
+    # crosses midnight: shift so the window is [0, span) of the day it ends on
+    shifted = minute + (24 - start) * 60
+    hour = (shifted // 60) % 24
+    return hour < end + 24 - start, shifted // 1440
+
+
+def window_minutes(window):
+    start, end = window
+    return (end - start if start < end else end + 24 - start) * 60
+
+
+def _reduce(values, labels, how):
+    """Per-label reduction of sorted ``labels`` -> (unique labels, result, count)."""
+    ok = ~np.isnan(values)
+    v, lab = values[ok].astype(np.float64), labels[ok]
+    if len(v) == 0:
+        return lab, v, lab
+    bounds = np.concatenate([[0], np.flatnonzero(lab[1:] != lab[:-1]) + 1])
+    ends = np.append(bounds[1:], len(v))
+    count = ends - bounds
+    if how == "min":
+        res = np.minimum.reduceat(v, bounds)
+    elif how == "max":
+        res = np.maximum.reduceat(v, bounds)
+    elif how in ("mean", "sum"):
+        res = np.add.reduceat(v, bounds)
+    elif how == "first":
+        res = v[bounds]
+    elif how == "last":
+        res = v[ends - 1]
+    else:  # count
+        res = count.astype(np.float64)
+    return lab[bounds], res, count
+
+
+def aggregate(specs=None, root=SUBDAILY_DIR, stations=None, start=None, end=None, min_coverage=0.75):
+    """
+    Daily / window aggregates of the sub-daily store in one streaming scan.
+
+    ``specs``: {name: (variable, how, window)} with ``how`` in ``HOWS`` and
+    ``window`` an (start, end) pair of UTC hours (``DAY``, ``NIGHT``, ...).
+    A day is kept when its samples cover at least ``min_coverage`` of the
+    window at the station's sampling step. Returns (codes, dates,
+    {name: [stations x days] float32}).
+    """
+    specs = specs or DAILY_SPECS
+    for name, (_, how, _) in specs.items():
+        if how not in HOWS:
+            raise ValueError(f"{name}: agregación desconocida {how!r} (usar {HOWS})")
+    parts = partitions(root, stations, start, end)
+    codes = sorted({p[0] for p in parts})
+    if start is None or end is None:
+        first = min((pd.Timestamp(year=y, month=m, day=1) for _, y, m, _ in parts), default=None)
+        last = max((pd.Timestamp(year=y, month=m, day=1) + pd.offsets.MonthEnd(0) for _, y, m, _ in parts),
+                   default=None)
+        start = first if start is None else start
+        end = last if end is None else end
+    if not codes:
+        return codes, pd.DatetimeIndex([]), {name: np.empty((0, 0), np.float32) for name in specs}
+    dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+    day0 = (dates[0] - EPOCH).days
+    n_days = len(dates)
+    row = {c: i for i, c in enumerate(codes)}
+
+    acc = {name: np.full((len(codes), n_days), np.nan) for name in specs}
+    cnt = {name: np.zeros((len(codes), n_days), dtype=np.int64) for name in specs}
+    step = np.full(len(codes), np.inf)
+    columns = sorted({var for var, _, _ in specs.values()})
+
+    with stage("downsample", rows_in=0, files=len(parts)) as st:
+        for code, _, _, path in parts:
+            minute, values = read_partition(path, columns)
+            st.rows_in += len(minute)
+            st.read(path)
+            if len(minute) > 1:
+                step[row[code]] = min(step[row[code]], np.median(np.diff(minute)))
+            i = row[code]
+            labelled = {w: window_labels(minute, w) for w in {w for _, _, w in specs.values()}}
+            for name, (var, how, window) in specs.items():
+                if var not in values:
+                    continue
+                keep, labels = labelled[window]
+                lab, res, n = _reduce(values[var][keep], labels[keep], how)
+                pos = lab - day0
+                inside = (pos >= 0) & (pos < n_days)
+                pos, res, n = pos[inside], res[inside], n[inside]
+                # labels are unique within a partition: plain fancy indexing
+                a, c = acc[name], cnt[name]
+                cur = a[i, pos]
+                if how == "min":
+                    a[i, pos] = np.fmin(cur, res)
+                elif how == "max":
+                    a[i, pos] = np.fmax(cur, res)
+                elif how in ("mean", "sum", "count"):
+                    a[i, pos] = np.where(np.isnan(cur), 0.0, cur) + res
+                elif how == "first":
+                    a[i, pos] = np.where(c[i, pos] == 0, res, cur)
+                else:  # last: partitions are read in time order
+                    a[i, pos] = res
+                c[i, pos] += n
+        st.rows_out = len(codes) * n_days
+
+    step[~np.isfinite(step)] = 60.0
+    out = {}
+    for name, (_, how, window) in specs.items():
+        a, c = acc[name], cnt[name]
+        if how == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                a = a / c
+        expected = window_minutes(window) / step
+        a[c < np.ceil(min_coverage * expected)[:, None]] = np.nan
+        out[name] = a.astype(np.float32)
+    return codes, dates, out
+
+
+def downsample(var, how="mean", window=DAY, root=SUBDAILY_DIR, stations=None, start=None, end=None,
+               min_coverage=0.75):
+    """One aggregate as a DataFrame (index: day, columns: indicativo)."""
+    codes, dates, out = aggregate({"v": (var, how, window)}, root, stations, start, end, min_coverage)
+    return pd.DataFrame(out["v"].T, index=dates, columns=codes)
+
+
+def daily_frame(root=SUBDAILY_DIR, specs=None, stations=None, start=None, end=None, min_coverage=0.75):
+    """
+    Wide daily table (``<name>_<indicativo>`` columns, DatetimeIndex 'fecha')
+    derived from the sub-daily store, e.g. for ``arrays.build_array_store``
+    or ``merged.write_merged``.
+    """
+    codes, dates, out = aggregate(specs, root, stations, start, end, min_coverage)
+    cols = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", pd.errors.PerformanceWarning)
+        for name, arr in out.items():
+            for i, code in enumerate(codes):
+                cols[f"{name}_{code}"] = arr[i]
+    df = pd.DataFrame(cols, index=pd.DatetimeIndex(dates, name="fecha"))
+    return df
@@ -0,0 +1,242 @@
+# src/uhi/synthetic.py
+"""
+Synthetic AEMET-shaped daily data for tests and benchmarks.
+
+Stations share a regional weather signal (so they correlate like real
+neighbours) plus their own noise, a seasonal cycle, a warming trend and an
+urban offset. Output mimics what the scripts read:
+- ``resume`` CSVs as written by download_aemet_resume (``fecha`` + AEMET
+  columns, reindexed daily with empty gap rows), with a fraction of values
+  still carrying decimal commas and ``Ip`` in ``prec``;
+- ``raw`` JSON arrays as returned by the AEMET ``datos`` URL (all values as
+  strings with decimal comma, gap days absent);
+- ``subdaily`` observations (hourly / 10-minute diurnal cycle through each
+  day's tmin/tmax) written straight to a ``uhi.subdaily`` store.
+Scales from the 8 project stations to hundreds of stations x decades.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .stations import PROJECT_CODES, URBAN_CODES, station_name
+
+NUMERIC = ["tmed", "prec", "tmin", "tmax", "velmedia", "racha", "sol", "presMax", "presMin", "hrMedia"]
+COLUMNS = ["indicativo", "nombre", "provincia", "altitud", "tmed", "prec", "tmin", "horatmin",
+           "tmax", "horatmax", "dir", "velmedia", "racha", "horaracha", "sol",
+           "presMax", "horaPresMax", "presMin", "horaPresMin", "hrMedia"]
+# "HH:MM" lookup for the hora* fields (minute of day -> string)
+HHMM = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+
+def station_codes(n):
+    """The project codes first, then synthetic AEMET-like codes."""
+    codes = list(PROJECT_CODES[:n])
+    codes += [f"{i:04d}S" for i in range(1, n - len(codes) + 1)]
+    return codes
+
+
+def regional_signal(dates, rng, phi=0.8):
+    """Shared day-to-day anomaly (AR(1), ~2 °C std) for all stations."""
+    eps = rng.normal(0.0, 1.2, len(dates))
+    out = np.empty(len(dates))
+    prev = 0.0
+    # computed once per network, so a plain loop is fine
+    for i, e in enumerate(eps):
+        prev = phi * prev + e
+        out[i] = prev
+    return out
+
+
+def gap_mask(n, rng, short_rate=0.01, long_rate=0.0004, max_short=5, long_len=(20, 120)):
+    """Boolean mask of missing days: short random gaps plus a few long ones."""
+    miss = np.zeros(n, dtype=bool)
+    for rate, lens in ((short_rate, (1, max_short)), (long_rate, long_len)):
+        starts = np.flatnonzero(rng.random(n) < rate)
+        lengths = rng.integers(lens[0], lens[1] + 1, len(starts))
+        for s, L in zip(starts, lengths):
+            miss[s:s + L] = True
+    return miss
+
+
+def station_frame(code, dates, regional, rng, urban=False, active=None):
+    """Numeric daily frame for one station (NaN on gap days)."""
+    n = len(dates)
+    doy = dates.dayofyear.to_numpy()
+    years = (dates.year - dates.year[0]).to_numpy() + doy / 365.25
+    season = np.cos(2 * np.pi * (doy - 200) / 365.25)
+
+    alt = float(rng.uniform(0, 900))
+    base = 13.0 - alt * 0.0065 + (1.2 if urban else 0.0)
+    lam = rng.uniform(0.7, 1.0)
+    own = rng.normal(0.0, 0.8, n)
+    tmin = base + 7.0 * season + 0.03 * years + lam * regional + own
+    atd = 8.0 + 2.5 * season - (1.0 if urban else 0.0) + rng.normal(0, 1.0, n)
+    tmax = tmin + np.clip(atd, 0.5, None)
+    tmed = (tmin + tmax) / 2
+
+    velmedia = rng.gamma(2.0, 1.4 if urban else 1.8, n)
+    racha = velmedia * rng.uniform(1.8, 3.0, n)
+    sol = np.clip(7.5 + 3.5 * season + rng.normal(0, 2.5, n), 0, 14.5)
+    wet = rng.random(n) < 0.22
+    prec = np.where(wet, rng.exponential(6.0, n), 0.0)
+    pres_max = 1016 - alt * 0.11 + rng.normal(0, 5, n) - 0.5 * regional
+    pres_min = pres_max - rng.gamma(2.0, 1.5, n)
+    hr = np.clip(68 - 10 * season + rng.normal(0, 9, n) + 10 * wet, 10, 100)
+
+    df = pd.DataFrame({
+        "tmed": tmed, "prec": prec, "tmin": tmin, "tmax": tmax, "velmedia": velmedia,
+        "racha": racha, "sol": sol, "presMax": pres_max, "presMin": pres_min, "hrMedia": hr,
+    }, index=dates).round(1)
+    df["dir"] = rng.integers(1, 37, n)
+    df.insert(0, "indicativo", code)
+    df.insert(1, "nombre", station_name(code))
+    df.insert(2, "provincia", "BARCELONA")
+    df.insert(3, "altitud", int(alt))
+    for c, hours in (("horatmin", (3, 8)), ("horatmax", (12, 17)), ("horaracha", (0, 24)),
+                     ("horaPresMax", (0, 24)), ("horaPresMin", (0, 24))):
+        df[c] = HHMM[rng.integers(hours[0] * 60, hours[1] * 60, n)]
+
+    miss = gap_mask(n, rng)
+    if active is not None:
+        miss |= ~active
+    # one variable missing alone now and then (sensor outage)
+    df.loc[rng.random(n) < 0.02, "sol"] = np.nan
+    df.loc[rng.random(n) < 0.01, "hrMedia"] = np.nan
+    df.loc[miss, :] = np.nan
+    return df[COLUMNS], miss
+
+
+def _with_commas(s, frac, rng):
+    """Turn a fraction of a numeric column into AEMET decimal-comma strings."""
+    out = s.astype(object)
+    pick = s.notna().to_numpy() & (rng.random(len(s)) < frac)
+    out[pick] = s[pick].map(lambda v: f"{v:.1f}".replace(".", ","))
+    return out
+
+
+def generate_network(n_stations=8, n_years=45, start_year=1980, seed=0):
+    """Yield (code, daily frame) for a synthetic network."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(f"{start_year}-01-01", f"{start_year + n_years - 1}-12-31", freq="D")
+    regional = regional_signal(dates, rng)
+    for code in station_codes(n_stations):
+        # some stations start late / stop early, like 0229I
+        active = np.ones(len(dates), dtype=bool)
+        if rng.random() < 0.3:
+            cut = rng.integers(0, len(dates) // 3)
+            if rng.random() < 0.5:
+                active[:cut] = False
+            else:
+                active[len(dates) - cut:] = False
+        df, _ = station_frame(code, dates, regional, rng, urban=code in URBAN_CODES, active=active)
+        yield code, df
+
+
+def to_resume(df, rng, comma_frac=0.02, ip_frac=0.03):
+    """Resume CSV flavour: numeric, with some decimal commas and 'Ip'."""
+    out = df.copy()
+    for c in ("tmin", "tmax", "tmed", "velmedia"):
+        out[c] = _with_commas(out[c], comma_frac, rng)
+    prec = out["prec"].astype(object)
+    prec[(df["prec"] == 0).to_numpy() & (rng.random(len(df)) < ip_frac)] = "Ip"
+    out["prec"] = prec
+    return out
+
+
+def to_raw_records(df):
+    """AEMET ``datos`` JSON flavour: strings with decimal comma, no gap days."""
+    d = df.dropna(subset=["indicativo"]).copy()
+    fecha = d.index.strftime("%Y-%m-%d")
+    for c in NUMERIC:
+        s = d[c].map(lambda v: "" if pd.isna(v) else f"{v:.1f}".replace(".", ","))
+        d[c] = s
+    d.loc[df.loc[d.index, "prec"].eq(0) & (np.arange(len(d)) % 17 == 0), "prec"] = "Ip"
+    d["altitud"] = d["altitud"].astype(int).astype(str)
+    d["dir"] = d["dir"].astype(int).astype(str)
+    d.insert(0, "fecha", fecha)
+    recs = d.to_dict(orient="records")
+    # AEMET omits keys without value
+    return [{k: v for k, v in r.items() if v not in ("", None)} for r in recs]
+
+
+def write_dataset(out_dir, n_stations=8, n_years=45, start_year=1980, seed=0, fmt="resume"):
+    """
+    Write a synthetic network to ``out_dir`` and return the list of files.
+    ``fmt='resume'`` -> aemet_<code>_<y0>_<y1>_resume.csv (scripts' input);
+    ``fmt='raw'`` -> <code>_raw.json (AEMET datos payload).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed + 1)
+    y1 = start_year + n_years - 1
+    files = []
+    for code, df in generate_network(n_stations, n_years, start_year, seed):
+        if fmt == "raw":
+            path = out_dir / f"{code}_raw.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(to_raw_records(df), f, ensure_ascii=False)
+        else:
+            path = out_dir / f"aemet_{code}_{start_year}_{y1}_resume.csv"
+            to_resume(df, rng).to_csv(path, index_label="fecha", encoding="utf-8")
+        files.append(path)
+    return files
+
+
+def diurnal_fraction(hour):
+    """0 at 06 UTC (tmin) -> 1 at 15 UTC (tmax) -> back to 0 the next 06 UTC."""
+    rise = (hour >= 6) & (hour < 15)
+    h = np.where(hour < 6, hour + 24, hour)
+    return np.where(rise, 0.5 - 0.5 * np.cos(np.pi * (hour - 6) / 9),
+                    0.5 + 0.5 * np.cos(np.pi * (h - 15) / 15))
+
+
+def to_subdaily(df, step_minutes=60, rng=None):
+    """
+    Long observation frame (``clean.clean_observations`` layout) for one
+    station's daily frame: ta follows tmin/tmax, other variables the daily
+    means. Gap days stay gaps.
+    """
+    rng = rng or np.random.default_rng(0)
+    per_day = 1440 // step_minutes
+    n = len(df) * per_day
+    d = np.repeat(np.arange(len(df)), per_day)
+    hour = np.tile(np.arange(per_day) * step_minutes / 60.0, len(df))
+    tmin, tmax = df["tmin"].to_numpy(float), df["tmax"].to_numpy(float)
+    f = diurnal_fraction(hour)
+    # before 06 the night cools from yesterday's tmax, after 15 towards tomorrow's tmin
+    hi = np.where(hour < 6, np.r_[tmax[0], tmax[:-1]][d], tmax[d])
+    lo = np.where(hour >= 15, np.r_[tmin[1:], tmin[-1]][d], tmin[d])
+    ta = lo + (hi - lo) * f + rng.normal(0, 0.2, n)
+    spread = rng.uniform(0.0, 0.3, n) * step_minutes / 60
+    time = np.repeat(df.index.to_numpy(), per_day) + pd.to_timedelta(np.tile(
+        np.arange(per_day) * step_minutes, len(df)), unit="min").to_numpy()
+    out = pd.DataFrame({
+        "indicativo": df["indicativo"].dropna().iloc[0] if df["indicativo"].notna().any() else "",
+        "time": time,
+        "ta": ta, "tamin": ta - spread, "tamax": ta + spread,
+        "hr": np.clip(df["hrMedia"].to_numpy(float)[d] + 15 * (0.5 - f), 5, 100),
+        "vv": df["velmedia"].to_numpy(float)[d] * (0.6 + 0.8 * f),
+        "vmax": df["racha"].to_numpy(float)[d] * (0.6 + 0.4 * f),
+        "prec": df["prec"].to_numpy(float)[d] / per_day,
+        "pres": ((df["presMax"] + df["presMin"]) / 2).to_numpy(float)[d],
+    })
+    num = out.columns[2:]
+    out[num] = out[num].astype("float32")
+    gap = np.isnan(tmin)[d] | np.isnan(np.r_[tmin[1:], np.nan])[d] & (hour >= 15)
+    out.loc[gap, num] = np.nan
+    return out
+
+
+def write_subdaily_dataset(root, n_stations=8, n_years=2, start_year=2020, step_minutes=60, seed=0):
+    """Synthetic network written to a sub-daily store, one year at a time."""
+    from .subdaily import write_observations
+
+    rows = 0
+    rng = np.random.default_rng(seed + 2)
+    for code, df in generate_network(n_stations, n_years, start_year, seed):
+        df = df.assign(indicativo=code)
+        for _, year in df.groupby(df.index.year):
+            rows += write_observations(to_subdaily(year, step_minutes, rng), root)
+    return rows